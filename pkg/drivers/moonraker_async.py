@@ -0,0 +1,211 @@
+import asyncio
+import logging
+import time
+
+import aiohttp
+
+from pkg.drivers.sv08_moonraker import (DEFAULT_POLICIES, EndpointPolicy, MultipartStream, PRINTER_LATENCY,
+                                        PrinterSnapshot, SNAPSHOT_OBJECTS, UPLOAD_CHUNK_SIZE,
+                                        breaker_for)
+
+
+class AsyncMoonrakerPool:
+    """
+    One aiohttp connection pool shared by every printer in the farm, with a
+    global cap on requests in flight so dozens of printers can be polled
+    concurrently without flooding the control PC or the network.
+    """
+    def __init__(self, max_in_flight=32, limit_per_host=2, keepalive_timeout=30.0):
+        self.max_in_flight = max_in_flight
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self._session = None
+        self._slots = None
+
+    @property
+    def session(self):
+        # Created lazily so it binds to the loop the pool is first used on.
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_in_flight, limit_per_host=self.limit_per_host,
+                                             keepalive_timeout=self.keepalive_timeout)
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    @property
+    def slots(self):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_in_flight)
+        return self._slots
+
+    def client(self, ip_address, port=7125, **kwargs):
+        return AsyncMoonrakerClient(ip_address, port, pool=self, **kwargs)
+
+    async def snapshot_all(self, clients):
+        """Polls every client concurrently; offline printers come back as 'offline' snapshots."""
+        return await asyncio.gather(*(c.snapshot() for c in clients))
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+
+class AsyncMoonrakerClient:
+    """
+    asyncio counterpart of MoonrakerClient with the same surface. Requests go
+    through the shared AsyncMoonrakerPool; timeouts and retries follow the
+    same per-endpoint EndpointPolicy table.
+    """
+    def __init__(self, ip_address, port=7125, pool=None, policies=None, snapshot_ttl=1.0, breaker=None):
+        self.base_url = f"http://{ip_address}:{port}"
+        self.logger = logging.getLogger("AsyncMoonrakerClient")
+        self.breaker = breaker or breaker_for(self.base_url)
+        self.pool = pool or AsyncMoonrakerPool()
+        self._owns_pool = pool is None
+
+        self.policies = {k: EndpointPolicy(p.timeout, p.retries, p.backoff)
+                         for k, p in DEFAULT_POLICIES.items()}
+        for name, policy in (policies or {}).items():
+            self.policies[name] = policy
+
+        self.snapshot_ttl = snapshot_ttl
+        self._last_snapshot = None
+
+    async def close(self):
+        if self._owns_pool:
+            await self.pool.close()
+
+    async def _request(self, endpoint, method, path, **kwargs):
+        """
+        Sends one request under the endpoint's policy and returns the decoded
+        JSON body. Shares the host's circuit breaker with the sync client.
+        """
+        policy = self.policies[endpoint]
+        url = f"{self.base_url}{path}"
+        timeout = aiohttp.ClientTimeout(total=policy.timeout)
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            t0 = time.monotonic()
+            try:
+                async with self.pool.slots:
+                    async with self.pool.session.request(method, url, timeout=timeout, **kwargs) as response:
+                        response.raise_for_status()
+                        body = await response.json(content_type=None)
+                self.breaker.record_success(time.monotonic() - t0)
+                PRINTER_LATENCY.observe(time.monotonic() - t0, endpoint=endpoint, outcome="ok")
+                return body
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError, aiohttp.ClientResponseError) as e:
+                outcome = ("http_error" if isinstance(e, aiohttp.ClientResponseError) else
+                           "timeout" if isinstance(e, asyncio.TimeoutError) else "connection_error")
+                PRINTER_LATENCY.observe(time.monotonic() - t0, endpoint=endpoint, outcome=outcome)
+                retryable = not isinstance(e, aiohttp.ClientResponseError) or e.status >= 500
+                if retryable:
+                    self.breaker.record_failure(time.monotonic() - t0)
+                else:
+                    self.breaker.record_success(time.monotonic() - t0)
+                if not retryable or attempt >= policy.retries:
+                    raise
+                await asyncio.sleep(policy.delay(attempt))
+                attempt += 1
+            except Exception:
+                # Other aiohttp.ClientErrors, a body that is not JSON (ValueError)...:
+                # count it, so a half-open probe always resolves
+                self.breaker.record_failure(time.monotonic() - t0)
+                PRINTER_LATENCY.observe(time.monotonic() - t0, endpoint=endpoint, outcome="error")
+                raise
+            except BaseException:
+                # Cancelled mid-probe: no verdict, but let the next call probe
+                self.breaker.release_probe()
+                raise
+
+    async def snapshot(self):
+        """Single-request printer snapshot; never raises (offline -> state 'offline')."""
+        query = "&".join(SNAPSHOT_OBJECTS)
+        try:
+            data = await self._request('query', 'GET', f"/printer/objects/query?{query}")
+            snap = PrinterSnapshot.from_status(data['result']['status'], time.time())
+        except Exception as e:
+            self.logger.debug(f"{self.base_url} unreachable: {e!r}")
+            snap = PrinterSnapshot(fetched_at=time.time())
+        self._last_snapshot = snap
+        return snap
+
+    async def recent_snapshot(self, max_age=None):
+        max_age = self.snapshot_ttl if max_age is None else max_age
+        snap = self._last_snapshot
+        if snap is None or time.time() - snap.fetched_at > max_age:
+            snap = await self.snapshot()
+        return snap
+
+    async def get_status(self):
+        return (await self.recent_snapshot()).state
+
+    async def get_progress(self):
+        return (await self.recent_snapshot()).progress
+
+    async def get_bed_temperature(self):
+        return (await self.recent_snapshot()).bed_temp
+
+    async def get_console_lines(self, limit=10):
+        try:
+            data = await self._request('gcode_store', 'GET', f"/server/gcode_store?count={int(limit)}")
+            return [entry['message'] for entry in data['result']['gcode_store']][-limit:]
+        except Exception:
+            return []
+
+    async def upload_gcode(self, gcode_content, filename="job.gcode"):
+        """Uploads G-code held in a string."""
+        return await self.upload_gcode_stream(gcode_content.encode(), filename)
+
+    async def upload_gcode_stream(self, source, filename="job.gcode", progress=None, chunk_size=UPLOAD_CHUNK_SIZE):
+        """
+        Streams G-code from bytes, a file path, a file object or a line
+        iterable. Blocking file reads run in a worker thread so the event loop
+        keeps serving the other printers.
+        """
+        body = MultipartStream(source, filename, fields={'root': 'gcodes'},
+                               chunk_size=chunk_size, progress=progress)
+
+        async def chunks():
+            it = iter(body)
+            while True:
+                chunk = await asyncio.to_thread(next, it, None)
+                if chunk is None:
+                    return
+                yield chunk
+
+        headers = {'Content-Type': body.content_type}
+        if body.len is not None:
+            headers['Content-Length'] = str(body.len)
+        try:
+            await self._request('upload', 'POST', "/server/files/upload", data=chunks(), headers=headers)
+            self.logger.info(f"Uploaded {filename} to {self.base_url}")
+            return True
+        except Exception as e:
+            self.logger.error(f"Upload failed: {e!r}")
+            return False
+
+    async def start_print(self, filename="job.gcode"):
+        self._last_snapshot = None
+        try:
+            await self._request('print_start', 'POST', "/printer/print/start", json={'filename': filename})
+            self.logger.info(f"Started print: {filename}")
+            return True
+        except Exception as e:
+            self.logger.error(f"Failed to start print: {e!r}")
+            return False
+
+    async def execute_gcode(self, gcode_command):
+        self._last_snapshot = None
+        try:
+            await self._request('gcode', 'POST', "/printer/gcode/script", json={'script': gcode_command})
+            return True
+        except Exception:
+            return False
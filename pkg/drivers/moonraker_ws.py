@@ -0,0 +1,249 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+
+from websockets.asyncio.client import connect
+from websockets.exceptions import ConnectionClosed
+
+from pkg.drivers.sv08_moonraker import SNAPSHOT_OBJECTS
+
+
+def merge_status(target, delta):
+    """Applies a `notify_status_update` delta onto the local object mirror."""
+    for obj_name, fields in delta.items():
+        current = target.setdefault(obj_name, {})
+        if isinstance(fields, dict):
+            current.update(fields)
+        else:
+            target[obj_name] = fields
+
+
+class MoonrakerSubscriber:
+    """
+    Push-based mirror of Klipper object state over Moonraker's websocket.
+    Subscribes once with `printer.objects.subscribe`, then keeps `status`
+    current from `notify_status_update` deltas. Reconnects (and re-subscribes)
+    automatically until `close()` is called.
+    """
+    def __init__(self, ip_address, port=7125, objects=SNAPSHOT_OBJECTS, reconnect_delay=2.0):
+        self.url = f"ws://{ip_address}:{port}/websocket"
+        self.objects = tuple(objects)
+        self.reconnect_delay = reconnect_delay
+        self.logger = logging.getLogger("MoonrakerWS")
+
+        self.status = {}
+        self.version = 0
+        self.connected = False
+        self.last_update = 0.0
+
+        self._ws = None
+        self._next_id = 0
+        self._pending = {}
+        self._changed = None
+        self._ready = None
+        self._runner = None
+        self._resubscriber = None
+        self._closing = False
+
+    # --- Lifecycle ---
+    async def start(self, timeout=5.0):
+        """Starts the connection loop and waits for the first subscription to land."""
+        self._changed = asyncio.Condition()
+        self._ready = asyncio.Event()
+        self._closing = False
+        self._runner = asyncio.ensure_future(self._run())
+        await asyncio.wait_for(self._ready.wait(), timeout)
+
+    async def close(self):
+        self._closing = True
+        if self._ws is not None:
+            await self._ws.close()
+        if self._resubscriber is not None:
+            self._resubscriber.cancel()
+        if self._runner is not None:
+            self._runner.cancel()
+            try:
+                await self._runner
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._runner = None
+
+    async def _run(self):
+        while not self._closing:
+            try:
+                async with connect(self.url, max_size=None) as ws:
+                    self._ws = ws
+                    reader = asyncio.ensure_future(self._read(ws))
+                    try:
+                        await self._subscribe()
+                        await reader
+                    finally:
+                        reader.cancel()
+            except (OSError, ConnectionClosed, asyncio.TimeoutError) as e:
+                if not self._closing:
+                    self.logger.warning(f"Websocket dropped ({e}). Reconnecting in {self.reconnect_delay}s")
+            except Exception as e:
+                # Rejected handshake, JSON-RPC error from the subscribe (Klippy not
+                # ready), malformed message...: same back-off, never give up the feed
+                if not self._closing:
+                    self.logger.error(f"Websocket session failed ({e!r}). Reconnecting in {self.reconnect_delay}s")
+            finally:
+                self._ws = None
+                await self._set_connected(False)
+                for fut in self._pending.values():
+                    if not fut.done():
+                        fut.set_exception(ConnectionError("websocket closed"))
+                self._pending.clear()
+            if not self._closing:
+                await asyncio.sleep(self.reconnect_delay)
+
+    async def _subscribe(self):
+        params = {"objects": {name: None for name in self.objects}}
+        result = await self.call("printer.objects.subscribe", params)
+        async with self._changed:
+            self.status = {}
+            merge_status(self.status, result.get('status', {}))
+            self._bump()
+        await self._set_connected(True)
+        self._ready.set()
+
+    async def _resubscribe(self, ws):
+        """After a Klipper restart: subscribe again, or drop the connection so _run reconnects and retries."""
+        try:
+            await self._subscribe()
+        except Exception as e:
+            if not self._closing:
+                self.logger.warning(f"Re-subscribe after Klipper restart failed ({e!r}). Reconnecting")
+                await ws.close()
+
+    async def _set_connected(self, value):
+        if self._changed is None or self.connected == value:
+            return
+        async with self._changed:
+            self.connected = value
+            self._bump()
+
+    def _bump(self):
+        self.version += 1
+        self.last_update = time.time()
+        self._changed.notify_all()
+
+    # --- JSON-RPC ---
+    async def call(self, method, params=None, timeout=5.0):
+        """Sends one JSON-RPC request and waits for its matching response."""
+        if self._ws is None:
+            raise ConnectionError("websocket not connected")
+        self._next_id += 1
+        req_id = self._next_id
+        fut = asyncio.get_running_loop().create_future()
+        self._pending[req_id] = fut
+        message = {"jsonrpc": "2.0", "method": method, "id": req_id}
+        if params is not None:
+            message["params"] = params
+        await self._ws.send(json.dumps(message))
+        try:
+            return await asyncio.wait_for(fut, timeout)
+        finally:
+            self._pending.pop(req_id, None)
+
+    async def _read(self, ws):
+        async for raw in ws:
+            msg = json.loads(raw)
+            if 'id' in msg:
+                fut = self._pending.get(msg['id'])
+                if fut is None or fut.done():
+                    continue
+                if 'error' in msg:
+                    fut.set_exception(RuntimeError(msg['error'].get('message', 'rpc error')))
+                else:
+                    fut.set_result(msg.get('result'))
+                continue
+
+            method = msg.get('method')
+            if method == 'notify_status_update':
+                delta = msg['params'][0]
+                async with self._changed:
+                    merge_status(self.status, delta)
+                    self._bump()
+            elif method == 'notify_klippy_ready':
+                # Klipper restarted underneath Moonraker: subscriptions are lost.
+                self._resubscriber = asyncio.ensure_future(self._resubscribe(ws))
+            elif method in ('notify_klippy_shutdown', 'notify_klippy_disconnected'):
+                async with self._changed:
+                    self.status.setdefault('print_stats', {})['state'] = 'error'
+                    self._bump()
+
+    # --- Mirror access ---
+    def get(self, path, default=None):
+        """Reads a dotted path such as 'print_stats.state' from the mirror."""
+        node = self.status
+        for part in path.split('.'):
+            if not isinstance(node, dict) or part not in node:
+                return default
+            node = node[part]
+        return node
+
+    async def wait_for(self, predicate, timeout=None):
+        """
+        Waits until `predicate(subscriber)` is true and returns True, or False
+        on timeout. The predicate is re-checked after every delta.
+        """
+        async def _wait():
+            async with self._changed:
+                await self._changed.wait_for(lambda: predicate(self))
+        try:
+            await asyncio.wait_for(_wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def wait_for_value(self, path, values, timeout=None):
+        """Waits until the value at `path` is one of `values`; returns it, or None on timeout."""
+        if isinstance(values, str):
+            values = (values,)
+        ok = await self.wait_for(lambda s: s.get(path) in values, timeout)
+        return self.get(path) if ok else None
+
+
+class SubscriptionThread:
+    """
+    Runs a MoonrakerSubscriber on a background event loop so synchronous
+    callers (the orchestrator) can block on state transitions.
+    """
+    def __init__(self, ip_address, port=7125, **kwargs):
+        self.subscriber = MoonrakerSubscriber(ip_address, port, **kwargs)
+        self.logger = logging.getLogger("MoonrakerWS")
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+
+    def start(self, timeout=5.0):
+        """Returns True once subscribed, False if the printer could not be reached in time."""
+        self._thread.start()
+        fut = asyncio.run_coroutine_threadsafe(self.subscriber.start(timeout), self._loop)
+        try:
+            fut.result(timeout + 1.0)
+            return True
+        except Exception as e:
+            self.logger.warning(f"Subscription unavailable: {e!r}")
+            return False
+
+    @property
+    def connected(self):
+        return self.subscriber.connected
+
+    def get(self, path, default=None):
+        return self.subscriber.get(path, default)
+
+    def wait_for_value(self, path, values, timeout=None):
+        fut = asyncio.run_coroutine_threadsafe(
+            self.subscriber.wait_for_value(path, values, timeout), self._loop)
+        return fut.result()
+
+    def stop(self):
+        fut = asyncio.run_coroutine_threadsafe(self.subscriber.close(), self._loop)
+        try:
+            fut.result(5.0)
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
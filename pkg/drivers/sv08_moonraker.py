@@ -1,55 +1,509 @@
 import requests
 import time
 import logging
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+import uuid
+from urllib.parse import quote
+from requests.adapters import HTTPAdapter
+
+from pkg.utils.metrics import REGISTRY
+
+
+class EndpointPolicy:
+    """Timeout and retry/backoff settings for one Moonraker endpoint."""
+    __slots__ = ('timeout', 'retries', 'backoff')
+
+    def __init__(self, timeout=2.0, retries=0, backoff=0.25):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+
+    def delay(self, attempt):
+        """Exponential backoff before retry number `attempt` (0-based)."""
+        return self.backoff * (2 ** attempt)
+
+
+# Reads are idempotent and cheap to retry; anything that moves the printer
+# or starts a job is sent exactly once.
+DEFAULT_POLICIES = {
+    'query': EndpointPolicy(timeout=2.0, retries=1, backoff=0.2),
+    'gcode_store': EndpointPolicy(timeout=2.0, retries=1, backoff=0.2),
+    'upload': EndpointPolicy(timeout=10.0, retries=0),
+    'print_start': EndpointPolicy(timeout=10.0, retries=0),
+    'gcode': EndpointPolicy(timeout=2.0, retries=0),
+    'files': EndpointPolicy(timeout=2.0, retries=1, backoff=0.2),
+}
+
+
+# Shared by the sync and async clients; `outcome` is ok, http_error, timeout,
+# connection_error or error (anything else). Calls refused by an open circuit breaker are not requests.
+PRINTER_LATENCY = REGISTRY.histogram("moonraker_request_duration_seconds",
+                                     "Round trip of each HTTP attempt to Moonraker", ("endpoint", "outcome"))
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """Raised instead of contacting a printer whose circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Per-host fast-fail guard. After `failure_threshold` consecutive failures
+    the circuit opens and calls fail immediately for `cooldown` seconds; then
+    a single half-open probe is let through, which either closes the circuit
+    or re-opens it for another cool-down.
+    """
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold=3, cooldown=10.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.total_failures = 0
+        self.short_circuited = 0
+        self.last_latency = None
+        self.opened_at = None
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Raises CircuitOpenError if the call must not reach the network."""
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+            if self.state != self.CLOSED:
+                self.short_circuited += 1
+                raise CircuitOpenError(f"circuit {self.state}; printer marked unreachable")
+
+    def record_success(self, latency):
+        with self._lock:
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self.last_latency = latency
+            self._probe_in_flight = False
+
+    def record_failure(self, latency):
+        with self._lock:
+            self.consecutive_failures += 1
+            self.total_failures += 1
+            self.last_latency = latency
+            self._probe_in_flight = False
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def release_probe(self):
+        """Ends a call that was interrupted (e.g. cancelled) without a verdict on the link."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def telemetry(self):
+        with self._lock:
+            retry_in = None
+            if self.state == self.OPEN:
+                retry_in = max(0.0, self.cooldown - (time.monotonic() - self.opened_at))
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "total_failures": self.total_failures,
+                "short_circuited": self.short_circuited,
+                "last_latency_ms": None if self.last_latency is None else round(self.last_latency * 1000, 1),
+                "retry_in_s": retry_in,
+            }
+
+
+_BREAKERS = {}
+_BREAKERS_LOCK = threading.Lock()
+
+
+def breaker_for(base_url, **kwargs):
+    """Returns the shared breaker for a printer host, creating it on first use."""
+    with _BREAKERS_LOCK:
+        if base_url not in _BREAKERS:
+            _BREAKERS[base_url] = CircuitBreaker(**kwargs)
+        return _BREAKERS[base_url]
+
+
+UPLOAD_CHUNK_SIZE = 256 * 1024
+
+
+class MultipartStream:
+    """
+    Lazily encoded multipart/form-data body for a G-code upload.
+    `source` may be a file path, a binary or text file object, or any
+    iterable of str/bytes lines; only one chunk is held in memory at a time.
+    When the payload size is known up front (paths, seekable binary files)
+    the body gets a Content-Length, otherwise requests sends it chunked.
+    """
+    def __init__(self, source, filename, fields=None, chunk_size=UPLOAD_CHUNK_SIZE, progress=None):
+        if isinstance(source, (bytes, bytearray)):
+            source = io.BytesIO(source)
+        self.source = source
+        self.filename = filename
+        self.fields = fields or {}
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={self.boundary}"
+        self.sent = 0
+
+        self._head = b"".join(
+            f"--{self.boundary}\r\nContent-Disposition: form-data; name=\"{k}\"\r\n\r\n{v}\r\n".encode()
+            for k, v in self.fields.items()
+        ) + (f"--{self.boundary}\r\nContent-Disposition: form-data; name=\"file\"; "
+             f"filename=\"{filename}\"\r\nContent-Type: application/octet-stream\r\n\r\n").encode()
+        self._tail = f"\r\n--{self.boundary}--\r\n".encode()
+
+        self.payload_size = self._payload_size()
+        # requests' super_len() reads `.len`; None means "stream it chunked".
+        self.len = None if self.payload_size is None else len(self._head) + self.payload_size + len(self._tail)
+
+    def _payload_size(self):
+        src = self.source
+        if isinstance(src, (str, os.PathLike)):
+            return os.path.getsize(src)
+        if hasattr(src, 'seek') and not isinstance(src, io.TextIOBase):
+            try:
+                pos = src.tell()
+                end = src.seek(0, os.SEEK_END)
+                src.seek(pos)
+                return end - pos
+            except (OSError, ValueError):
+                return None
+        return None
+
+    def _payload_chunks(self):
+        src = self.source
+        if isinstance(src, (str, os.PathLike)):
+            with open(src, 'rb') as f:
+                yield from iter(lambda: f.read(self.chunk_size), b"")
+            return
+        if hasattr(src, 'read'):
+            for block in iter(lambda: src.read(self.chunk_size), ""):
+                if not block:
+                    break
+                yield block.encode() if isinstance(block, str) else block
+            return
+        # Line iterator: coalesce into chunk-sized writes.
+        buf = bytearray()
+        for line in src:
+            buf += line.encode() if isinstance(line, str) else line
+            if len(buf) >= self.chunk_size:
+                yield bytes(buf)
+                buf.clear()
+        if buf:
+            yield bytes(buf)
+
+    def __iter__(self):
+        yield self._head
+        for chunk in self._payload_chunks():
+            self.sent += len(chunk)
+            if self.progress:
+                self.progress(self.sent, self.payload_size)
+            yield chunk
+        yield self._tail
+
+
+# Files uploaded by content hash are named rf_<first 16 hex chars of sha256>.gcode
+DEDUP_PREFIX = "rf_"
+
+
+def dedup_filename(digest):
+    return f"{DEDUP_PREFIX}{digest[:16]}.gcode"
+
+
+class UploadIndex:
+    """
+    Local map of G-code sha256 -> remote filename on the printer, so a repeat
+    upload costs at most one metadata request. Persisted as JSON when `path`
+    is given, otherwise kept in memory only.
+    """
+    def __init__(self, path=None):
+        self.path = path
+        self.entries = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r') as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError):
+                self.entries = {}
+
+    def get(self, digest):
+        return self.entries.get(digest)
+
+    def record(self, digest, filename, size):
+        now = time.time()
+        entry = self.entries.setdefault(digest, {"filename": filename, "size": size, "uploaded_at": now})
+        entry["last_used"] = now
+        self.save()
+
+    def forget(self, filename):
+        self.entries = {d: e for d, e in self.entries.items() if e["filename"] != filename}
+        self.save()
+
+    def last_used(self, filename):
+        for entry in self.entries.values():
+            if entry["filename"] == filename:
+                return entry.get("last_used", entry["uploaded_at"])
+        return None
+
+    def save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(self.entries, f, indent=1)
+        os.replace(tmp, self.path)
+
+
+def hash_source(source, chunk_size=UPLOAD_CHUNK_SIZE):
+    """
+    Returns (sha256 hexdigest, size, replayable source) for an upload source.
+    Paths, bytes and seekable binary files are hashed in place and rewound;
+    text files and line generators are spooled to a temporary file while
+    hashing so they can be read a second time for the upload.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    if isinstance(source, (bytes, bytearray)):
+        digest.update(source)
+        return digest.hexdigest(), len(source), source
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            for block in iter(lambda: f.read(chunk_size), b""):
+                digest.update(block)
+                size += len(block)
+        return digest.hexdigest(), size, source
+    if hasattr(source, 'seek') and not isinstance(source, io.TextIOBase):
+        start = source.tell()
+        for block in iter(lambda: source.read(chunk_size), b""):
+            digest.update(block)
+            size += len(block)
+        source.seek(start)
+        return digest.hexdigest(), size, source
+
+    spool = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+    blocks = iter(lambda: source.read(chunk_size), "") if hasattr(source, 'read') else source
+    for block in blocks:
+        if not block:
+            break
+        data = block.encode() if isinstance(block, str) else block
+        digest.update(data)
+        spool.write(data)
+        size += len(data)
+    spool.seek(0)
+    return digest.hexdigest(), size, spool
+
+
+# Every Klipper object the orchestrator reads, fetched in one round trip.
+SNAPSHOT_OBJECTS = ('print_stats', 'display_status', 'heater_bed', 'extruder', 'virtual_sdcard')
+
+
+class PrinterSnapshot:
+    """Typed view of one `/printer/objects/query` response."""
+    __slots__ = ('state', 'progress', 'bed_temp', 'bed_target', 'extruder_temp',
+                 'extruder_target', 'filename', 'print_duration', 'file_position',
+                 'fetched_at')
+
+    def __init__(self, state="offline", progress=0.0, bed_temp=999.0, bed_target=0.0,
+                 extruder_temp=0.0, extruder_target=0.0, filename="", print_duration=0.0,
+                 file_position=0, fetched_at=0.0):
+        self.state = state
+        self.progress = progress
+        self.bed_temp = bed_temp
+        self.bed_target = bed_target
+        self.extruder_temp = extruder_temp
+        self.extruder_target = extruder_target
+        self.filename = filename
+        self.print_duration = print_duration
+        self.file_position = file_position
+        self.fetched_at = fetched_at
+
+    @classmethod
+    def from_status(cls, status, fetched_at):
+        print_stats = status.get('print_stats', {})
+        display = status.get('display_status', {})
+        bed = status.get('heater_bed', {})
+        extruder = status.get('extruder', {})
+        sdcard = status.get('virtual_sdcard', {})
+        return cls(
+            state=print_stats.get('state', 'offline'),
+            progress=float(display.get('progress', 0.0)),
+            bed_temp=float(bed.get('temperature', 999.0)),
+            bed_target=float(bed.get('target', 0.0)),
+            extruder_temp=float(extruder.get('temperature', 0.0)),
+            extruder_target=float(extruder.get('target', 0.0)),
+            filename=print_stats.get('filename', ''),
+            print_duration=float(print_stats.get('print_duration', 0.0)),
+            file_position=int(sdcard.get('file_position', 0)),
+            fetched_at=fetched_at,
+        )
+
+    @property
+    def online(self):
+        return self.state != "offline"
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        return (f"PrinterSnapshot(state={self.state!r}, progress={self.progress:.3f}, "
+                f"bed={self.bed_temp:.1f}C)")
+
 
 class MoonrakerClient:
-    def __init__(self, ip_address, port=7125):
+    def __init__(self, ip_address, port=7125, policies=None, pool_maxsize=4, snapshot_ttl=1.0,
+                 upload_index=None, breaker=None):
         self.base_url = f"http://{ip_address}:{port}"
         self.logger = logging.getLogger("MoonrakerClient")
+        self.breaker = breaker or breaker_for(self.base_url)
+        self.upload_index = upload_index if upload_index is not None else UploadIndex()
 
-    def get_status(self):
+        # The single-value getters below are views over a snapshot no older
+        # than this, so calling all of them in one tick costs one request.
+        self.snapshot_ttl = snapshot_ttl
+        self._last_snapshot = None
+        self._console_cursor = None
+
+        self.policies = {k: EndpointPolicy(p.timeout, p.retries, p.backoff)
+                         for k, p in DEFAULT_POLICIES.items()}
+        for name, policy in (policies or {}).items():
+            self.policies[name] = policy
+
+        # One keep-alive pool per client: every poll reuses the same TCP
+        # connection instead of paying a handshake on the Moonraker host.
+        self.session = requests.Session()
+        self._adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount("http://", self._adapter)
+        self.session.mount("https://", self._adapter)
+        self.session.headers.update({'Connection': 'keep-alive'})
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _request(self, endpoint, method, path, **kwargs):
         """
-        Queries Klipper for the current print status.
-        Returns: 'standby', 'printing', 'paused', 'complete', 'error'
+        Sends one request using the policy registered for `endpoint`.
+        Connection errors, timeouts and 5xx responses are retried with
+        exponential backoff; the last exception is re-raised. Every attempt
+        goes through the host's circuit breaker, so an unreachable printer
+        fails fast with CircuitOpenError instead of waiting out timeouts.
+        """
+        policy = self.policies[endpoint]
+        url = f"{self.base_url}{path}"
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            t0 = time.monotonic()
+            try:
+                response = self.session.request(method, url, timeout=policy.timeout, **kwargs)
+                response.raise_for_status()
+                self.breaker.record_success(time.monotonic() - t0)
+                PRINTER_LATENCY.observe(time.monotonic() - t0, endpoint=endpoint, outcome="ok")
+                return response
+            except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+                outcome = ("http_error" if isinstance(e, requests.HTTPError) else
+                           "timeout" if isinstance(e, requests.Timeout) else "connection_error")
+                PRINTER_LATENCY.observe(time.monotonic() - t0, endpoint=endpoint, outcome=outcome)
+                retryable = not isinstance(e, requests.HTTPError) or e.response.status_code >= 500
+                if retryable:
+                    self.breaker.record_failure(time.monotonic() - t0)
+                else:
+                    # The printer answered; a 4xx is our problem, not the link's.
+                    self.breaker.record_success(time.monotonic() - t0)
+                if not retryable or attempt >= policy.retries:
+                    raise
+                time.sleep(policy.delay(attempt))
+                attempt += 1
+            except Exception:
+                # Broken body (ChunkedEncodingError, ContentDecodingError...) or
+                # anything else: count it, so a half-open probe always resolves
+                self.breaker.record_failure(time.monotonic() - t0)
+                PRINTER_LATENCY.observe(time.monotonic() - t0, endpoint=endpoint, outcome="error")
+                raise
+            except BaseException:
+                self.breaker.release_probe()
+                raise
+
+    def connection_stats(self):
+        """
+        Returns how many TCP connections were opened to the printer versus
+        how many requests reused an already open one.
         """
-        url = f"{self.base_url}/printer/objects/query?print_stats"
+        pools = self._adapter.poolmanager.pools
+        opened = total = 0
+        for key in pools.keys():
+            pool = pools[key]
+            opened += pool.num_connections
+            total += pool.num_requests
+        return {"opened": opened, "requests": total, "reused": max(total - opened, 0)}
+
+    def link_telemetry(self):
+        """Circuit breaker state plus connection reuse counters, for the dashboard."""
+        return dict(self.breaker.telemetry(), **self.connection_stats())
+
+    def snapshot(self):
+        """
+        Fetches print state, progress, temperatures and file position in a
+        single `/printer/objects/query` request. Never raises: an unreachable
+        printer yields a snapshot with state 'offline'.
+        """
+        query = "&".join(SNAPSHOT_OBJECTS)
         try:
-            response = requests.get(url, timeout=2)
-            response.raise_for_status()
-            data = response.json()
-            state = data['result']['status']['print_stats']['state']
-            return state
+            response = self._request('query', 'GET', f"/printer/objects/query?{query}")
+            status = response.json()['result']['status']
+            snap = PrinterSnapshot.from_status(status, time.time())
+        except CircuitOpenError as e:
+            self.logger.debug(f"Skipped poll: {e}")
+            snap = PrinterSnapshot(fetched_at=time.time())
         except Exception as e:
             self.logger.error(f"Connection failed: {e}")
-            return "offline"
+            snap = PrinterSnapshot(fetched_at=time.time())
+        self._last_snapshot = snap
+        return snap
+
+    def recent_snapshot(self, max_age=None):
+        """Returns the cached snapshot if it is younger than `max_age` seconds, else a fresh one."""
+        max_age = self.snapshot_ttl if max_age is None else max_age
+        snap = self._last_snapshot
+        if snap is None or time.time() - snap.fetched_at > max_age:
+            snap = self.snapshot()
+        return snap
+
+    def get_status(self):
+        """
+        Queries Klipper for the current print status.
+        Returns: 'standby', 'printing', 'paused', 'complete', 'error'
+        """
+        return self.recent_snapshot().state
 
     def get_progress(self):
         """Returns the print progress as a percentage (0.0 to 1.0)."""
-        url = f"{self.base_url}/printer/objects/query?display_status"
-        try:
-            response = requests.get(url, timeout=2)
-            data = response.json()
-            progress = data['result']['status']['display_status']['progress']
-            return progress
-        except Exception:
-            return 0.0
+        return self.recent_snapshot().progress
 
     def get_bed_temperature(self):
         """Returns the current bed temperature in Celsius."""
-        url = f"{self.base_url}/printer/objects/query?heater_bed"
-        try:
-            response = requests.get(url, timeout=2)
-            data = response.json()
-            temp = data['result']['status']['heater_bed']['temperature']
-            return float(temp)
-        except Exception:
-            return 999.0 
+        return self.recent_snapshot().bed_temp
 
     def get_console_lines(self, limit=10):
         """Fetches the last N lines from the Klipper G-Code console."""
-        url = f"{self.base_url}/server/gcode_store"
         try:
-            response = requests.get(url, timeout=2)
+            response = self._request('gcode_store', 'GET', f"/server/gcode_store?count={int(limit)}")
             data = response.json()
             logs = data['result']['gcode_store']
             messages = [entry['message'] for entry in logs]
@@ -57,28 +511,173 @@ class MoonrakerClient:
         except Exception:
             return []
 
+    def tail_console(self, count=8, max_count=512):
+        """
+        Incremental console tail. Returns only messages newer than the previous
+        call, using the last seen entry timestamp as cursor. Asks Moonraker
+        for `count` entries and doubles the window (up to `max_count`) only
+        when every returned entry is new, i.e. a burst may have been missed.
+        The first call returns the latest `count` messages.
+        """
+        window = count
+        while True:
+            try:
+                response = self._request('gcode_store', 'GET', f"/server/gcode_store?count={window}")
+                entries = response.json()['result']['gcode_store']
+            except Exception:
+                return []
+            if self._console_cursor is None:
+                fresh = entries
+                break
+            fresh = self._entries_after_cursor(entries)
+            if len(fresh) < len(entries) or len(entries) < window or window >= max_count:
+                break
+            window = min(window * 2, max_count)
+
+        if entries:
+            last_time = entries[-1]['time']
+            same = sum(1 for e in entries if e['time'] == last_time)
+            self._console_cursor = (last_time, same)
+        elif self._console_cursor is None:
+            self._console_cursor = (0.0, 0)
+        return [e['message'] for e in fresh]
+
+    def _entries_after_cursor(self, entries):
+        cursor_time, seen_at_cursor = self._console_cursor
+        fresh = []
+        skip = seen_at_cursor
+        for e in entries:
+            if e['time'] > cursor_time:
+                fresh.append(e)
+            elif e['time'] == cursor_time:
+                # Several entries can share a timestamp; skip the ones already returned.
+                if skip > 0:
+                    skip -= 1
+                else:
+                    fresh.append(e)
+        return fresh
+
     def upload_gcode(self, gcode_content, filename="job.gcode"):
         """Uploads G-code string to the printer."""
-        url = f"{self.base_url}/server/files/upload"
         files = {'file': (filename, gcode_content, 'application/octet-stream')}
-        data = {'root': 'gcodes'} 
-        
+        data = {'root': 'gcodes'}
+
         try:
-            response = requests.post(url, files=files, data=data, timeout=10) # Increased to 10s
-            response.raise_for_status()
+            self._request('upload', 'POST', "/server/files/upload", files=files, data=data)
             self.logger.info(f"Uploaded {filename}")
             return True
         except Exception as e:
             self.logger.error(f"Upload failed: {e}")
             return False
 
+    def upload_gcode_stream(self, source, filename="job.gcode", progress=None, chunk_size=UPLOAD_CHUNK_SIZE):
+        """
+        Streams G-code to the printer from a file path, file object or line
+        generator in constant memory. `progress(sent_bytes, total_bytes)` is
+        called after every chunk; total is None for generators.
+        """
+        body = MultipartStream(source, filename, fields={'root': 'gcodes'},
+                               chunk_size=chunk_size, progress=progress)
+        try:
+            self._request('upload', 'POST', "/server/files/upload", data=body,
+                          headers={'Content-Type': body.content_type})
+            self.logger.info(f"Uploaded {filename} ({body.sent / 1e6:.1f} MB, streamed)")
+            return True
+        except Exception as e:
+            self.logger.error(f"Upload failed: {e}")
+            return False
+
+    def remote_file_exists(self, filename):
+        """Checks the printer's gcodes root for `filename` with one metadata request."""
+        try:
+            self._request('files', 'GET', f"/server/files/metadata?filename={quote(filename)}")
+            return True
+        except requests.HTTPError as e:
+            if e.response is not None and e.response.status_code == 404:
+                return False
+            raise
+
+    def upload_gcode_dedup(self, source, progress=None, digest=None, size=None):
+        """
+        Content-addressed upload: hashes the G-code and skips the transfer when
+        the printer already holds a file with the hash-derived name. Accepts
+        the same sources as upload_gcode_stream() plus raw bytes. When the
+        sha256 `digest` is already known, hashing is skipped and `source` may
+        be a zero-argument callable that is only invoked (e.g. to download the
+        file) if the printer does not have it yet. Returns the remote filename
+        to print, or None if the upload failed.
+        """
+        if digest is None:
+            digest, size, replay = hash_source(source)
+        else:
+            replay = source
+        entry = self.upload_index.get(digest)
+        filename = entry["filename"] if entry else dedup_filename(digest)
+        try:
+            exists = self.remote_file_exists(filename)
+        except Exception as e:
+            self.logger.warning(f"Dedup lookup failed ({e}); uploading anyway")
+            exists = False
+
+        if exists:
+            self.logger.info(f"Skipped upload: printer already has {filename}"
+                             + (f" ({size / 1e6:.1f} MB)" if size is not None else ""))
+        else:
+            if callable(replay):
+                replay = replay()
+            if not self.upload_gcode_stream(replay, filename, progress=progress):
+                return None
+        self.upload_index.record(digest, filename, size)
+        return filename
+
+    def list_files(self, root="gcodes"):
+        """Returns the printer's file list as [{'path', 'modified', 'size'}, ...]."""
+        response = self._request('files', 'GET', f"/server/files/list?root={root}")
+        return response.json()['result']
+
+    def delete_file(self, filename, root="gcodes"):
+        self._request('files', 'DELETE', f"/server/files/{root}/{quote(filename)}")
+
+    def gc_remote_files(self, max_age_s=7 * 86400, keep=20):
+        """
+        Deletes content-addressed uploads that have not been used for
+        `max_age_s`, always keeping the `keep` most recently used ones and the
+        file currently loaded for printing. Files without the dedup prefix are
+        never touched. Returns the list of deleted filenames.
+        """
+        try:
+            files = [f for f in self.list_files() if f['path'].startswith(DEDUP_PREFIX)]
+        except Exception as e:
+            self.logger.warning(f"File GC skipped: {e}")
+            return []
+
+        def used_at(f):
+            last = self.upload_index.last_used(f['path'])
+            return last if last is not None else f.get('modified', 0.0)
+
+        files.sort(key=used_at, reverse=True)
+        active = self.recent_snapshot().filename
+        cutoff = time.time() - max_age_s
+        deleted = []
+        for f in files[keep:]:
+            if f['path'] == active or used_at(f) >= cutoff:
+                continue
+            try:
+                self.delete_file(f['path'])
+                self.upload_index.forget(f['path'])
+                deleted.append(f['path'])
+            except Exception as e:
+                self.logger.warning(f"Failed to delete {f['path']}: {e}")
+        if deleted:
+            self.logger.info(f"File GC removed {len(deleted)} stale uploads")
+        return deleted
+
     def start_print(self, filename="job.gcode"):
         """Starts printing the specified file."""
-        url = f"{self.base_url}/printer/print/start"
         payload = {'filename': filename}
+        self._last_snapshot = None
         try:
-            # FIX: Increased timeout from 2s to 10s
-            requests.post(url, json=payload, timeout=10)
+            self._request('print_start', 'POST', "/printer/print/start", json=payload)
             self.logger.info(f"Started print: {filename}")
             return True
         except Exception as e:
@@ -87,10 +686,10 @@ class MoonrakerClient:
 
     def execute_gcode(self, gcode_command):
         """Sends a raw G-code command."""
-        url = f"{self.base_url}/printer/gcode/script"
         payload = {'script': gcode_command}
+        self._last_snapshot = None
         try:
-            requests.post(url, json=payload, timeout=2)
+            self._request('gcode', 'POST', "/printer/gcode/script", json=payload)
             return True
         except Exception:
-            return False
\ No newline at end of file
+            return False
@@ -0,0 +1,195 @@
+import math
+
+from pkg.gcode.modes import PositioningModes
+
+# Byte values of the G-code words we care about (lines are parsed as bytes).
+_X, _Y, _Z, _E, _F = (ord(c) for c in "XYZEF")
+_SEMI = b";"
+_G92_AXES = {_X: 'x', _Y: 'y', _Z: 'z', _E: 'e'}
+
+
+class GcodeAnalysis:
+    """Result of one analysis pass. Distances in mm, times in seconds."""
+    __slots__ = ('lines', 'bytes', 'moves', 'extrusion_mm', 'filament_g', 'filament_cm3',
+                 'travel_mm', 'print_mm', 'print_time_s', 'dwell_s', 'heat_waits', 'max_z')
+
+    def __init__(self):
+        for name in self.__slots__:
+            setattr(self, name, 0)
+
+    def as_dict(self):
+        return {name: (round(v, 3) if isinstance(v, float) else v)
+                for name, v in ((n, getattr(self, n)) for n in self.__slots__)}
+
+
+class GcodeAnalyzer:
+    """
+    Streaming G-code analyzer. Feed it raw lines (bytes) one at a time; it
+    keeps only the machine state, so memory stays constant for any file size.
+
+    Tracks G90/G91 and M82/M83 with Klipper's rules (see PositioningModes),
+    G92 re-zeroing, net extrusion, travel vs. printing distance and G4
+    dwells. Print time uses a trapezoidal
+    velocity profile per move with a cornering speed derived from the angle
+    to the previous move, a cheap stand-in for Klipper's lookahead.
+    """
+    def __init__(self, filament_diameter=1.75, density=1.24, accel=3000.0,
+                 square_corner_velocity=5.0, default_feed=1500.0):
+        self.filament_area = math.pi * (filament_diameter / 2.0) ** 2   # mm^2
+        self.density = density                                        # g/cm^3
+        self.accel = accel                                            # mm/s^2
+        self.scv = square_corner_velocity                             # mm/s
+        self.result = GcodeAnalysis()
+
+        self.x = self.y = self.z = self.e = 0.0
+        self.feed = default_feed / 60.0                               # mm/s
+        self.modes = PositioningModes()
+        self.abs_xyz = self.modes.abs_xyz
+        self.abs_e = self.modes.abs_e
+        self.cmd = b""                                                # Last command word seen
+        # Direction and speed of the previous move, for junction speeds
+        self._ux = self._uy = self._uz = 0.0
+        self._v_prev = 0.0
+
+    # --- Time model ---
+    def _move_time(self, dist, v, ux, uy, uz):
+        """Trapezoid with equal entry/exit speed at the junction with the previous move."""
+        cos_theta = ux * self._ux + uy * self._uy + uz * self._uz
+        v_junction = min(v, self._v_prev) * cos_theta if cos_theta > 0.0 else 0.0
+        if v_junction < self.scv:
+            v_junction = min(self.scv, v)
+        self._ux, self._uy, self._uz, self._v_prev = ux, uy, uz, v
+
+        a = self.accel
+        ramp = (v * v - v_junction * v_junction) / a
+        if dist >= ramp:
+            return dist / v + (v - v_junction) ** 2 / (a * v)
+        v_peak = math.sqrt(v_junction * v_junction + a * dist)
+        return 2.0 * (v_peak - v_junction) / a
+
+    # --- Parsing ---
+    def feed_line(self, line):
+        """
+        Processes one raw line (bytes). Returns the estimated seconds the
+        line takes to execute (0.0 for non-moves), so callers such as the
+        layer indexer can accumulate time per byte offset.
+        """
+        if _SEMI in line:
+            line = line.split(_SEMI, 1)[0]
+        words = line.split()
+        if not words:
+            return 0.0
+        res = self.result
+        res.lines += 1
+        cmd = self.cmd = words[0].upper()
+
+        if cmd == b"G1" or cmd == b"G0":
+            return self._move(words)
+        if cmd == b"G4":
+            dwell = 0.0
+            for w in words[1:]:
+                c = w[0] | 0x20  # lower-case
+                try:
+                    if c == 0x70:    # p: milliseconds
+                        dwell += float(w[1:]) / 1000.0
+                    elif c == 0x73:  # s: seconds
+                        dwell += float(w[1:])
+                except ValueError:
+                    continue
+            res.dwell_s += dwell
+            res.print_time_s += dwell
+            self._v_prev = 0.0
+            return dwell
+        if self.modes.update(cmd):
+            self.abs_xyz = self.modes.abs_xyz
+            self.abs_e = self.modes.abs_e
+        elif cmd == b"G92":
+            axes = [w for w in words[1:] if w[0] & 0xDF in _G92_AXES]
+            if not axes:
+                # Bare G92: the current position becomes zero on every axis
+                self.x = self.y = self.z = self.e = 0.0
+            for w in axes:
+                try:
+                    setattr(self, _G92_AXES[w[0] & 0xDF], float(w[1:]))
+                except ValueError:
+                    continue
+        elif cmd == b"G28":
+            self.x = self.y = self.z = 0.0
+            self._v_prev = 0.0
+        elif cmd == b"M109" or cmd == b"M190":
+            res.heat_waits += 1
+            self._v_prev = 0.0
+        return 0.0
+
+    def _move(self, words):
+        nx, ny, nz = self.x, self.y, self.z
+        de = 0.0
+        for w in words[1:]:
+            c = w[0] & 0xDF
+            try:
+                v = float(w[1:])
+            except ValueError:
+                continue
+            if c == _X:
+                nx = v if self.abs_xyz else nx + v
+            elif c == _Y:
+                ny = v if self.abs_xyz else ny + v
+            elif c == _Z:
+                nz = v if self.abs_xyz else nz + v
+            elif c == _E:
+                de = v - self.e if self.abs_e else v
+            elif c == _F:
+                if v > 0.0:
+                    self.feed = v / 60.0
+
+        dx, dy, dz = nx - self.x, ny - self.y, nz - self.z
+        self.x, self.y, self.z = nx, ny, nz
+        self.e += de
+        res = self.result
+        res.moves += 1
+        res.extrusion_mm += de
+        if nz > res.max_z:
+            res.max_z = nz
+
+        dist = math.sqrt(dx * dx + dy * dy + dz * dz)
+        if dist > 0.0:
+            if de > 0.0:
+                res.print_mm += dist
+            else:
+                res.travel_mm += dist
+            t = self._move_time(dist, self.feed, dx / dist, dy / dist, dz / dist)
+        elif de != 0.0:
+            # Extrude-only move (retract, prime, or FGF purge)
+            self._v_prev = 0.0
+            t = self._move_time(abs(de), self.feed, 0.0, 0.0, 0.0)
+            self._v_prev = 0.0
+        else:
+            return 0.0
+        res.print_time_s += t
+        return t
+
+    def finish(self):
+        """Finalizes derived totals and returns the GcodeAnalysis."""
+        res = self.result
+        res.filament_cm3 = res.extrusion_mm * self.filament_area / 1000.0
+        res.filament_g = res.filament_cm3 * self.density
+        return res
+
+
+def analyze_stream(lines, **kwargs):
+    """Analyzes any iterable of byte lines (e.g. a file opened in 'rb')."""
+    analyzer = GcodeAnalyzer(**kwargs)
+    nbytes = 0
+    feed = analyzer.feed_line
+    for line in lines:
+        nbytes += len(line)
+        feed(line)
+    res = analyzer.finish()
+    res.bytes = nbytes
+    return res
+
+
+def analyze_file(path, **kwargs):
+    """Analyzes a G-code file in constant memory."""
+    with open(path, 'rb', buffering=1024 * 1024) as f:
+        return analyze_stream(f, **kwargs)
@@ -0,0 +1,194 @@
+import json
+from array import array
+from bisect import bisect_right
+
+from pkg.gcode.analyzer import GcodeAnalyzer
+
+EVENT_HEAT_WAIT = 1  # M109 / M190
+EVENT_DWELL = 2      # G4
+
+CHECKPOINT_BYTES = 64 * 1024  # Max gap between time checkpoints
+MIN_LAYER_STEP = 0.05   # mm; smaller Z rises (vase mode, mesh compensation) do not start a layer
+
+
+class GcodeIndex:
+    """
+    Compact byte-offset index of one G-code file, built in the same pass as
+    the analysis. Everything lives in typed arrays, so even a 100 MB file
+    indexes to a few hundred KB.
+
+    - checkpoints: (offset, estimated seconds elapsed before that byte),
+      monotonic, at every event and at least every CHECKPOINT_BYTES
+    - layers: offset of the first extruding move at each new Z, plus the
+      Z, E and elapsed time there (enough to resume from that layer)
+    - events: offsets of heat waits and dwells, whose real duration the
+      time estimate cannot know
+    """
+    def __init__(self):
+        self.cp_offsets = array('Q')
+        self.cp_times = array('d')
+        self.layer_offsets = array('Q')
+        self.layer_z = array('d')
+        self.layer_e = array('d')
+        self.layer_times = array('d')
+        self.event_offsets = array('Q')
+        self.event_kinds = array('B')
+        self.total_bytes = 0
+        self.total_time = 0.0
+        self.abs_e = True  # E mode at the end of the prologue, for resume preambles
+
+    @property
+    def layer_count(self):
+        return len(self.layer_offsets)
+
+    def elapsed_at(self, file_position):
+        """Estimated print seconds done once Klipper has read up to `file_position`."""
+        if file_position >= self.total_bytes:
+            return self.total_time
+        i = bisect_right(self.cp_offsets, file_position) - 1
+        if i < 0:
+            return 0.0
+        o0, t0 = self.cp_offsets[i], self.cp_times[i]
+        if i + 1 < len(self.cp_offsets):
+            o1, t1 = self.cp_offsets[i + 1], self.cp_times[i + 1]
+        else:
+            o1, t1 = self.total_bytes, self.total_time
+        if o1 <= o0:
+            return t0
+        return t0 + (t1 - t0) * (file_position - o0) / (o1 - o0)
+
+    def progress_at(self, file_position):
+        """Layer and time-based progress for a live virtual_sdcard.file_position."""
+        elapsed = self.elapsed_at(file_position)
+        pending = len(self.event_kinds) - bisect_right(self.event_offsets, file_position)
+        pending_heat = sum(1 for k in self.event_kinds[len(self.event_kinds) - pending:] if k == EVENT_HEAT_WAIT)
+        return {
+            "layer": bisect_right(self.layer_offsets, file_position),
+            "layer_count": self.layer_count,
+            "elapsed_s": round(elapsed, 1),
+            "remaining_s": round(max(0.0, self.total_time - elapsed), 1),
+            "fraction": elapsed / self.total_time if self.total_time > 0 else 0.0,
+            "pending_heat_waits": pending_heat,
+        }
+
+    def resume_point(self, layer):
+        """
+        Where to restart a failed print at `layer` (1-based). Returns
+        (byte_offset, preamble) where preamble is the G-code to send before
+        streaming the file from byte_offset: it restores the E axis and lifts
+        to the layer height. Heating and homing are left to the operator.
+        """
+        if not 1 <= layer <= self.layer_count:
+            raise ValueError(f"Layer {layer} out of range 1..{self.layer_count}")
+        i = layer - 1
+        z, e = self.layer_z[i], self.layer_e[i]
+        preamble = [
+            "G90",
+            "M82" if self.abs_e else "M83",
+            f"G92 E{e:.5f}" if self.abs_e else "G92 E0",
+            f"G1 Z{z:.3f} F600",
+        ]
+        return self.layer_offsets[i], preamble
+
+    def summary(self):
+        return {
+            "total_bytes": self.total_bytes,
+            "total_time_s": round(self.total_time, 1),
+            "layer_count": self.layer_count,
+            "heat_waits": sum(1 for k in self.event_kinds if k == EVENT_HEAT_WAIT),
+            "dwells": sum(1 for k in self.event_kinds if k == EVENT_DWELL),
+            "size_bytes": sum(a.itemsize * len(a) for a in self._arrays().values()),
+        }
+
+    # --- Persistence (JSON header line followed by the raw arrays) ---
+    def _arrays(self):
+        return {name: getattr(self, name) for name in
+                ('cp_offsets', 'cp_times', 'layer_offsets', 'layer_z', 'layer_e',
+                 'layer_times', 'event_offsets', 'event_kinds')}
+
+    def save(self, path):
+        arrays = self._arrays()
+        header = {"total_bytes": self.total_bytes, "total_time": self.total_time, "abs_e": self.abs_e,
+                  "lengths": {name: len(a) for name, a in arrays.items()}}
+        with open(path, 'wb') as f:
+            f.write(json.dumps(header).encode() + b"\n")
+            for a in arrays.values():
+                a.tofile(f)
+
+    @classmethod
+    def load(cls, path):
+        index = cls()
+        with open(path, 'rb') as f:
+            header = json.loads(f.readline())
+            index.total_bytes = header['total_bytes']
+            index.total_time = header['total_time']
+            index.abs_e = header['abs_e']
+            for name, a in index._arrays().items():
+                a.fromfile(f, header['lengths'][name])
+        return index
+
+
+def index_stream(lines, **analyzer_kwargs):
+    """
+    One pass over byte lines: returns (GcodeIndex, GcodeAnalysis). Accepts
+    the same keyword arguments as GcodeAnalyzer.
+    """
+    analyzer = GcodeAnalyzer(**analyzer_kwargs)
+    index = GcodeIndex()
+    feed = analyzer.feed_line
+    res = analyzer.result
+    cp_offsets, cp_times = index.cp_offsets, index.cp_times
+    offset = 0
+    elapsed = 0.0
+    next_cp = 0
+    layer_z = None
+    abs_e_seen = False
+    extruded = 0.0
+
+    for line in lines:
+        t = feed(line)
+        cmd = analyzer.cmd
+        if cmd == b"M109" or cmd == b"M190" or cmd == b"G4":
+            index.event_offsets.append(offset)
+            index.event_kinds.append(EVENT_HEAT_WAIT if cmd != b"G4" else EVENT_DWELL)
+            cp_offsets.append(offset)
+            cp_times.append(elapsed)
+            elapsed += t
+            offset += len(line)
+            cp_offsets.append(offset)
+            cp_times.append(elapsed)
+            next_cp = offset + CHECKPOINT_BYTES
+            analyzer.cmd = b""
+            continue
+        if t and res.extrusion_mm > extruded:
+            z = analyzer.z
+            if layer_z is None or z > layer_z + MIN_LAYER_STEP:
+                layer_z = z
+                if not abs_e_seen:
+                    index.abs_e = analyzer.abs_e
+                    abs_e_seen = True
+                index.layer_offsets.append(offset)
+                index.layer_z.append(z)
+                # E position before this move, so the resumed move re-extrudes its segment
+                index.layer_e.append(analyzer.e - (res.extrusion_mm - extruded))
+                index.layer_times.append(elapsed)
+        extruded = res.extrusion_mm
+        if offset >= next_cp:
+            cp_offsets.append(offset)
+            cp_times.append(elapsed)
+            next_cp = offset + CHECKPOINT_BYTES
+        elapsed += t
+        offset += len(line)
+        analyzer.cmd = b""
+
+    analysis = analyzer.finish()
+    analysis.bytes = offset
+    index.total_bytes = offset
+    index.total_time = elapsed
+    return index, analysis
+
+
+def index_file(path, **analyzer_kwargs):
+    """Indexes a G-code file in constant memory (apart from the index itself)."""
+    with open(path, 'rb', buffering=1024 * 1024) as f:
+        return index_stream(f, **analyzer_kwargs)
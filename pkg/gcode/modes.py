@@ -0,0 +1,48 @@
+class PositioningModes:
+    """
+    Absolute/relative positioning the way Klipper's gcode_move tracks it:
+    G90/G91 set only `absolute_coord`, M82/M83 only `absolute_extrude`, and
+    E moves are relative if either one is off (so after M83, E stays
+    relative through a later G90). A mode of None means unknown.
+
+    `abs_xyz` and `abs_e` are the resulting modes for XYZ and E words (True,
+    False or None), kept as plain attributes for the parsers' hot loops.
+    """
+    __slots__ = ('absolute_coord', 'absolute_extrude', 'abs_xyz', 'abs_e')
+
+    def __init__(self, absolute_coord=True, absolute_extrude=True):
+        self.absolute_coord = absolute_coord
+        self.absolute_extrude = absolute_extrude
+        self._derive()
+
+    def _derive(self):
+        self.abs_xyz = self.absolute_coord
+        if self.absolute_coord is False or self.absolute_extrude is False:
+            self.abs_e = False
+        elif self.absolute_coord and self.absolute_extrude:
+            self.abs_e = True
+        else:
+            self.abs_e = None
+
+    def update(self, cmd):
+        """Applies G90/G91/M82/M83 (upper-case bytes). Returns False for any other command."""
+        if cmd == b"G90":
+            self.absolute_coord = True
+        elif cmd == b"G91":
+            self.absolute_coord = False
+        elif cmd == b"M82":
+            self.absolute_extrude = True
+        elif cmd == b"M83":
+            self.absolute_extrude = False
+        else:
+            return False
+        self._derive()
+        return True
+
+    def redundant(self, cmd):
+        """True if `cmd` is a mode command that would not change the known current mode."""
+        if cmd == b"G90" or cmd == b"G91":
+            return self.absolute_coord is (cmd == b"G90")
+        if cmd == b"M82" or cmd == b"M83":
+            return self.absolute_extrude is (cmd == b"M82")
+        return False
@@ -0,0 +1,291 @@
+import math
+
+from pkg.gcode.modes import PositioningModes
+
+# Commands known not to move the toolhead or change the feedrate. Anything
+# else that is not tracked explicitly (G28, macros, M600...) makes the
+# position unknown, so no word after it is treated as redundant.
+SAFE_COMMANDS = {b"M104", b"M109", b"M140", b"M190", b"M106", b"M107", b"M117", b"M118",
+                 b"M220", b"M221", b"M204", b"M205", b"M73", b"M400", b"G4"}
+
+_AXES = {ord('X'): 'x', ord('Y'): 'y', ord('Z'): 'z'}
+_E, _F = ord('E'), ord('F')
+
+
+class PipelineStats:
+    """Counters shared by all stages of one pipeline run."""
+    __slots__ = ('lines_in', 'bytes_in', 'lines_out', 'bytes_out', 'comments_stripped',
+                 'words_dropped', 'lines_dropped', 'segments_merged', 'epilogue_lines')
+
+    def __init__(self):
+        for name in self.__slots__:
+            setattr(self, name, 0)
+
+    def as_dict(self):
+        out = {name: getattr(self, name) for name in self.__slots__}
+        out['bytes_saved'] = self.bytes_in - self.bytes_out
+        out['saved_pct'] = round(100.0 * out['bytes_saved'] / self.bytes_in, 1) if self.bytes_in else 0.0
+        return out
+
+
+def _parse(line):
+    """Splits a stripped line into (cmd, words, params) with params {letter: float}."""
+    words = line.split()
+    cmd = words[0].upper()
+    params = {}
+    for w in words[1:]:
+        try:
+            params[w[0] & 0xDF] = float(w[1:])
+        except (ValueError, IndexError):
+            pass
+    return cmd, words, params
+
+
+class _Modal(PositioningModes):
+    """
+    Position / mode tracker. None means unknown; that includes the modes at
+    the start of the file, since the previous job may have left G91 active.
+    """
+    __slots__ = ('x', 'y', 'z', 'e', 'feed')
+
+    def __init__(self):
+        super().__init__(absolute_coord=None, absolute_extrude=None)
+        self.x = self.y = self.z = self.e = self.feed = None
+
+    def invalidate(self):
+        # A macro may change modes too, so the next G90/G91/M82/M83 is kept
+        self.x = self.y = self.z = self.e = self.feed = None
+        self.absolute_coord = self.absolute_extrude = None
+        self._derive()
+
+    def apply(self, cmd, params):
+        if cmd == b"G1" or cmd == b"G0":
+            for key, attr in _AXES.items():
+                if key in params:
+                    cur = getattr(self, attr)
+                    if self.abs_xyz:
+                        setattr(self, attr, params[key])
+                    elif cur is not None and self.abs_xyz is not None:
+                        setattr(self, attr, cur + params[key])
+                    else:
+                        setattr(self, attr, None)
+            if _E in params:
+                if self.abs_e:
+                    self.e = params[_E]
+                elif self.e is not None and self.abs_e is not None:
+                    self.e += params[_E]
+                else:
+                    self.e = None
+            if _F in params:
+                self.feed = params[_F]
+        elif self.update(cmd):
+            pass
+        elif cmd == b"G92":
+            if not any(key in params for key in _AXES) and _E not in params:
+                # Bare G92: the current position becomes zero on every axis
+                self.x = self.y = self.z = self.e = 0.0
+            for key, attr in _AXES.items():
+                if key in params:
+                    setattr(self, attr, params[key])
+            if _E in params:
+                self.e = params[_E]
+        elif cmd not in SAFE_COMMANDS:
+            self.invalidate()
+
+
+# --- Stages (generators over newline-terminated byte lines) ---
+def count_input(lines, stats):
+    for line in lines:
+        stats.lines_in += 1
+        stats.bytes_in += len(line)
+        yield line
+
+
+def strip_comments(lines, stats):
+    """Drops comments, blank lines and surrounding whitespace."""
+    for line in lines:
+        if b";" in line:
+            line = line.split(b";", 1)[0]
+            stats.comments_stripped += 1
+        line = line.strip()
+        if line:
+            yield line + b"\n"
+
+
+def drop_redundant(lines, stats):
+    """
+    Drops modal words that do not change anything: F equal to the current
+    feedrate, absolute X/Y/Z/E equal to the current position, and repeated
+    G90/G91/M82/M83. A move left with no words is dropped entirely. Klipper
+    has no implicit G1, so the command word itself is always kept.
+    """
+    modal = _Modal()
+    for line in lines:
+        body = line.split(b";", 1)[0].strip()
+        if not body:
+            yield line
+            continue
+        cmd, words, params = _parse(body)
+        if modal.redundant(cmd):
+            stats.lines_dropped += 1
+            continue
+        if cmd == b"G1" or cmd == b"G0":
+            kept = [words[0]]
+            for w in words[1:]:
+                letter = w[0] & 0xDF
+                value = params.get(letter)
+                if value is not None:
+                    if letter == _F:
+                        current = modal.feed
+                    elif letter == _E:
+                        current = modal.e if modal.abs_e else None
+                    elif letter in _AXES:
+                        current = getattr(modal, _AXES[letter]) if modal.abs_xyz else None
+                    else:
+                        current = None
+                    if current is not None and value == current:
+                        stats.words_dropped += 1
+                        continue
+                kept.append(w)
+            modal.apply(cmd, params)
+            if len(kept) == 1:
+                stats.lines_dropped += 1
+                continue
+            if len(kept) != len(words):
+                line = b" ".join(kept) + b"\n"
+        else:
+            modal.apply(cmd, params)
+        yield line
+
+
+def merge_collinear(lines, stats, tolerance=0.01, max_segment=1.0, rate_tolerance=0.02):
+    """
+    Merges runs of tiny (<= max_segment mm) XY extrusion moves that stay
+    within `tolerance` mm of a straight line and extrude at the same rate
+    into one move. Only plain "G1 X Y E [F]" moves in absolute XY mode are
+    candidates; any other line ends the run.
+    """
+    modal = _Modal()
+    run = None  # dict describing the pending run of segments
+
+    def flush():
+        nonlocal run
+        if run is None:
+            return None
+        pending, run = run, None
+        if pending['count'] == 1:
+            return pending['line']
+        stats.segments_merged += pending['count'] - 1
+        e_word = pending['e_end'] if modal.abs_e else pending['e_sum']
+        parts = [b"G1", b"X%.3f" % pending['ex'], b"Y%.3f" % pending['ey'], b"E%.5f" % e_word]
+        if pending['feed_word'] is not None:
+            parts.append(pending['feed_word'])
+        return b" ".join(parts) + b"\n"
+
+    for line in lines:
+        body = line.split(b";", 1)[0].strip()
+        if not body:
+            out = flush()
+            if out is not None:
+                yield out
+            yield line
+            continue
+        cmd, words, params = _parse(body)
+        candidate = (cmd == b"G1" and modal.abs_xyz is True and modal.abs_e is not None
+                     and modal.x is not None and modal.y is not None
+                     and (modal.e is not None or modal.abs_e is False)
+                     and len(params) == len(words) - 1 and _E in params
+                     and ord('Z') not in params and all(k in (ord('X'), ord('Y'), _E, _F) for k in params))
+        if candidate:
+            sx, sy = modal.x, modal.y
+            nx, ny = params.get(ord('X'), sx), params.get(ord('Y'), sy)
+            de = params[_E] - modal.e if modal.abs_e else params[_E]
+            dx, dy = nx - sx, ny - sy
+            dist = math.hypot(dx, dy)
+            candidate = 0.0 < dist <= max_segment and de > 0.0
+        if not candidate:
+            out = flush()
+            if out is not None:
+                yield out
+            modal.apply(cmd, params)
+            yield line
+            continue
+
+        rate = de / dist
+        feed_change = _F in params and params[_F] != modal.feed
+        if run is not None and not feed_change:
+            # Distance of the new end point from the run's line, and forward progress
+            rx, ry = nx - run['sx'], ny - run['sy']
+            deviation = abs(rx * run['uy'] - ry * run['ux'])
+            forward = dx * run['ux'] + dy * run['uy'] > 0.0
+            same_rate = abs(rate - run['rate']) <= rate_tolerance * run['rate']
+            if deviation <= tolerance and forward and same_rate:
+                run['ex'], run['ey'] = nx, ny
+                run['e_sum'] += de
+                run['e_end'] = params[_E] if modal.abs_e else None
+                run['count'] += 1
+                modal.apply(cmd, params)
+                continue
+        out = flush()
+        if out is not None:
+            yield out
+        feed_word = next((w for w in words[1:] if w[0] & 0xDF == _F), None)
+        run = {'sx': sx, 'sy': sy, 'ex': nx, 'ey': ny, 'ux': dx / dist, 'uy': dy / dist,
+               'rate': rate, 'e_sum': de, 'e_end': params[_E] if modal.abs_e else None,
+               'count': 1, 'line': line, 'feed_word': feed_word}
+        modal.apply(cmd, params)
+
+    out = flush()
+    if out is not None:
+        yield out
+
+
+def append_epilogue(lines, epilogue, stats):
+    """Passes lines through, then appends the epilogue lines."""
+    for line in lines:
+        yield line
+    for line in epilogue:
+        stats.epilogue_lines += 1
+        yield line
+
+
+def count_output(lines, stats):
+    for line in lines:
+        stats.lines_out += 1
+        stats.bytes_out += len(line)
+        yield line
+
+
+def load_epilogue(path=None, park_command=None):
+    """
+    Builds the harvest epilogue as byte lines: the contents of an epilogue
+    G-code file (e.g. robot_trigger.gcode) followed by the cell's park
+    command. Comments and blank lines are removed.
+    """
+    epilogue = []
+    if path:
+        with open(path, 'rb') as f:
+            epilogue.extend(strip_comments(f, PipelineStats()))
+    if park_command:
+        epilogue.extend(strip_comments(park_command.encode().splitlines(), PipelineStats()))
+    return epilogue
+
+
+def run_pipeline(lines, stats=None, strip=True, dedupe=True, merge_tolerance=0.01,
+                 max_segment=1.0, epilogue=None):
+    """
+    Chains the enabled stages lazily over an iterable of byte lines and
+    returns the output generator. Pass merge_tolerance=None to skip merging.
+    Counters land in `stats` (a PipelineStats) as the output is consumed.
+    """
+    stats = stats if stats is not None else PipelineStats()
+    out = count_input(lines, stats)
+    if strip:
+        out = strip_comments(out, stats)
+    if merge_tolerance is not None:
+        out = merge_collinear(out, stats, tolerance=merge_tolerance, max_segment=max_segment)
+    if dedupe:
+        out = drop_redundant(out, stats)
+    if epilogue:
+        out = append_epilogue(out, epilogue, stats)
+    return count_output(out, stats)
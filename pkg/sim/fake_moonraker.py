@@ -0,0 +1,405 @@
+import json
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qsl, unquote
+
+from websockets.asyncio.server import serve
+
+from pkg.drivers.moonraker_ws import merge_status
+
+
+def default_status():
+    """Klipper object state of an idle, cold printer."""
+    return {
+        "print_stats": {"state": "standby", "filename": "", "print_duration": 0.0},
+        "display_status": {"progress": 0.0, "message": None},
+        "heater_bed": {"temperature": 25.0, "target": 0.0},
+        "extruder": {"temperature": 25.0, "target": 0.0},
+        "virtual_sdcard": {"file_position": 0, "progress": 0.0, "is_active": False},
+    }
+
+
+class FakeMoonrakerWS:
+    """
+    Minimal offline stand-in for Moonraker's websocket JSON-RPC API.
+    Supports `printer.objects.subscribe` / `printer.objects.query` and pushes
+    `notify_status_update` deltas for whatever `update()` changes.
+    """
+    def __init__(self, host="127.0.0.1", port=0, status=None):
+        self.host = host
+        self.port = port
+        self.status = status or default_status()
+        self.logger = logging.getLogger("FakeMoonrakerWS")
+        self._server = None
+        self._subscribers = {}
+        # False: subscribe/query fail the way Moonraker answers while Klipper is restarting
+        self.klippy_ready = True
+
+    async def start(self):
+        self._server = await serve(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}/websocket"
+
+    async def update(self, delta):
+        """Merges `delta` into the printer state and notifies subscribed clients."""
+        merge_status(self.status, delta)
+        eventtime = time.monotonic()
+        for ws, objects in list(self._subscribers.items()):
+            filtered = self._filter(delta, objects)
+            if not filtered:
+                continue
+            msg = {"jsonrpc": "2.0", "method": "notify_status_update", "params": [filtered, eventtime]}
+            try:
+                await ws.send(json.dumps(msg))
+            except Exception:
+                self._subscribers.pop(ws, None)
+
+    async def notify(self, method, params=None):
+        """Broadcasts an arbitrary notification (e.g. 'notify_klippy_ready')."""
+        msg = {"jsonrpc": "2.0", "method": method}
+        if params is not None:
+            msg["params"] = params
+        for ws in list(self._subscribers):
+            await ws.send(json.dumps(msg))
+
+    def _filter(self, status, objects):
+        out = {}
+        for name, fields in status.items():
+            if name not in objects:
+                continue
+            wanted = objects[name]
+            if wanted is None or not isinstance(fields, dict):
+                out[name] = fields
+            else:
+                picked = {k: v for k, v in fields.items() if k in wanted}
+                if picked:
+                    out[name] = picked
+        return out
+
+    async def _handle(self, ws):
+        try:
+            async for raw in ws:
+                req = json.loads(raw)
+                method = req.get('method')
+                params = req.get('params') or {}
+                if str(method).startswith('printer.') and not self.klippy_ready:
+                    await ws.send(json.dumps({"jsonrpc": "2.0", "id": req.get('id'),
+                                              "error": {"code": 503, "message": "Klippy Host not connected"}}))
+                    continue
+                if method == 'printer.objects.subscribe':
+                    objects = params.get('objects', {})
+                    self._subscribers[ws] = objects
+                    result = {"eventtime": time.monotonic(), "status": self._filter(self.status, objects)}
+                elif method == 'printer.objects.query':
+                    result = {"eventtime": time.monotonic(),
+                              "status": self._filter(self.status, params.get('objects', {}))}
+                elif method == 'server.info':
+                    result = {"klippy_connected": True, "klippy_state": "ready"}
+                else:
+                    await ws.send(json.dumps({"jsonrpc": "2.0", "id": req.get('id'),
+                                              "error": {"code": -32601, "message": "Method not found"}}))
+                    continue
+                await ws.send(json.dumps({"jsonrpc": "2.0", "id": req.get('id'), "result": result}))
+        except Exception as e:
+            self.logger.debug(f"Client dropped: {e}")
+        finally:
+            self._subscribers.pop(ws, None)
+
+
+def read_body_chunks(rfile, headers, chunk_size=256 * 1024):
+    """Yields a request body from a Content-Length or chunked-encoded stream."""
+    if headers.get('Transfer-Encoding', '').lower() == 'chunked':
+        while True:
+            size = int(rfile.readline().split(b";")[0].strip(), 16)
+            if size == 0:
+                rfile.readline()
+                return
+            remaining = size
+            while remaining:
+                block = rfile.read(min(remaining, chunk_size))
+                if not block:
+                    return
+                remaining -= len(block)
+                yield block
+            rfile.readline()
+    else:
+        remaining = int(headers.get('Content-Length', 0))
+        while remaining:
+            block = rfile.read(min(remaining, chunk_size))
+            if not block:
+                return
+            remaining -= len(block)
+            yield block
+
+
+class MultipartFileSink:
+    """
+    Streaming extractor for the `file` part of a multipart upload. Writes the
+    payload to `out` (or just counts it when `out` is None) while holding only
+    a boundary-sized tail in memory.
+    """
+    def __init__(self, boundary, out=None):
+        self.delim = b"\r\n--" + boundary
+        self.out = out
+        self.fields = {}
+        self.filename = None
+        self.size = 0
+        self._buf = b"\r\n"
+        self._in_file = False
+        self._done = False
+
+    def feed(self, data):
+        if self._done:
+            return
+        self._buf += data
+        while not self._done:
+            if self._in_file:
+                idx = self._buf.find(self.delim)
+                if idx < 0:
+                    keep = len(self.delim)
+                    self._emit(self._buf[:-keep])
+                    self._buf = self._buf[-keep:]
+                    return
+                self._emit(self._buf[:idx])
+                self._buf = self._buf[idx:]
+                self._in_file = False
+                continue
+            # Expecting "\r\n--boundary" followed by part headers or "--".
+            idx = self._buf.find(self.delim)
+            if idx < 0:
+                return
+            head_end = self._buf.find(b"\r\n\r\n", idx)
+            after = self._buf[idx + len(self.delim):idx + len(self.delim) + 2]
+            if after == b"--":
+                self._done = True
+                return
+            if head_end < 0:
+                return
+            headers = self._buf[idx + len(self.delim):head_end].decode(errors='replace')
+            name = _disposition_param(headers, 'name')
+            filename = _disposition_param(headers, 'filename')
+            if filename is not None:
+                self.filename = filename
+                self._in_file = True
+                self._buf = self._buf[head_end + 4:]
+                continue
+            # Plain form field: wait until its closing delimiter has arrived.
+            end = self._buf.find(self.delim, head_end + 4)
+            if end < 0:
+                return
+            self.fields[name] = self._buf[head_end + 4:end].decode(errors='replace')
+            self._buf = self._buf[end:]
+
+    def _emit(self, data):
+        if not data:
+            return
+        self.size += len(data)
+        if self.out is not None:
+            self.out.write(data)
+
+
+def _disposition_param(headers, key):
+    for part in headers.replace("\r\n", ";").split(";"):
+        part = part.strip()
+        if part.startswith(f"{key}="):
+            return part[len(key) + 1:].strip('"')
+    return None
+
+
+class FakeMoonrakerHTTP:
+    """
+    Offline stand-in for the Moonraker HTTP endpoints MoonrakerClient uses.
+    Runs a keep-alive ThreadingHTTPServer on a background thread. Uploaded
+    files are streamed to `file_dir` when given, otherwise only counted.
+    `response_delay` adds a fixed service time per request to mimic a
+    Pi-class Moonraker host.
+    """
+    def __init__(self, host="127.0.0.1", port=0, status=None, file_dir=None, response_delay=0.0):
+        self.host = host
+        self.port = port
+        self.response_delay = response_delay
+        self.status = status or default_status()
+        self.file_dir = file_dir
+        self.files = {}
+        self.console = []
+        self.gcode_log = []
+        self.request_count = 0
+        self.lock = threading.Lock()
+        self.logger = logging.getLogger("FakeMoonrakerHTTP")
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def start(self):
+        self._server = ThreadingHTTPServer((self.host, self.port), self._make_handler())
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def add_console(self, message, kind="response"):
+        with self.lock:
+            self.console.append({"message": message, "time": time.time(), "type": kind})
+            del self.console[:-1000]
+
+    # --- Endpoint handlers: return (http_status, json_body) ---
+    def query_objects(self, objects):
+        with self.lock:
+            status = {name: dict(self.status.get(name, {})) for name in objects}
+        return 200, {"result": {"eventtime": time.monotonic(), "status": status}}
+
+    def gcode_store(self, params):
+        with self.lock:
+            entries = list(self.console)
+        count = int(params.get('count', len(entries)))
+        return 200, {"result": {"gcode_store": entries[-count:] if count else []}}
+
+    def upload(self, handler):
+        ctype = handler.headers.get('Content-Type', '')
+        if 'boundary=' not in ctype:
+            return 400, {"error": {"message": "Expected multipart/form-data"}}
+        boundary = ctype.split('boundary=', 1)[1].strip('"').encode()
+
+        tmp_path = None
+        out = None
+        if self.file_dir:
+            os.makedirs(self.file_dir, exist_ok=True)
+            tmp_path = os.path.join(self.file_dir, f".upload_{threading.get_ident()}.part")
+            out = open(tmp_path, 'wb')
+        sink = MultipartFileSink(boundary, out)
+        try:
+            for block in read_body_chunks(handler.rfile, handler.headers):
+                sink.feed(block)
+        finally:
+            if out is not None:
+                out.close()
+
+        name = sink.filename or "upload.gcode"
+        if tmp_path:
+            os.replace(tmp_path, os.path.join(self.file_dir, name))
+        with self.lock:
+            self.files[name] = {"path": name, "size": sink.size, "modified": time.time()}
+        return 201, {"result": {"item": {"path": name, "root": sink.fields.get('root', 'gcodes'),
+                                         "size": sink.size}, "action": "create_file"}}
+
+    def file_metadata(self, params):
+        name = params.get('filename', '')
+        with self.lock:
+            info = self.files.get(name)
+        if info is None:
+            return 404, {"error": {"message": f"Metadata not available for <{name}>"}}
+        return 200, {"result": {"filename": name, "size": info["size"], "modified": info["modified"]}}
+
+    def list_files(self):
+        with self.lock:
+            return 200, {"result": [dict(f) for f in self.files.values()]}
+
+    def delete_file(self, name):
+        with self.lock:
+            if self.files.pop(name, None) is None:
+                return 404, {"error": {"message": f"File {name} does not exist"}}
+        if self.file_dir and os.path.exists(os.path.join(self.file_dir, name)):
+            os.remove(os.path.join(self.file_dir, name))
+        return 200, {"result": {"item": {"path": name, "root": "gcodes"}, "action": "delete_file"}}
+
+    def start_print(self, body):
+        filename = body.get('filename', '')
+        with self.lock:
+            if filename not in self.files:
+                return 400, {"error": {"message": f"File {filename} not found"}}
+            self.status['print_stats'].update({"state": "printing", "filename": filename})
+        return 200, {"result": "ok"}
+
+    def gcode_script(self, body):
+        script = body.get('script', '')
+        with self.lock:
+            self.gcode_log.append(script)
+        self.add_console(script, kind="command")
+        return 200, {"result": "ok"}
+
+    def _make_handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out as separate writes; without this, Nagle
+            # plus delayed ACK adds ~40 ms to every keep-alive response.
+            disable_nagle_algorithm = True
+
+            def log_message(self, fmt, *args):
+                fake.logger.debug(fmt % args)
+
+            def _reply(self, code, body):
+                if fake.response_delay:
+                    time.sleep(fake.response_delay)
+                data = json.dumps(body).encode()
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _json_body(self):
+                raw = b"".join(read_body_chunks(self.rfile, self.headers))
+                return json.loads(raw) if raw else {}
+
+            def do_GET(self):
+                fake.request_count += 1
+                parts = urlsplit(self.path)
+                if parts.path == "/printer/objects/query":
+                    objects = [k for k, _ in parse_qsl(parts.query, keep_blank_values=True)]
+                    self._reply(*fake.query_objects(objects))
+                elif parts.path == "/server/gcode_store":
+                    self._reply(*fake.gcode_store(dict(parse_qsl(parts.query))))
+                elif parts.path == "/server/files/metadata":
+                    self._reply(*fake.file_metadata(dict(parse_qsl(parts.query))))
+                elif parts.path == "/server/files/list":
+                    self._reply(*fake.list_files())
+                else:
+                    self._reply(404, {"error": {"message": "Not Found"}})
+
+            def do_POST(self):
+                fake.request_count += 1
+                path = urlsplit(self.path).path
+                if path == "/server/files/upload":
+                    self._reply(*fake.upload(self))
+                elif path == "/printer/print/start":
+                    self._reply(*fake.start_print(self._json_body()))
+                elif path == "/printer/gcode/script":
+                    self._reply(*fake.gcode_script(self._json_body()))
+                else:
+                    self._json_body()
+                    self._reply(404, {"error": {"message": "Not Found"}})
+
+            def do_DELETE(self):
+                fake.request_count += 1
+                path = unquote(urlsplit(self.path).path)
+                if path.startswith("/server/files/gcodes/"):
+                    self._reply(*fake.delete_file(path[len("/server/files/gcodes/"):]))
+                else:
+                    self._reply(404, {"error": {"message": "Not Found"}})
+
+        return Handler
@@ -0,0 +1,280 @@
+import math
+import os
+import tempfile
+import threading
+import time
+
+from pkg.sim.fake_moonraker import FakeMoonrakerHTTP
+
+
+def estimate_print_time(path):
+    """
+    Rough G-code duration in seconds: move length / feedrate (extrude-only
+    moves use |E|) plus G4 dwells. Also returns the first bed and extruder
+    targets found, as (seconds, bed_target, extruder_target).
+    """
+    x = y = z = 0.0
+    feed = 1500.0  # mm/min
+    absolute = True
+    seconds = 0.0
+    bed_target = extruder_target = None
+    with open(path, 'r', errors='replace') as f:
+        for raw in f:
+            line = raw.split(';', 1)[0].strip()
+            if not line:
+                continue
+            words = line.split()
+            cmd = words[0].upper()
+            params = {}
+            for w in words[1:]:
+                try:
+                    params[w[0].upper()] = float(w[1:])
+                except (ValueError, IndexError):
+                    pass
+            if cmd in ('G0', 'G1'):
+                feed = params.get('F', feed)
+                nx, ny, nz = x, y, z
+                if absolute:
+                    nx, ny, nz = params.get('X', x), params.get('Y', y), params.get('Z', z)
+                else:
+                    nx, ny, nz = x + params.get('X', 0.0), y + params.get('Y', 0.0), z + params.get('Z', 0.0)
+                dist = math.sqrt((nx - x) ** 2 + (ny - y) ** 2 + (nz - z) ** 2)
+                if dist == 0.0:
+                    dist = abs(params.get('E', 0.0))
+                if feed > 0:
+                    seconds += dist / (feed / 60.0)
+                x, y, z = nx, ny, nz
+            elif cmd == 'G4':
+                seconds += params.get('P', 0.0) / 1000.0 + params.get('S', 0.0)
+            elif cmd == 'G90':
+                absolute = True
+            elif cmd == 'G91':
+                absolute = False
+            elif cmd in ('M140', 'M190') and bed_target is None:
+                bed_target = params.get('S')
+            elif cmd in ('M104', 'M109') and extruder_target is None:
+                extruder_target = params.get('S')
+    return seconds, bed_target, extruder_target
+
+
+class Heater:
+    """Linear heat-up toward target, Newtonian cooling toward ambient."""
+    def __init__(self, ambient, heat_rate, cool_k):
+        self.ambient = ambient
+        self.heat_rate = heat_rate
+        self.cool_k = cool_k
+        self.temperature = ambient
+        self.target = 0.0
+
+    def step(self, dt):
+        if self.target > self.temperature:
+            self.temperature = min(self.target, self.temperature + self.heat_rate * dt)
+        elif self.target > self.ambient and self.temperature <= self.target + 0.5:
+            self.temperature = self.target
+        else:
+            floor = max(self.ambient, self.target)
+            self.temperature = floor + (self.temperature - floor) * math.exp(-self.cool_k * dt)
+
+    @property
+    def at_target(self):
+        return self.target <= 0.0 or self.temperature >= self.target - 1.0
+
+
+class PrintModel:
+    """
+    Time-scaled model of a Klipper print. Simulated time runs `speed` times
+    faster than wall time; every query advances the model to "now".
+    """
+    def __init__(self, speed=1.0, ambient=25.0, default_bed_target=60.0, home_time=15.0,
+                 bed_heat_rate=1.0, bed_cool_k=1 / 480.0, extruder_heat_rate=4.0, extruder_cool_k=1 / 90.0):
+        self.speed = speed
+        self.default_bed_target = default_bed_target
+        self.home_time = home_time
+        self.bed = Heater(ambient, bed_heat_rate, bed_cool_k)
+        self.extruder = Heater(ambient, extruder_heat_rate, extruder_cool_k)
+
+        self.state = "standby"
+        self.filename = ""
+        self.file_size = 0
+        self.duration = 0.0
+        self.print_elapsed = 0.0
+        self.heating = False
+        self._last = time.time()
+
+    def advance(self):
+        """
+        Integrates the model up to the current wall time. Returns the events
+        that fired as (name, wall_time) pairs, with wall_time reconstructed
+        from the simulated step in which the event happened.
+        """
+        start = self._last
+        now = time.time()
+        total = (now - start) * self.speed
+        self._last = now
+        events = []
+        consumed = 0.0
+        while consumed < total:
+            dt = min(total - consumed, 1.0)
+            consumed += dt
+            at = start + consumed / self.speed
+            self.bed.step(dt)
+            self.extruder.step(dt)
+            if self.state != "printing":
+                continue
+            if self.heating:
+                if self.bed.at_target and self.extruder.at_target:
+                    self.heating = False
+                    events.append(("heated", at))
+                continue
+            self.print_elapsed += dt
+            if self.print_elapsed >= self.duration:
+                self.print_elapsed = self.duration
+                self.state = "complete"
+                self.bed.target = 0.0
+                self.extruder.target = 0.0
+                events.append(("complete", at))
+        return events
+
+    def start(self, path, filename):
+        self.duration, bed, extruder = estimate_print_time(path)
+        self.filename = filename
+        self.file_size = os.path.getsize(path)
+        self.print_elapsed = 0.0
+        self.bed.target = bed if bed is not None else self.default_bed_target
+        self.extruder.target = extruder or 0.0
+        self.heating = True
+        self.state = "printing"
+
+    def reset_file(self):
+        self.state = "standby"
+        self.filename = ""
+        self.file_size = 0
+        self.duration = 0.0
+        self.print_elapsed = 0.0
+        self.heating = False
+
+    @property
+    def progress(self):
+        return self.print_elapsed / self.duration if self.duration > 0 else (1.0 if self.state == "complete" else 0.0)
+
+    def status(self):
+        return {
+            "print_stats": {"state": self.state, "filename": self.filename, "print_duration": self.print_elapsed},
+            "display_status": {"progress": self.progress, "message": None},
+            "heater_bed": {"temperature": round(self.bed.temperature, 2), "target": self.bed.target},
+            "extruder": {"temperature": round(self.extruder.temperature, 2), "target": self.extruder.target},
+            "virtual_sdcard": {"file_position": int(self.file_size * self.progress), "progress": self.progress,
+                               "is_active": self.state == "printing"},
+        }
+
+
+class KlipperSimulator(FakeMoonrakerHTTP):
+    """
+    Fake Moonraker whose printer state comes from a PrintModel instead of a
+    static dict. Also records per-cycle timings (start, completion, first time
+    a client observed completion, reset) and serves them at GET /sim/stats.
+    """
+    def __init__(self, host="127.0.0.1", port=7125, speed=1.0, file_dir=None, **model_kwargs):
+        self._tmp = None
+        if file_dir is None:
+            self._tmp = tempfile.TemporaryDirectory(prefix="klipper_sim_")
+            file_dir = self._tmp.name
+        super().__init__(host, port, file_dir=file_dir)
+        self.model = PrintModel(speed=speed, **model_kwargs)
+        self.cycles = []
+        self._cycle = None
+        self._lock = threading.Lock()
+
+    def _advance(self):
+        with self._lock:
+            for event, at in self.model.advance():
+                if event == "heated":
+                    self.add_console("Heaters at target, printing")
+                elif event == "complete":
+                    self.add_console(f"Done printing file {self.model.filename}")
+                    if self._cycle is not None:
+                        self._cycle["completed"] = at
+            self.status = self.model.status()
+
+    def query_objects(self, objects):
+        self._advance()
+        code, body = super().query_objects(objects)
+        with self._lock:
+            cycle = self._cycle
+            if cycle and "completed" in cycle and "observed" not in cycle and "print_stats" in objects:
+                cycle["observed"] = time.time()
+        return code, body
+
+    def start_print(self, body):
+        self._advance()
+        filename = body.get('filename', '')
+        path = os.path.join(self.file_dir, filename)
+        with self._lock:
+            if self.model.state == "printing":
+                return 400, {"error": {"message": "Printer is busy"}}
+            if not os.path.exists(path):
+                return 400, {"error": {"message": f"File {filename} not found"}}
+            self.model.start(path, filename)
+            self._cycle = {"filename": filename, "started": time.time(),
+                           "sim_duration": self.model.duration}
+            self.cycles.append(self._cycle)
+        self.add_console(f"File opened:{filename} Size:{self.model.file_size}")
+        return 200, {"result": "ok"}
+
+    def gcode_script(self, body):
+        self._advance()
+        script = body.get('script', '').strip()
+        cmd = script.split()[0].upper() if script else ""
+        if cmd == "G28":
+            # Moonraker answers gcode/script only after the command finished.
+            time.sleep(self.model.home_time / self.model.speed)
+        with self._lock:
+            if cmd == "SDCARD_RESET_FILE":
+                if self._cycle is not None:
+                    self._cycle["reset"] = time.time()
+                    self._cycle = None
+                self.model.reset_file()
+            elif cmd in ("M140", "M190", "M104", "M109"):
+                target = next((float(w[1:]) for w in script.split()[1:] if w[:1].upper() == 'S'), 0.0)
+                heater = self.model.bed if cmd in ("M140", "M190") else self.model.extruder
+                heater.target = target
+        return super().gcode_script(body)
+
+    def stats(self):
+        """Cycle throughput and reaction latency summary (wall-clock seconds)."""
+        with self._lock:
+            done = [c for c in self.cycles if "completed" in c]
+            observed = [c["observed"] - c["completed"] for c in done if "observed" in c]
+            turnaround = [c["reset"] - c["completed"] for c in done if "reset" in c]
+            starts = [c["started"] for c in self.cycles]
+        span = (starts[-1] - starts[0]) if len(starts) > 1 else 0.0
+        return {
+            "speed": self.model.speed,
+            "state": self.model.state,
+            "cycles_started": len(starts),
+            "cycles_completed": len(done),
+            "cycles_per_hour": (len(starts) - 1) / span * 3600.0 if span > 0 else 0.0,
+            "reaction_latency_mean_s": sum(observed) / len(observed) if observed else None,
+            "reaction_latency_max_s": max(observed) if observed else None,
+            "complete_to_reset_mean_s": sum(turnaround) / len(turnaround) if turnaround else None,
+            "bed_temp": round(self.model.bed.temperature, 2),
+        }
+
+    def _make_handler(self):
+        base = super()._make_handler()
+        sim = self
+
+        class Handler(base):
+            def do_GET(self):
+                if self.path.startswith("/sim/stats"):
+                    self._reply(200, {"result": sim.stats()})
+                else:
+                    super().do_GET()
+
+        return Handler
+
+    def stop(self):
+        super().stop()
+        if self._tmp is not None:
+            self._tmp.cleanup()
+            self._tmp = None
@@ -0,0 +1,60 @@
+import os
+import time
+import hashlib
+import logging
+
+import requests
+
+logger = logging.getLogger("RoboFab.BlobFetch")
+
+FETCH_CHUNK_SIZE = 256 * 1024
+
+
+def file_sha256(path, chunk_size=FETCH_CHUNK_SIZE):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def fetch_blob(url, digest, dest_dir, retries=3, timeout=10.0, session=None, chunk_size=FETCH_CHUNK_SIZE):
+    """
+    Downloads a content-addressed blob to <dest_dir>/<digest>.gcode and
+    returns the path. The body is streamed to a .part file; after a dropped
+    connection the next attempt resumes with a Range request instead of
+    starting over. The result is verified against `digest` before it is
+    moved into place, and an existing verified copy is reused as-is.
+    """
+    os.makedirs(dest_dir, exist_ok=True)
+    path = os.path.join(dest_dir, f"{digest}.gcode")
+    if os.path.exists(path):
+        return path
+    part = f"{path}.part"
+    http = session or requests
+
+    for attempt in range(retries + 1):
+        offset = os.path.getsize(part) if os.path.exists(part) else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        try:
+            with http.get(url, headers=headers, stream=True, timeout=timeout) as resp:
+                if resp.status_code == 416:
+                    break  # .part already holds the whole blob
+                resp.raise_for_status()
+                # 200 means the server ignored the range: start from scratch
+                with open(part, 'ab' if resp.status_code == 206 else 'wb') as f:
+                    for chunk in resp.iter_content(chunk_size):
+                        f.write(chunk)
+            break
+        except (requests.RequestException, OSError) as e:
+            if attempt == retries:
+                raise
+            logger.warning(f"Blob download interrupted at {offset} bytes ({e!r}); resuming")
+            time.sleep(0.5 * 2 ** attempt)
+
+    actual = file_sha256(part)
+    if actual != digest:
+        os.remove(part)
+        raise IOError(f"Blob {digest[:12]} failed verification (got {actual[:12]})")
+    os.replace(part, path)
+    return path
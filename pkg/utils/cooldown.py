@@ -0,0 +1,100 @@
+import math
+import time
+
+
+class CooldownEstimator:
+    """
+    Online Newton's-law-of-cooling fit for the print bed.
+
+    Models T(t) = T_amb + (T0 - T_amb) * exp(-k * t) by regressing
+    ln(T - T_amb) on t with exponentially-forgotten running sums, so each
+    sample is O(1) and the fit follows changes such as the part fan kicking
+    in. From the fit it predicts the time until the bed reaches `target` and
+    when to poll next so the check lands right at the crossing.
+    """
+    def __init__(self, target, ambient=25.0, forgetting=0.97, min_samples=3,
+                 min_interval=1.0, max_interval=10.0, margin=0.25):
+        self.target = target
+        self.ambient = ambient
+        self.forgetting = forgetting
+        self.min_samples = min_samples
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.margin = margin
+
+        self.samples = 0
+        self.last_temp = None
+        self.last_time = None
+        self._t0 = None
+        # Weighted sums for y = a - k t
+        self._sw = self._st = self._sy = self._stt = self._sty = 0.0
+
+    def add_sample(self, temp, t=None):
+        """Adds one bed temperature reading taken at wall time `t` (default: now)."""
+        t = time.time() if t is None else t
+        self.last_temp = temp
+        self.last_time = t
+        excess = temp - self.ambient
+        if excess <= 0.1:
+            return
+        if self._t0 is None:
+            self._t0 = t
+        x = t - self._t0
+        y = math.log(excess)
+        f = self.forgetting
+        self._sw = f * self._sw + 1.0
+        self._st = f * self._st + x
+        self._sy = f * self._sy + y
+        self._stt = f * self._stt + x * x
+        self._sty = f * self._sty + x * y
+        self.samples += 1
+
+    def _fit(self):
+        if self.samples < self.min_samples:
+            return None
+        det = self._sw * self._stt - self._st * self._st
+        if det <= 1e-12:
+            return None
+        slope = (self._sw * self._sty - self._st * self._sy) / det
+        intercept = (self._sy - slope * self._st) / self._sw
+        k = -slope
+        if k <= 0:
+            return None  # Not cooling (yet)
+        return intercept, k
+
+    @property
+    def rate(self):
+        """Fitted cooling constant k in 1/s, or None while the fit is not usable."""
+        fit = self._fit()
+        return fit[1] if fit else None
+
+    def predict(self, t):
+        """Predicted bed temperature at wall time `t`, or None."""
+        fit = self._fit()
+        if fit is None:
+            return None
+        intercept, k = fit
+        return self.ambient + math.exp(intercept - k * (t - self._t0))
+
+    def eta(self, now=None):
+        """
+        Seconds from `now` until the bed reaches the target: 0.0 once below
+        it, None while there are too few samples or the target is unreachable
+        (at or below ambient).
+        """
+        now = time.time() if now is None else now
+        if self.last_temp is not None and self.last_temp <= self.target:
+            return 0.0
+        fit = self._fit()
+        if fit is None or self.target <= self.ambient:
+            return None
+        intercept, k = fit
+        t_cross = self._t0 + (intercept - math.log(self.target - self.ambient)) / k
+        return max(0.0, t_cross - now)
+
+    def next_poll_delay(self, now=None, default=5.0):
+        """How long to sleep so the next reading lands just after the predicted crossing."""
+        eta = self.eta(now)
+        if eta is None:
+            return default
+        return min(self.max_interval, max(self.min_interval, eta + self.margin))
@@ -0,0 +1,59 @@
+import json
+import logging
+
+import requests
+
+logger = logging.getLogger("RoboFab.JobSubmit")
+
+SUBMIT_CHUNK_SIZE = 256 * 1024
+
+
+class BatchRejected(Exception):
+    """The dashboard refused a batch; `errors` lists the bad lines."""
+    def __init__(self, message, errors=()):
+        super().__init__(message)
+        self.errors = list(errors)
+
+
+def iter_file_chunks(path, chunk_size=SUBMIT_CHUNK_SIZE):
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            yield block
+
+
+def iter_spec_lines(specs):
+    """
+    JSONL lines for an iterable of job spec dicts. A spec may give
+    `gcode_path` instead of `gcode`; the file is read only when its line
+    is sent, so a sweep never holds more than one G-code body in memory.
+    """
+    for spec in specs:
+        if 'gcode_path' in spec:
+            spec = dict(spec)
+            with open(spec.pop('gcode_path'), encoding='utf-8') as f:
+                spec['gcode'] = f.read()
+        yield json.dumps(spec).encode() + b"\n"
+
+
+def submit_batch(base_url, specs, timeout=300.0, session=None):
+    """
+    Queues a batch of jobs with one POST to /api/jobs/batch and returns the
+    job ids in submission order. `specs` is either the path of a JSONL file
+    (one job spec per line, as for POST /api/jobs) or an iterable of spec
+    dicts. Either way the body is streamed with chunked transfer encoding,
+    never built in memory. The dashboard queues all jobs or none; a
+    rejected batch raises BatchRejected.
+    """
+    body = iter_file_chunks(specs) if isinstance(specs, str) else iter_spec_lines(specs)
+    http = session or requests
+    resp = http.post(f"{base_url.rstrip('/')}/api/jobs/batch", data=body, timeout=timeout,
+                     headers={"Content-Type": "application/x-ndjson"})
+    try:
+        result = resp.json()
+    except ValueError:
+        resp.raise_for_status()
+        raise
+    if resp.status_code != 200:
+        raise BatchRejected(result.get('error', f"HTTP {resp.status_code}"), result.get('errors', ()))
+    logger.info(f"📤 Submitted {result['count']} jobs ({result['unique_gcode']} unique G-code files)")
+    return result['job_ids']
@@ -0,0 +1,200 @@
+import time
+import bisect
+import logging
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger("RoboFab.Metrics")
+
+# Request latency buckets in seconds, from a cached dashboard poll to a slow upload
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _number(value):
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, doc, labels=()):
+        self.name = name
+        self.doc = doc
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} takes labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+            lines += [line for key, value in items for line in self._lines(key, value)]
+        return lines
+
+    def _lines(self, key, value):
+        return [f"{self.name}{_labels(self.label_names, key)} {_number(value)}"]
+
+
+class Counter(_Metric):
+    """Monotonic count per label set."""
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    """Current value per label set: set it, or inc()/dec() around work in progress."""
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Histogram(_Metric):
+    """
+    Fixed-bucket histogram per label set. observe() is a bisect and three
+    additions; cumulative bucket counts are only built when rendered.
+    """
+    kind = "histogram"
+
+    def __init__(self, name, doc, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, doc, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        slot = bisect.bisect_left(self.buckets, value)  # len(buckets) is the +Inf slot
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][slot] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observes the duration of the `with` block, also when it raises."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def count(self, **labels):
+        entry = self._values.get(self._key(labels))
+        return entry[2] if entry else 0
+
+    def _lines(self, key, value):
+        counts, total, count = value
+        lines = []
+        cumulative = 0
+        for bound, n in zip(self.buckets + (float('inf'),), counts):
+            cumulative += n
+            le = _labels(self.label_names, key, [("le", _number(bound))])
+            lines.append(f"{self.name}_bucket{le} {cumulative}")
+        labels = _labels(self.label_names, key)
+        lines.append(f"{self.name}_sum{labels} {_number(total)}")
+        lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    """A named set of metrics, rendered together in the Prometheus text format."""
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name, doc, labels=()):
+        return self._register(Counter, name, doc, labels)
+
+    def gauge(self, name, doc, labels=()):
+        return self._register(Gauge, name, doc, labels)
+
+    def histogram(self, name, doc, labels=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram, name, doc, labels, buckets)
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+
+# Process-wide registry: drivers and services register their metrics here
+REGISTRY = Registry()
+
+
+def serve_metrics(port, host="0.0.0.0", registry=REGISTRY):
+    """
+    Serves `registry` at http://<host>:<port>/metrics from a daemon thread,
+    for processes that have no web server of their own. Returns the server.
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass  # Scrapes every few seconds would flood the log
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    logger.info(f"📊 Metrics on http://{host}:{port}/metrics")
+    return server
@@ -0,0 +1,82 @@
+import sys
+import os
+import json
+import time
+import asyncio
+import logging
+import argparse
+import subprocess
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from pkg.drivers.moonraker_async import AsyncMoonrakerPool
+from pkg.drivers.sv08_moonraker import MoonrakerClient
+from pkg.sim.fake_moonraker import FakeMoonrakerHTTP
+
+# Aggregate snapshot polls/second against local fake Moonraker hosts, for the
+# asyncio farm client versus the synchronous client polling printers in turn.
+# The fakes run in a separate process so client and server do not share a GIL.
+#
+#   python scripts/diagnostics/bench_async_poll.py --printers 1 10 50 --delay-ms 20
+
+def serve(count, delay_ms):
+    fakes = [FakeMoonrakerHTTP(response_delay=delay_ms / 1000.0).start() for _ in range(count)]
+    print(json.dumps([f.port for f in fakes]), flush=True)
+    sys.stdin.read()  # Runs until the parent closes our stdin
+
+def sync_polls_per_sec(ports, duration):
+    clients = [MoonrakerClient("127.0.0.1", p) for p in ports]
+    polls = 0
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        for c in clients:
+            c.snapshot()
+            polls += 1
+    return polls / duration
+
+async def async_polls_per_sec(ports, duration, max_in_flight):
+    async with AsyncMoonrakerPool(max_in_flight=max_in_flight) as pool:
+        clients = [pool.client("127.0.0.1", p) for p in ports]
+        counts = [0] * len(clients)
+        end = time.perf_counter() + duration
+
+        async def poll_forever(i, client):
+            while time.perf_counter() < end:
+                snap = await client.snapshot()
+                if snap.online:
+                    counts[i] += 1
+
+        await asyncio.gather(*(poll_forever(i, c) for i, c in enumerate(clients)))
+        return sum(counts) / duration
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-printer polling benchmark")
+    parser.add_argument("--printers", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--delay-ms", type=float, default=20.0, help="Simulated Moonraker service time")
+    parser.add_argument("--duration", type=float, default=3.0)
+    parser.add_argument("--max-in-flight", type=int, default=64)
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.delay_ms)
+        return
+
+    logging.disable(logging.CRITICAL)
+    print(f"Service time per request: {args.delay_ms:.0f} ms | {args.duration:.0f} s per run")
+    print(f"{'printers':>9}{'sync polls/s':>15}{'async polls/s':>16}{'speedup':>10}")
+    for n in args.printers:
+        proc = subprocess.Popen([sys.executable, __file__, "--serve", str(n), "--delay-ms", str(args.delay_ms)],
+                                stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        ports = json.loads(proc.stdout.readline())
+        try:
+            sync_rate = sync_polls_per_sec(ports, args.duration)
+            async_rate = asyncio.run(async_polls_per_sec(ports, args.duration, args.max_in_flight))
+        finally:
+            proc.stdin.close()
+            proc.wait()
+        print(f"{n:>9}{sync_rate:>15.1f}{async_rate:>16.1f}{async_rate / sync_rate:>9.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import sys
+import os
+import json
+import time
+import argparse
+import tempfile
+import logging
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+import services.dashboard.app as dashboard
+from services.dashboard.blob_store import BlobStore
+from services.dashboard.job_store import JobStore
+from services.dashboard.job_queue import JobQueue
+
+# Payload size and serialization cost of /api/dashboard_data with a few large
+# jobs queued. Compares the old full-STATE response (every job with its whole
+# G-code string) against the summary projection, rebuilt and cached:
+#
+#   python scripts/diagnostics/bench_dashboard_payload.py --jobs 5 --size-mb 5
+
+def make_gcode(size_mb):
+    lines = []
+    written, i = 0, 0
+    while written < size_mb * 1024 * 1024:
+        line = f"G1 X{100 + (i % 200) * 0.5:.3f} Y{100 + (i // 200 % 200) * 0.5:.3f} E0.0421 F1800 ; infill\n"
+        lines.append(line)
+        written += len(line)
+        i += 1
+    return "G90\nM83\n" + "".join(lines)
+
+def legacy_body():
+    """The pre-projection response: full job dicts with the G-code inlined."""
+    def full(job):
+        with dashboard.BLOBS.open(job['source_sha256']) as f:
+            return dict(job, gcode=f.read().decode())
+    current = dashboard.JOBS.current()
+    return json.dumps({
+        "queue": [full(j) for j in dashboard.JOBS.queue(dashboard.QUEUE_VIEW_LIMIT)],
+        "history": [full(j) for j in dashboard.JOBS.history(dashboard.HISTORY_VIEW_LIMIT)],
+        "current_job": full(current) if current else None,
+        "settings": dashboard.SETTINGS
+    })
+
+def timed(fn, rounds):
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        size = fn()
+    return (time.perf_counter() - t0) / rounds * 1000, size
+
+def main():
+    parser = argparse.ArgumentParser(description="Dashboard payload benchmark")
+    parser.add_argument("--jobs", type=int, default=5)
+    parser.add_argument("--size-mb", type=int, default=5)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    logging.getLogger("Dashboard").setLevel(logging.WARNING)
+    tmp = tempfile.TemporaryDirectory(prefix="bench_dashboard_")
+    dashboard.BLOBS = BlobStore(tmp.name)
+    dashboard.JOBS = JobStore(os.path.join(tmp.name, 'dashboard.db'))
+    dashboard.QUEUE = JobQueue()
+    dashboard.SETTINGS['optimize_gcode'] = False  # Keep the queued files at full size
+    dashboard.EPILOGUE = []
+    client = dashboard.app.test_client()
+
+    print(f"📝 Queueing {args.jobs} x {args.size_mb} MB jobs...")
+    gcode = make_gcode(args.size_mb)
+    for n in range(args.jobs):
+        # Vary one byte so every job gets its own blob
+        client.post('/api/jobs', json={"name": f"bench_{n}", "gcode": gcode + f"; {n}\n"})
+    while dashboard.JOBS.unprocessed_ids():
+        time.sleep(0.2)
+
+    def legacy():
+        return len(legacy_body().encode())
+
+    def rebuilt():
+        dashboard.WRITER.call(dashboard.publish, jobs=True)
+        return len(client.get('/api/dashboard_data').data)
+
+    def cached():
+        return len(client.get('/api/dashboard_data').data)
+
+    rounds_legacy = max(1, args.rounds // 10)
+    results = {
+        "legacy_full_state": timed(legacy, rounds_legacy),
+        "projection_rebuilt": timed(rebuilt, args.rounds),
+        "projection_cached": timed(cached, args.rounds),
+    }
+    print(f"{'mode':<22}{'bytes':>14}{'ms/request':>12}{'MB/s per tab @1Hz':>20}")
+    for mode, (ms, size) in results.items():
+        print(f"{mode:<22}{size:>14,}{ms:>12.2f}{size / 1e6:>20.3f}")
+    tmp.cleanup()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import sys
+import os
+import time
+import argparse
+import tempfile
+import logging
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+import services.dashboard.app as dashboard
+from services.dashboard.blob_store import BlobStore
+from services.dashboard.job_store import JobStore
+from services.dashboard.job_queue import JobQueue
+
+# Bytes per second that one dashboard tab pulls from /api/dashboard_data at
+# 1 Hz, before and after conditional/delta/gzip responses. Runs on simulated
+# time: every "second" the orchestrator optionally reports status, then the
+# tab polls once. Body bytes only (headers excluded).
+#
+#   python scripts/diagnostics/bench_dashboard_polling.py --jobs 20 --seconds 120
+
+MODES = {
+    # name: (If-None-Match, ?since=, Accept-Encoding gzip)
+    "plain (before)": (False, False, False),
+    "etag": (True, False, False),
+    "etag+since": (True, True, False),
+    "etag+since+gzip": (True, True, True),
+}
+
+def poll_tab(client, mode, seconds, printing):
+    use_etag, use_since, use_gzip = MODES[mode]
+    version = None
+    total = 0
+    not_modified = 0
+    for tick in range(seconds):
+        if printing:
+            client.post('/api/status/update', json={
+                "robot": "Ready", "printer": "printing", "temp": 60.0 + (tick % 3) * 0.1,
+                "progress": tick / seconds, "file_position": tick * 1000,
+                "console_append": [f"// tick {tick}"] if tick % 5 == 0 else []})
+        headers = {}
+        query = ''
+        if use_gzip:
+            headers['Accept-Encoding'] = 'gzip'
+        if version is not None and use_etag:
+            headers['If-None-Match'] = f'"{version}"'
+        if version is not None and use_since:
+            query = f'?since={version}'
+        resp = client.get(f'/api/dashboard_data{query}', headers=headers)
+        total += len(resp.data)
+        if resp.status_code == 304:
+            not_modified += 1
+            continue
+        version = int(resp.headers['ETag'].strip('"'))
+    return total / seconds, not_modified
+
+def main():
+    parser = argparse.ArgumentParser(description="Dashboard polling bandwidth per tab")
+    parser.add_argument("--jobs", type=int, default=20, help="Queued jobs (adds to the payload)")
+    parser.add_argument("--seconds", type=int, default=120)
+    args = parser.parse_args()
+
+    logging.getLogger("Dashboard").setLevel(logging.WARNING)
+    tmp = tempfile.TemporaryDirectory(prefix="bench_polling_")
+    dashboard.BLOBS = BlobStore(tmp.name)
+    dashboard.JOBS = JobStore(os.path.join(tmp.name, 'dashboard.db'))
+    dashboard.QUEUE = JobQueue()
+    client = dashboard.app.test_client()
+    gcode_path = os.path.join(os.path.dirname(__file__), '../../FGF_Test_200C_2.gcode')
+    with open(gcode_path) as f:
+        gcode = f.read()
+    for n in range(args.jobs):
+        client.post('/api/jobs', json={"name": f"bench_job_{n:03d}", "gcode": gcode})
+    while dashboard.JOBS.unprocessed_ids():
+        time.sleep(0.05)
+    client.post('/api/status/update', json={"robot": "Ready", "printer": "printing",
+                                            "console_append": [f"// boot line {i}" for i in range(200)]})
+
+    print(f"{'mode':<20}{'idle B/s':>12}{'304s':>8}{'printing B/s':>15}{'304s':>8}")
+    for mode in MODES:
+        idle, idle_304 = poll_tab(client, mode, args.seconds, printing=False)
+        busy, busy_304 = poll_tab(client, mode, args.seconds, printing=True)
+        print(f"{mode:<20}{idle:>12,.0f}{idle_304:>8}{busy:>15,.0f}{busy_304:>8}")
+    tmp.cleanup()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import sys
+import os
+import time
+import json
+import signal
+import socket
+import random
+import argparse
+import tempfile
+import threading
+import subprocess
+import statistics
+
+import requests
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../'))
+
+# Load profile of the dashboard under each way of serving it. Every mode
+# gets a fresh data directory with --jobs queued jobs, then --clients
+# threads run a mix for --seconds: 80% full GET /api/dashboard_data, 10%
+# conditional GET (If-None-Match), 10% POST /api/status/update. Afterwards
+# an SSE stream measures how long a status update takes to reach it (with
+# several workers the update usually lands on a different worker than the
+# stream). The load generator runs on the same machine, so absolute numbers
+# include its CPU use.
+#
+#   python scripts/diagnostics/bench_dashboard_serving.py --seconds 15 --clients 16
+
+DEV_SERVER = ("import sys; sys.path.insert(0, {root!r}); import services.dashboard.app as d; "
+              "d.app.run(host='127.0.0.1', port={port}, debug=True, use_reloader=False)")
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def start_server(mode, port, data_dir):
+    env = dict(os.environ, DASHBOARD_DATA_DIR=data_dir)
+    if mode == "dev":
+        cmd = [sys.executable, "-c", DEV_SERVER.format(root=PROJECT_ROOT, port=port)]
+    else:
+        server, _, workers = mode.partition(":")
+        cmd = [sys.executable, os.path.join(PROJECT_ROOT, "services/dashboard/serve.py"), "--server", server,
+               "--host", "127.0.0.1", "--port", str(port)]
+        if workers:
+            cmd += ["--workers", workers]
+    proc = subprocess.Popen(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                            start_new_session=True)
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(200):
+        try:
+            requests.get(f"{url}/api/dashboard_data", timeout=1)
+            return proc, url
+        except requests.RequestException:
+            time.sleep(0.1)
+    stop_server(proc)
+    raise RuntimeError(f"{mode} server did not come up")
+
+def stop_server(proc):
+    os.killpg(proc.pid, signal.SIGTERM)
+    try:
+        proc.wait(10)
+    except subprocess.TimeoutExpired:
+        os.killpg(proc.pid, signal.SIGKILL)
+
+def run_load(url, clients, seconds):
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    stop = time.time() + seconds
+
+    def client(n):
+        http = requests.Session()
+        rng = random.Random(n)
+        etag = None
+        mine = []
+        while time.time() < stop:
+            roll = rng.random()
+            t0 = time.perf_counter()
+            try:
+                if roll < 0.1:
+                    resp = http.post(f"{url}/api/status/update", json={
+                        "robot": "Ready", "printer": "printing", "temp": 60.0, "progress": rng.random(),
+                        "file_position": rng.randrange(10 ** 6)}, timeout=30)
+                elif roll < 0.2 and etag:
+                    resp = http.get(f"{url}/api/dashboard_data", headers={"If-None-Match": etag}, timeout=30)
+                else:
+                    resp = http.get(f"{url}/api/dashboard_data", timeout=30)
+                    etag = resp.headers.get("ETag")
+                ok = resp.status_code < 500
+            except requests.RequestException:
+                ok = False
+            mine.append(time.perf_counter() - t0)
+            if not ok:
+                with lock:
+                    errors[0] += 1
+        with lock:
+            latencies.extend(mine)
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+    return {"rps": len(latencies) / seconds, "p50": pct(0.50), "p99": pct(0.99), "errors": errors[0]}
+
+def stream_latency(url, samples=10):
+    """Median ms from POST /api/status/update to the matching SSE delta."""
+    received = {}
+    ready = threading.Event()
+
+    def reader():
+        with requests.get(f"{url}/api/stream", stream=True, timeout=60) as resp:
+            ready.set()
+            for line in resp.iter_lines(chunk_size=1, decode_unicode=True):
+                if line and line.startswith("data: "):
+                    console = json.loads(line[6:]).get("telemetry", {}).get("console", [])
+                    for entry in console:
+                        if entry.startswith("latency-probe"):
+                            received.setdefault(entry, time.perf_counter())
+                if len(received) >= samples:
+                    return
+
+    t = threading.Thread(target=reader, daemon=True)
+    t.start()
+    ready.wait(10)
+    time.sleep(0.5)
+    http = requests.Session()
+    delays = []
+    for n in range(samples):
+        probe = f"latency-probe {n}"
+        sent = time.perf_counter()
+        http.post(f"{url}/api/status/update", json={"robot": "Ready", "printer": "idle", "console_append": [probe]})
+        deadline = time.time() + 5
+        while probe not in received and time.time() < deadline:
+            time.sleep(0.002)
+        if probe in received:
+            delays.append((received[probe] - sent) * 1000)
+        time.sleep(0.1)
+    return statistics.median(delays) if delays else None, len(delays)
+
+def main():
+    parser = argparse.ArgumentParser(description="Dashboard serving load profile")
+    parser.add_argument("--modes", nargs="+", default=["dev", "waitress", "gunicorn:2", "gunicorn:4"],
+                        help="dev | waitress | gunicorn:<workers>")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=15.0)
+    parser.add_argument("--jobs", type=int, default=20)
+    args = parser.parse_args()
+
+    gcode = "G90\nM83\nG1 Z0.2 F300\n" + "".join(f"G1 X{i % 100} Y{i // 100} E0.05 F1500\n" for i in range(2000))
+    print(f"{'mode':<14}{'req/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'errors':>8}{'SSE ms':>9}")
+    for mode in args.modes:
+        with tempfile.TemporaryDirectory(prefix="bench_serving_") as data_dir:
+            proc, url = start_server(mode, free_port(), data_dir)
+            try:
+                for n in range(args.jobs):
+                    requests.post(f"{url}/api/jobs", json={"name": f"load_{n}", "gcode": gcode + f"; {n}\n"})
+                time.sleep(1.0)
+                result = run_load(url, args.clients, args.seconds)
+                sse, got = stream_latency(url)
+            finally:
+                stop_server(proc)
+        sse_text = f"{sse:.1f}" if sse is not None else "n/a"
+        print(f"{mode:<14}{result['rps']:>9,.0f}{result['p50']:>9.1f}{result['p99']:>9.1f}"
+              f"{result['errors']:>8}{sse_text:>9}")
+
+if __name__ == "__main__":
+    main()
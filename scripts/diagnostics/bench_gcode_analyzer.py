@@ -0,0 +1,61 @@
+import sys
+import os
+import json
+import time
+import argparse
+import tempfile
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from pkg.gcode.analyzer import analyze_file
+
+# Throughput check for the streaming G-code analyzer. Analyzes a real file if
+# one is given, otherwise a synthetic layered print of --size-mb megabytes:
+#
+#   python scripts/diagnostics/bench_gcode_analyzer.py --size-mb 100
+#   python scripts/diagnostics/bench_gcode_analyzer.py FGF_Test_200C_2.gcode
+
+def make_gcode(path, size_mb):
+    """Writes a synthetic layered print (absolute E, comments, layer hops)."""
+    target = size_mb * 1024 * 1024
+    with open(path, 'w') as f:
+        f.write("G90\nM82\nG28\nM190 S60\nM109 S210\nG92 E0\n")
+        e, z, layer = 0.0, 0.2, 0
+        while f.tell() < target:
+            f.write(f";LAYER:{layer}\n")
+            for i in range(2000):
+                e += 0.0421
+                f.write(f"G1 X{100 + (i % 50) * 0.8:.3f} Y{100 + (i // 50) * 0.8:.3f} E{e:.5f} F1800 ; infill\n")
+            layer += 1
+            z += 0.2
+            f.write(f"G1 E{e - 0.8:.5f} F2400\nG1 Z{z:.2f} F600\nG0 X100 Y100 F9000\nG1 E{e:.5f} F2400\n")
+
+def main():
+    parser = argparse.ArgumentParser(description="G-code analyzer throughput")
+    parser.add_argument("path", nargs="?", help="G-code file (default: synthetic)")
+    parser.add_argument("--size-mb", type=int, default=100)
+    args = parser.parse_args()
+
+    tmp = None
+    path = args.path
+    if path is None:
+        tmp = tempfile.TemporaryDirectory(prefix="bench_analyzer_")
+        path = os.path.join(tmp.name, "bench.gcode")
+        print(f"📝 Generating {args.size_mb} MB of G-code...")
+        make_gcode(path, args.size_mb)
+
+    try:
+        t0 = time.perf_counter()
+        result = analyze_file(path)
+        elapsed = time.perf_counter() - t0
+        size_mb = os.path.getsize(path) / 1024 / 1024
+        print(json.dumps(result.as_dict(), indent=2))
+        print(f"⏱️  {size_mb:.1f} MB in {elapsed:.2f}s "
+              f"({size_mb / elapsed:.1f} MB/s, {result.lines / elapsed / 1e6:.2f} M lines/s)")
+    finally:
+        if tmp is not None:
+            tmp.cleanup()
+
+if __name__ == "__main__":
+    main()
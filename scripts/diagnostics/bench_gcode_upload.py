@@ -0,0 +1,97 @@
+import sys
+import os
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from pkg.drivers.sv08_moonraker import MoonrakerClient
+from pkg.sim.fake_moonraker import FakeMoonrakerHTTP
+
+# Compares peak RSS and throughput of the in-memory string upload against the
+# streaming upload paths. Each mode runs in a fresh subprocess so the peak RSS
+# of one mode does not leak into the next.
+#
+#   python scripts/diagnostics/bench_gcode_upload.py --size-mb 50
+
+MODES = ["string", "stream_path", "stream_lines"]
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return float('nan')
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+def make_gcode(path, size_mb):
+    """Writes a synthetic zig-zag print of roughly `size_mb` megabytes."""
+    target = size_mb * 1024 * 1024
+    written = 0
+    with open(path, 'w') as f:
+        f.write("G90\nM83\nG28\n")
+        i = 0
+        while written < target:
+            line = f"G1 X{100 + (i % 200) * 0.5:.3f} Y{100 + (i // 200 % 200) * 0.5:.3f} E0.0421 F1800\n"
+            f.write(line)
+            written += len(line)
+            i += 1
+
+def run_mode(mode, path, port):
+    client = MoonrakerClient("127.0.0.1", port)
+    client.policies['upload'].timeout = 300
+    base_rss = peak_rss_mb()
+    t0 = time.perf_counter()
+    if mode == "string":
+        with open(path) as f:
+            content = f.read()
+        ok = client.upload_gcode(content, "bench.gcode")
+    elif mode == "stream_path":
+        ok = client.upload_gcode_stream(path, "bench.gcode")
+    elif mode == "stream_lines":
+        with open(path) as f:
+            ok = client.upload_gcode_stream((line for line in f), "bench.gcode")
+    else:
+        raise ValueError(mode)
+    elapsed = time.perf_counter() - t0
+    size_mb = os.path.getsize(path) / 1e6
+    print(json.dumps({
+        "mode": mode, "ok": ok, "seconds": elapsed, "mb_per_s": size_mb / elapsed,
+        "peak_rss_mb": peak_rss_mb(), "rss_growth_mb": peak_rss_mb() - base_rss,
+    }))
+
+def main():
+    parser = argparse.ArgumentParser(description="G-code upload benchmark")
+    parser.add_argument("--size-mb", type=int, default=50)
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--file", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, args.file, args.port)
+        return
+
+    fake = FakeMoonrakerHTTP().start()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.gcode")
+        print(f"📝 Generating {args.size_mb} MB of G-code...")
+        make_gcode(path, args.size_mb)
+
+        print(f"{'mode':<14}{'MB/s':>10}{'peak RSS':>12}{'RSS growth':>13}")
+        for mode in MODES:
+            out = subprocess.run([sys.executable, __file__, "--mode", mode, "--file", path,
+                                  "--port", str(fake.port)], capture_output=True, text=True)
+            if out.returncode != 0:
+                print(f"{mode:<14} FAILED\n{out.stderr}")
+                continue
+            r = json.loads(out.stdout.strip().splitlines()[-1])
+            print(f"{mode:<14}{r['mb_per_s']:>10.1f}{r['peak_rss_mb']:>10.1f}MB{r['rss_growth_mb']:>11.1f}MB")
+    fake.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import sys
+import os
+import time
+import random
+import argparse
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from services.dashboard.job_queue import JobQueue
+
+# Scaling of the dispatch queue with batch-experiment sized queues: the old
+# list operations (pop(0), scan + insert(0), rebuild-by-comprehension) vs
+# the indexed heap. Also cross-checks the heap's order against a full sort.
+#
+#   python scripts/diagnostics/bench_job_queue.py --sizes 1000 10000 100000
+
+class ListQueue:
+    """The pre-heap behaviour of the dashboard routes, for comparison."""
+    def __init__(self):
+        self.queue = []
+
+    def push(self, job_id, priority=0, deadline=None, seq=None):
+        self.queue.append({"id": job_id})
+
+    def pop(self):
+        return self.queue.pop(0)['id'] if self.queue else None
+
+    def promote(self, job_id):
+        idx = next((i for i, j in enumerate(self.queue) if j['id'] == job_id), -1)
+        if idx > 0:
+            self.queue.insert(0, self.queue.pop(idx))
+
+    def remove(self, job_id):
+        self.queue = [j for j in self.queue if j['id'] != job_id]
+
+    def get(self, job_id):
+        return next((j for j in self.queue if j['id'] == job_id), None)
+
+def run(queue_cls, size, ops, rng):
+    ids = [f"job{n:07d}" for n in range(size)]
+    queue = queue_cls()
+    t0 = time.perf_counter()
+    for n, job_id in enumerate(ids):
+        queue.push(job_id, priority=rng.randrange(3), deadline=None, seq=n)
+    timings = {"push": (time.perf_counter() - t0) / size}
+
+    sample = rng.sample(ids, ops * 3)
+    for name, batch in (("get", sample[:ops]), ("promote", sample[ops:2 * ops]), ("remove", sample[2 * ops:])):
+        fn = getattr(queue, name)
+        t0 = time.perf_counter()
+        for job_id in batch:
+            fn(job_id)
+        timings[name] = (time.perf_counter() - t0) / ops
+
+    t0 = time.perf_counter()
+    for _ in range(ops):
+        queue.pop()
+    timings["pop"] = (time.perf_counter() - t0) / ops
+    return timings
+
+def check_order(size, rng):
+    """Heap order must equal sorting by (-priority, deadline, seq) after random updates."""
+    queue = JobQueue()
+    keys = {}
+    for n in range(size):
+        job_id = f"job{n}"
+        keys[job_id] = (rng.randrange(5), rng.choice([None, rng.uniform(0, 1000)]), n)
+        queue.push(job_id, *keys[job_id])
+    for job_id in rng.sample(sorted(keys), size // 4):
+        del keys[job_id]
+        queue.remove(job_id)
+    for job_id in rng.sample(sorted(keys), size // 4):
+        priority, deadline, seq = keys[job_id]
+        keys[job_id] = (rng.randrange(5), deadline, seq)
+        queue.update(job_id, priority=keys[job_id][0])
+    expected = sorted(keys, key=lambda j: (-keys[j][0], float('inf') if keys[j][1] is None else keys[j][1], keys[j][2]))
+    popped = [queue.pop() for _ in range(len(expected))]
+    assert popped == expected, "heap order diverged from sorted order"
+    assert queue.pop() is None and len(queue) == 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Dispatch queue scaling benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000, 100000])
+    parser.add_argument("--ops", type=int, default=300, help="Operations timed per kind")
+    args = parser.parse_args()
+
+    check_order(20000, random.Random(1))
+    print("✅ Heap order matches a full sort (20k jobs, removals and re-prioritizations)")
+
+    kinds = ("push", "pop", "promote", "remove", "get")
+    print(f"{'queue':<8}{'jobs':>9}" + "".join(f"{k + ' µs':>13}" for k in kinds))
+    for size in args.sizes:
+        for label, cls in (("list", ListQueue), ("heap", JobQueue)):
+            timings = run(cls, size, min(args.ops, size // 4), random.Random(0))
+            print(f"{label:<8}{size:>9,}" + "".join(f"{timings[k] * 1e6:>13,.2f}" for k in kinds))
+
+if __name__ == "__main__":
+    main()
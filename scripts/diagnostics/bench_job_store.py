@@ -0,0 +1,89 @@
+import sys
+import os
+import time
+import random
+import argparse
+import tempfile
+import logging
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from services.dashboard.job_store import JobStore
+
+# Enqueue / dequeue / promote cost of the SQLite job store with a deep queue.
+# Each operation is its own transaction, as it is when driven by the routes.
+#
+#   python scripts/diagnostics/bench_job_store.py --jobs 100000
+
+def make_job(n):
+    return {
+        "id": f"{n:08x}",
+        "name": f"bench_job_{n}",
+        "metadata": {"batch": n // 1000},
+        "created_at": time.time(),
+        "status": "pending",
+        "material_est_g": 12.5,
+        "material_est_source": "analysis",
+        "analysis": {"filament_g": 12.5, "print_time_s": 1800.0, "layer_count": 120},
+        "source_sha256": f"{n:064x}",
+        "gcode_sha256": f"{n:064x}",
+        "gcode_size": 1024
+    }
+
+def timed(label, count, fn):
+    t0 = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - t0
+    print(f"{label:<28}{count:>10,}{elapsed:>10.2f}s{count / elapsed:>12,.0f}/s{elapsed / count * 1e6:>12,.0f} µs/op")
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite job store benchmark")
+    parser.add_argument("--jobs", type=int, default=100000)
+    parser.add_argument("--ops", type=int, default=2000, help="Dequeues / promotes / lookups to time")
+    args = parser.parse_args()
+
+    logging.getLogger("Dashboard").setLevel(logging.WARNING)
+    tmp = tempfile.TemporaryDirectory(prefix="bench_job_store_")
+    store = JobStore(os.path.join(tmp.name, 'dashboard.db'))
+    rng = random.Random(0)
+
+    print(f"{'operation':<28}{'count':>10}{'total':>11}{'rate':>14}{'latency':>18}")
+    timed("enqueue (1 txn each)", args.jobs,
+          lambda: [store.add(make_job(n)) for n in range(args.jobs)])
+
+    ids = [f"{n:08x}" for n in rng.sample(range(args.jobs), args.ops)]
+    timed("promote (priority update)", args.ops,
+          lambda: [store.update(job_id, priority=i + 1) for i, job_id in enumerate(ids)])
+
+    def dequeue():
+        for _ in range(args.ops):
+            job = store.peek_next()
+            store.start(job['id'])
+            store.finish(job['id'], {"result": "success"})
+    timed("dequeue (peek+start+finish)", args.ops, dequeue)
+
+    def view():
+        for _ in range(args.ops // 10):
+            store.queue(100)
+            store.queue_count()
+            store.history(10)
+            store.current()
+    timed("dashboard view (head 100)", args.ops // 10, view)
+
+    cold = [f"{n:08x}" for n in rng.sample(range(args.jobs), args.ops)]
+    timed("get (cold rows)", args.ops, lambda: [store.get(job_id) for job_id in cold])
+    timed("get (hot rows, LRU)", args.ops, lambda: [store.get(job_id) for job_id in cold[:100] * (args.ops // 100)])
+
+    def telemetry():
+        for i in range(args.ops * 10):
+            store.record_telemetry("Ready", "printing", 60.0, i / (args.ops * 10), i * 100)
+        store.flush_telemetry()
+    timed("telemetry sample (batched)", args.ops * 10, telemetry)
+
+    print(f"📦 Database: {os.path.getsize(store.path) / 1e6:.1f} MB, {store.queue_count():,} still queued")
+    store.close()
+    tmp.cleanup()
+
+if __name__ == "__main__":
+    main()
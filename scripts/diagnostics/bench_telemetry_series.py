@@ -0,0 +1,52 @@
+import sys
+import os
+import time
+import gzip
+import json
+import argparse
+import math
+import random
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from services.dashboard.telemetry_series import TelemetrySeries
+
+# Cost of the telemetry ring buffer behind /api/telemetry/series: fills it
+# with --hours of 1 Hz status reports (a heat-print-cooldown cycle every
+# 40 minutes), then times appends and the downsampled query a 24 h chart
+# makes, and reports the JSON size raw and gzipped.
+#
+#   python scripts/diagnostics/bench_telemetry_series.py --hours 24 --points 300
+
+def main():
+    parser = argparse.ArgumentParser(description="Telemetry series benchmark")
+    parser.add_argument("--hours", type=float, default=24.0)
+    parser.add_argument("--points", type=int, default=300)
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+
+    series = TelemetrySeries()
+    rng = random.Random(0)
+    samples = int(args.hours * 3600)
+    t0 = time.time() - samples
+    start = time.perf_counter()
+    for n in range(samples):
+        phase = (n % 2400) / 2400
+        temp = 60 * math.exp(-8 * (phase - 0.75)) if phase > 0.75 else 60.0
+        series.append(t0 + n, temp=temp + rng.gauss(0, 0.2), progress=min(phase / 0.75, 1.0),
+                      robot="Ready" if phase < 0.9 else "Harvesting", printer="printing" if phase < 0.75 else "complete")
+    append_us = (time.perf_counter() - start) / samples * 1e6
+    print(f"📈 {samples:,} samples, {series.capacity:,} slots, append {append_us:.1f} µs/sample")
+
+    for method in ("minmax", "lttb"):
+        start = time.perf_counter()
+        for _ in range(args.queries):
+            result = series.downsample(t0, t0 + samples, args.points, method)
+            body = json.dumps(result, separators=(',', ':')).encode()
+        query_ms = (time.perf_counter() - start) / args.queries * 1000
+        print(f"   {method:<7} {args.hours:g} h → {args.points} points: {query_ms:.2f} ms/query, "
+              f"{len(body) / 1024:.1f} KB JSON, {len(gzip.compress(body, 6)) / 1024:.1f} KB gzipped")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import sys
+import os
+import time
+import asyncio
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from pkg.drivers.moonraker_ws import MoonrakerSubscriber
+from pkg.sim.fake_moonraker import FakeMoonrakerWS
+
+# Offline check of the push-based status mirror against a local fake Moonraker.
+# Pass a printer IP to watch a real printer instead: check_moonraker_ws.py 192.168.50.231
+
+async def run_offline():
+    fake = await FakeMoonrakerWS().start()
+    print(f"🧪 Fake Moonraker listening on {fake.url}")
+
+    sub = MoonrakerSubscriber(fake.host, fake.port)
+    await sub.start()
+    print(f"✅ Subscribed. Initial state: {sub.get('print_stats.state')}")
+
+    # 1. Simulate a short print
+    await fake.update({"print_stats": {"state": "printing", "filename": "job_test.gcode"}})
+    assert await sub.wait_for_value('print_stats.state', 'printing', timeout=1.0) == 'printing'
+
+    for pct in range(0, 101, 20):
+        await fake.update({"display_status": {"progress": pct / 100.0}})
+        await asyncio.sleep(0.05)
+    print(f"   Progress mirrored: {sub.get('display_status.progress'):.2f}")
+
+    # 2. Measure completion latency (push vs. the old 2 s poll)
+    waiter = asyncio.ensure_future(sub.wait_for_value('print_stats.state', ('complete', 'error'), timeout=5.0))
+    await asyncio.sleep(0.1)
+    t0 = time.perf_counter()
+    await fake.update({"print_stats": {"state": "complete"}})
+    state = await waiter
+    latency_ms = (time.perf_counter() - t0) * 1000
+    print(f"✅ Saw '{state}' {latency_ms:.2f} ms after the printer reported it (poll loop: up to 2000 ms)")
+
+    # 3. Timeouts return None instead of raising
+    assert await sub.wait_for_value('print_stats.state', 'printing', timeout=0.2) is None
+
+    await sub.close()
+    await fake.stop()
+    print("✅ Test Complete.")
+
+async def watch_printer(ip):
+    sub = MoonrakerSubscriber(ip)
+    await sub.start()
+    print(f"✅ Subscribed to {ip}. Ctrl+C to stop.")
+    last = None
+    try:
+        while True:
+            await sub.wait_for(lambda s: s.version != last)
+            last = sub.version
+            print(f"[{sub.get('print_stats.state')}] progress={sub.get('display_status.progress', 0.0):.3f} "
+                  f"bed={sub.get('heater_bed.temperature', 0.0):.1f}C")
+    finally:
+        await sub.close()
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        try:
+            asyncio.run(watch_printer(sys.argv[1]))
+        except KeyboardInterrupt:
+            pass
+    else:
+        asyncio.run(run_offline())
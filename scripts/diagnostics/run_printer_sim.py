@@ -0,0 +1,46 @@
+import sys
+import os
+import time
+import json
+import argparse
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from pkg.sim.klipper_sim import KlipperSimulator
+
+# Local Moonraker/Klipper simulator for load-testing the orchestrator without
+# tying up the SV08. Point `printer_ip` in config/cell_config.yaml at this host
+# and run, e.g. at 100x real time:
+#
+#   python scripts/diagnostics/run_printer_sim.py --speed 100
+#
+# Cycle throughput and reaction latency are printed periodically and served
+# at http://<host>:<port>/sim/stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Moonraker/Klipper print simulator")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=7125)
+    parser.add_argument("--speed", type=float, default=1.0, help="Simulated seconds per wall second")
+    parser.add_argument("--bed-temp", type=float, default=60.0, help="Bed target when the G-code sets none")
+    parser.add_argument("--ambient", type=float, default=25.0)
+    parser.add_argument("--report-every", type=float, default=10.0)
+    args = parser.parse_args()
+
+    sim = KlipperSimulator(args.host, args.port, speed=args.speed,
+                           default_bed_target=args.bed_temp, ambient=args.ambient).start()
+    print(f"🖨️  Simulated printer on {args.host}:{sim.port} at {args.speed:g}x real time")
+
+    try:
+        while True:
+            time.sleep(args.report_every)
+            print(json.dumps(sim.stats()))
+    except KeyboardInterrupt:
+        print("\nFinal stats:")
+        print(json.dumps(sim.stats(), indent=2))
+    finally:
+        sim.stop()
+
+if __name__ == "__main__":
+    main()
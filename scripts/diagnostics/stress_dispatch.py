@@ -0,0 +1,132 @@
+import sys
+import os
+import time
+import random
+import argparse
+import tempfile
+import threading
+import logging
+from collections import Counter
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+# Concurrency stress test for job dispatch. Many "orchestrator" threads
+# hammer /api/jobs/next (completing each job they win right away) while a
+# "UI" thread promotes jobs and edits settings. Passes if every job was
+# dispatched exactly once and material_remaining_g was charged exactly once
+# per job. Runs in-process on temporary stores by default, or against a
+# running dashboard with --url.
+#
+#   python scripts/diagnostics/stress_dispatch.py --jobs 200 --threads 16
+#   python scripts/diagnostics/stress_dispatch.py --url http://localhost:5000
+
+GCODE = "G90\nM83\nG1 Z0.2 F300\nG1 X10 Y10 E0.5 F1500\nG1 X20 Y10 E0.5\n"
+MATERIAL_PER_JOB = 1.0
+
+class HttpClient:
+    """requests-based stand-in for the Flask test client."""
+    def __init__(self, base_url):
+        import requests
+        self.base_url = base_url.rstrip('/')
+        self.session = requests.Session()
+
+    def request(self, method, path, json=None):
+        resp = self.session.request(method, f"{self.base_url}{path}", json=json, timeout=30)
+        return resp.status_code, (resp.json() if resp.content else None)
+
+class LocalClient:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, json=None):
+        resp = self.client.open(path, method=method, json=json)
+        return resp.status_code, resp.get_json(silent=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Dispatch exactly-once stress test")
+    parser.add_argument("--jobs", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--url", help="Dashboard base URL (default: in-process app on temp stores)")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    args = parser.parse_args()
+
+    if args.url:
+        make_client = lambda: HttpClient(args.url)
+    else:
+        import services.dashboard.app as dashboard
+        from services.dashboard.blob_store import BlobStore
+        from services.dashboard.job_store import JobStore
+        from services.dashboard.job_queue import JobQueue
+        logging.getLogger("Dashboard").setLevel(logging.WARNING)
+        tmp = tempfile.TemporaryDirectory(prefix="stress_dispatch_")
+        dashboard.BLOBS = BlobStore(os.path.join(tmp.name, 'blobs'))
+        dashboard.JOBS = JobStore(os.path.join(tmp.name, 'dashboard.db'))
+        dashboard.QUEUE = JobQueue()
+        make_client = lambda: LocalClient(dashboard.app)
+
+    client = make_client()
+    material_start = args.jobs * MATERIAL_PER_JOB + 1000.0
+    client.request('POST', '/api/maintenance/refill', {"amount": material_start})
+    client.request('POST', '/api/queue/control', {"action": "resume"})
+
+    print(f"📝 Queueing {args.jobs} jobs...")
+    job_ids = set()
+    for n in range(args.jobs):
+        _, body = client.request('POST', '/api/jobs', {"name": f"stress_{n}", "gcode": GCODE + f"; {n}\n",
+                                                       "material_est": MATERIAL_PER_JOB})
+        job_ids.add(body['job_id'])
+
+    dispatched = Counter()
+    errors = Counter()
+    lock = threading.Lock()
+    done = threading.Event()
+
+    def orchestrator():
+        http = make_client()
+        while not done.is_set():
+            status, body = http.request('GET', '/api/jobs/next')
+            if status == 200:
+                job_id = body['job']['id']
+                with lock:
+                    dispatched[job_id] += 1
+                    if set(dispatched) >= job_ids:
+                        done.set()
+                status, _ = http.request('POST', f'/api/jobs/{job_id}/complete', {"result": "success"})
+            if status >= 500:
+                with lock:
+                    errors[status] += 1
+
+    def ui():
+        http = make_client()
+        rng = random.Random(0)
+        pending = sorted(job_ids)
+        while not done.is_set():
+            http.request('POST', f'/api/jobs/{rng.choice(pending)}/promote')
+            http.request('POST', '/api/settings/update', {"speed_override": rng.choice([0.9, 1.0, 1.1])})
+
+    threads = [threading.Thread(target=orchestrator) for _ in range(args.threads)] + [threading.Thread(target=ui)]
+    t0 = time.time()
+    for t in threads:
+        t.start()
+    done.wait(args.timeout)
+    done.set()
+    for t in threads:
+        t.join()
+    elapsed = time.time() - t0
+
+    _, data = client.request('GET', '/api/dashboard_data')
+    material_end = data['settings']['material_remaining_g']
+    expected_material = material_start - len(dispatched) * MATERIAL_PER_JOB
+    doubles = {j: n for j, n in dispatched.items() if n > 1}
+    missing = job_ids - set(dispatched)
+
+    print(f"⏱️  {sum(dispatched.values())} dispatches in {elapsed:.1f}s with {args.threads} orchestrator threads")
+    print(f"   double-dispatched: {len(doubles)}   never dispatched: {len(missing)}   5xx: {sum(errors.values())}")
+    print(f"   material: {material_end:.1f} g left, expected {expected_material:.1f} g")
+    ok = not doubles and not missing and not errors and abs(material_end - expected_material) < 1e-6
+    print("✅ Every job dispatched exactly once" if ok else "❌ Dispatch invariant violated")
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
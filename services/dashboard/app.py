@@ -2,30 +2,105 @@ import sys
 import os
 import time
 import uuid
+import json
+import gzip
 import logging
-from flask import Flask, jsonify, request, render_template
+import atexit
+import tempfile
+import threading
+import yaml
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, Response, g, jsonify, request, render_template, send_file
 
 # Add Project Root to Path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
 
+from pkg.gcode.indexer import index_stream, GcodeIndex
+from pkg.gcode.pipeline import run_pipeline, load_epilogue, PipelineStats
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../'))
+CONFIG_PATH = os.path.join(PROJECT_ROOT, 'config', 'cell_config.yaml')
+DATA_DIR = os.environ.get('DASHBOARD_DATA_DIR', os.path.join(PROJECT_ROOT, 'data'))
+BLOB_DIR = os.path.join(DATA_DIR, 'blobs')
+DB_PATH = os.path.join(DATA_DIR, 'dashboard.db')
+
+# Set by serve.py when several worker processes serve the app: telemetry,
+# settings and the change counters then go through the database as well,
+# and each worker follows the others' commits (see sync_shared_state).
+SHARED_STATE = os.environ.get('DASHBOARD_SHARED_STATE') == '1'
+SHARED_SYNC_SEC = 0.1
+
+from services.dashboard.blob_store import BlobStore
+from services.dashboard.job_store import JobStore
+from services.dashboard.job_queue import JobQueue
+from services.dashboard.state_actor import StateActor
+from services.dashboard.telemetry_series import TelemetrySeries
+from pkg.utils.metrics import REGISTRY as METRICS, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from services.dashboard.uploads import iter_chunks, iter_multipart_file, iter_lines, tee_chunks
+
 app = Flask(__name__)
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - [Dashboard] - %(message)s')
 logger = logging.getLogger("Dashboard")
 
 # --- GLOBAL STATE ---
+# Jobs (queue, current, history) and settings live in JOBS (SQLite);
+# STATE only holds telemetry and change counters. STATE and SETTINGS are
+# copy-on-write: only WRITER commands change them, by publish()ing new
+# dicts, so a reader that grabs STATE once sees one consistent version.
 STATE = {
-    "queue": [],
-    "history": [],
-    "current_job": None,
-    
     # Telemetry
     "robot_status": "Offline",     
     "printer_status": "Offline",
     "printer_temp": 0.0,
     "job_progress": 0.0,
-    "printer_console": [] 
+    "printer_console": deque(maxlen=200),  # Append-only ring buffer
+    "console_seq": 0,                      # Total lines ever appended
+    "printer_link": {},                    # Circuit breaker / connection telemetry
+    "cooldown_eta": None,                  # Predicted seconds until bed reaches target
+    "file_position": 0,                    # virtual_sdcard byte offset of the running print
+
+    # Change counters: `version` moves on any change, `jobs_version` only
+    # when a job is added, edited or moves between queue/current/history.
+    # `version` starts at the boot time in ms, so it keeps increasing across
+    # restarts and a stale ETag or ?since= from before a restart never matches.
+    "version": int(time.time() * 1000),
+    "jobs_version": 0
 }
 
+# /api/dashboard_data payload as (version, dict, serialized body) and job summaries, rebuilt on change
+_DASHBOARD_CACHE = {"entry": (-1, None, None)}
+_GZIP_CACHE = {"entry": (-1, None)}
+# Recent payloads by version, the bases for ?since= deltas
+_SNAPSHOT_HISTORY = deque(maxlen=64)
+GZIP_MIN_BYTES = 1024
+_JOBS_CACHE = {"entry": (-1, None)}
+
+# G-code bodies live on disk by sha256; jobs only carry the digest
+BLOBS = BlobStore(BLOB_DIR)
+
+# Durable queue / history / settings
+JOBS = JobStore(DB_PATH)
+
+# In-memory dispatch order of the pending jobs (ids only), rebuilt from JOBS at boot
+QUEUE = JobQueue()
+QUEUE.load(JOBS.pending_keys())
+
+# Status history for charts (temperature, progress, robot/printer state),
+# seeded from the stored telemetry so a restart keeps the last day
+SERIES = TelemetrySeries()
+for ts, robot, printer, temp, progress in JOBS.recent_telemetry(SERIES.capacity):
+    SERIES.append(ts, temp=temp, progress=progress, robot=robot, printer=printer)
+SERIES_MAX_POINTS = 2000
+
+# The dashboard lists the head of the queue; the total is sent as queue_count
+QUEUE_VIEW_LIMIT = 100
+HISTORY_VIEW_LIMIT = 10
+
+# Loaded layer / byte-offset indexes (GcodeIndex) by G-code digest. The index
+# itself is saved next to the blob as <sha256>.idx.
+INDEXES = {}
+
 # Settings (User Adjustable)
 SETTINGS = {
     "system_paused": False,
@@ -34,46 +109,493 @@ SETTINGS = {
     "auto_harvest": True,
     "skip_inspection": False,
     "material_remaining_g": 1000.0,
-    "material_low_threshold": 200.0
+    "material_low_threshold": 200.0,
+    "filament_diameter_mm": 1.75,
+    "filament_density_g_cm3": 1.24,
+    "optimize_gcode": True,
+    "append_epilogue": True
 }
+SETTINGS.update(JOBS.load_settings(SETTINGS))
+JOBS.save_settings(SETTINGS)  # Every key present, so dispatch can read them in SQL
+
+# Every mutation of STATE, SETTINGS, JOBS and QUEUE runs as a command on this one thread
+WRITER = StateActor()
+
+DEFAULT_MATERIAL_EST_G = 50.0
+
+def load_epilogue_config(path):
+    """Harvest epilogue (epilogue_file + park_command from printer_safety) as byte lines."""
+    if not os.path.exists(path):
+        logger.warning(f"⚠️ No cell config at {path}; G-code epilogue disabled")
+        return []
+    try:
+        with open(path, 'r') as f:
+            safety = (yaml.safe_load(f) or {}).get('printer_safety', {})
+        epilogue_file = safety.get('epilogue_file')
+        if epilogue_file and not os.path.isabs(epilogue_file):
+            epilogue_file = os.path.join(PROJECT_ROOT, epilogue_file)
+        return load_epilogue(epilogue_file, safety.get('park_command'))
+    except Exception as e:
+        logger.error(f"❌ Failed to load G-code epilogue: {e}")
+        return []
+
+EPILOGUE = load_epilogue_config(CONFIG_PATH)
+
+# G-code processing runs off the request thread so large uploads queue instantly
+ANALYSIS_POOL = ThreadPoolExecutor(max_workers=1, thread_name_prefix="gcode-analysis")
+
+def process_lines(lines, settings):
+    """
+    The one streaming pass over a job's G-code: the transform pipeline
+    (minify + harvest epilogue) writes the printed blob while the
+    analyzer/indexer reads the same lines, so the analysis and layer
+    offsets describe the bytes that will actually be printed. Returns
+    (index, result, stats, digest, size); stats/digest/size are None when
+    the settings ask for no transform and the source is printed as-is.
+    """
+    optimize = settings['optimize_gcode']
+    epilogue = EPILOGUE if settings['append_epilogue'] else None
+    analyzer_kwargs = {"filament_diameter": float(settings['filament_diameter_mm']),
+                       "density": float(settings['filament_density_g_cm3'])}
+    if not (optimize or epilogue):
+        index, result = index_stream(lines, **analyzer_kwargs)
+        return index, result, None, None, None
+
+    stats = PipelineStats()
+    with BLOBS.writer() as writer:
+        def tee(lines):
+            for line in lines:
+                writer.write(line)
+                yield line
+        lines = run_pipeline(lines, stats, strip=optimize, dedupe=optimize,
+                             merge_tolerance=0.01 if optimize else None, epilogue=epilogue)
+        index, result = index_stream(tee(lines), **analyzer_kwargs)
+        digest, size = writer.commit()
+    return index, result, stats, digest, size
+
+def processed_fields(job, index, result, stats, digest, size):
+    """
+    Job fields from a process_lines() pass over the printed blob
+    `digest`: gcode_sha256/gcode_size, analysis, transform and, if the
+    user gave no estimate, material_est_g. Saves the index sidecar.
+    """
+    index.save(BLOBS.sidecar(digest, 'idx'))
+    INDEXES[digest] = index
+    analysis = result.as_dict()
+    analysis['layer_count'] = index.layer_count
+    fields = {"gcode_sha256": digest, "gcode_size": size, "analysis": analysis}
+    if stats:
+        fields['transform'] = stats.as_dict()
+    if job['material_est_source'] == 'default':
+        fields['material_est_g'] = round(result.filament_g, 1)
+        fields['material_est_source'] = 'analysis'
+    return fields
+
+def log_processed(job_id, result, stats, t0):
+    saved = f", {stats.bytes_in} → {stats.bytes_out} bytes ({-stats.as_dict()['saved_pct']:+.1f}%)" if stats else ""
+    logger.info(f"🔬 Processed {job_id}{saved}: {result.filament_g:.1f}g, "
+                f"{result.print_time_s / 60:.1f} min ({time.time() - t0:.2f}s)")
+
+def process_job(job, *same_source):
+    """
+    Background worker for jobs queued with an inline G-code body: processes
+    the stored source blob once for `job` and any other jobs sharing it.
+    """
+    t0 = time.time()
+    jobs = (job,) + same_source
+    try:
+        with BLOBS.open(job['source_sha256']) as source:
+            index, result, stats, digest, size = process_lines(source, SETTINGS)
+        if digest is None:
+            digest, size = job['source_sha256'], job['gcode_size']
+        fields = [processed_fields(j, index, result, stats, digest, size) for j in jobs]
+    except Exception as e:
+        logger.error(f"❌ Analysis failed for {', '.join(j['id'] for j in jobs)}: {e}")
+        for j in jobs:
+            WRITER.call(apply_job_fields, j['id'], analysis={"error": str(e)})
+        return
+    for j, f in zip(jobs, fields):
+        WRITER.call(apply_job_fields, j['id'], **f)
+    log_processed(job['id'] if not same_source else f"{len(jobs)} jobs", result, stats, t0)
+    collect_blobs()
+
+def apply_job_fields(job_id, **fields):
+    """Writer command: stores processing results on a job."""
+    if not JOBS.update(job_id, **fields):
+        logger.info(f"🗑️ Job {job_id} was deleted while processing")
+    publish(jobs=True)
+
+def job_index(job):
+    """The job's GcodeIndex (cached, else loaded from its sidecar), or None."""
+    digest = job.get('gcode_sha256') if job else None
+    if digest is None:
+        return None
+    index = INDEXES.get(digest)
+    if index is None:
+        path = BLOBS.sidecar(digest, 'idx')
+        if os.path.exists(path):
+            index = INDEXES[digest] = GcodeIndex.load(path)
+    return index
+
+def collect_blobs():
+    """Deletes blobs no queued, running or recent job refers to."""
+    for digest in BLOBS.gc(JOBS.live_blobs(HISTORY_VIEW_LIMIT)):
+        INDEXES.pop(digest, None)
+
+def current_job_detail(file_position):
+    """Layer / time-remaining for the running job from its index, or None."""
+    index = job_index(JOBS.current())
+    if index is None:
+        return None
+    return index.progress_at(file_position)
+
+# Signalled on every state change; wakes the SSE streams
+CHANGED = threading.Condition()
+STREAM_KEEPALIVE_SEC = 15.0
+
+def publish(jobs=False, settings=None, save=True, **state):
+    """
+    Writer-only. Swaps in a copy of STATE with `state` applied (and of
+    SETTINGS with `settings`, saved unless `save` is False because the
+    caller already wrote them), bumps the versions and wakes the streams.
+    """
+    global STATE, SETTINGS
+    version = STATE['version'] + 1
+    jobs_version = STATE['jobs_version'] + (1 if jobs else 0)
+    if SHARED_STATE:
+        telemetry = {k: list(v) if isinstance(v, deque) else v for k, v in state.items()}
+        shared = JOBS.publish_state(telemetry, settings if save else None, jobs)
+        if shared != (version, jobs_version):
+            # Other workers committed since our last sync: take everything from the database
+            load_shared_state()
+            return
+    elif settings and save:
+        JOBS.save_settings(settings)
+    if settings:
+        SETTINGS = dict(SETTINGS, **settings)
+    new = dict(STATE, **state)
+    new['version'] = version
+    new['jobs_version'] = jobs_version
+    with CHANGED:
+        STATE = new
+        CHANGED.notify_all()
+
+def load_shared_state():
+    """Writer-only, shared mode. Rebuilds STATE, SETTINGS and (if jobs changed) QUEUE from the database."""
+    global STATE, SETTINGS
+    version, jobs_version, telemetry = JOBS.load_state()
+    if version == STATE['version']:
+        return
+    SETTINGS = JOBS.load_settings(SETTINGS)
+    if jobs_version != STATE['jobs_version']:
+        QUEUE.load(JOBS.pending_keys())
+    new = dict(STATE, **telemetry)
+    if new.get('telemetry_ts'):
+        append_series(new)  # Status reported to another worker, if not seen yet
+    new['printer_console'] = deque(new['printer_console'], maxlen=200)
+    new['version'] = version
+    new['jobs_version'] = jobs_version
+    with CHANGED:
+        STATE = new
+        CHANGED.notify_all()
+
+# telemetry_ts of the samples already in SERIES: a conflicting publish()
+# reloads the sample update_status just appended
+_SERIES_RECORDED = deque(maxlen=64)
+
+def append_series(state):
+    """Writer-only. Adds the state's status sample to SERIES unless it is already there."""
+    if state['telemetry_ts'] in _SERIES_RECORDED:
+        return
+    _SERIES_RECORDED.append(state['telemetry_ts'])
+    SERIES.append(state['telemetry_ts'], temp=state['printer_temp'], progress=state['job_progress'],
+                  robot=state['robot_status'], printer=state['printer_status'])
+
+_SHARED_SYNC = {"data_version": None}
+
+def sync_shared_state():
+    """
+    Writer command, shared mode. PRAGMA data_version on the writer's own
+    connection only moves when another connection commits, i.e. when
+    another worker changed something; then the row cache is dropped and
+    the state reloaded.
+    """
+    data_version = JOBS.data_version()
+    if data_version != _SHARED_SYNC['data_version']:
+        _SHARED_SYNC['data_version'] = data_version
+        JOBS.clear_cache()
+        load_shared_state()
+
+def follow_shared_state():
+    while True:
+        time.sleep(SHARED_SYNC_SEC)
+        try:
+            WRITER.call(sync_shared_state)
+        except Exception as e:
+            logger.error(f"❌ Shared state sync failed: {e}")
+
+def job_summary(job):
+    """The few hundred bytes of a job the dashboard lists; details come from /api/jobs/<id>."""
+    analysis = job.get('analysis') or {}
+    return {
+        "id": job['id'],
+        "name": job['name'],
+        "status": job['status'],
+        "created_at": job['created_at'],
+        "started_at": job.get('started_at'),
+        "material_est_g": job['material_est_g'],
+        "material_est_source": job['material_est_source'],
+        "est_time_s": analysis.get('print_time_s'),
+        "layer_count": analysis.get('layer_count'),
+        "gcode_size": job.get('gcode_size'),
+        "saved_pct": job['transform']['saved_pct'] if job.get('transform') else None,
+        "processing": job.get('analysis') is None,
+        "error": analysis.get('error')
+    }
+
+def job_summaries(version):
+    """Summaries of queue, recent history and the current job, cached per jobs_version."""
+    entry = _JOBS_CACHE['entry']
+    if entry[0] != version:
+        current = JOBS.current()
+        entry = _JOBS_CACHE['entry'] = (version, {
+            "queue": [job_summary(j) for j in JOBS.queue(QUEUE_VIEW_LIMIT)],
+            "queue_count": JOBS.queue_count(),
+            "history": [job_summary(j) for j in JOBS.history(HISTORY_VIEW_LIMIT)],
+            "current_job": job_summary(current) if current else None
+        })
+    return entry[1]
+
+# --- METRICS ---
+# Per process: with several gunicorn workers each scrape of /metrics sees
+# the worker that happened to serve it.
+HTTP_REQUESTS = METRICS.counter("dashboard_http_requests_total", "Requests handled, by route, method and status",
+                                ("route", "method", "status"))
+HTTP_IN_FLIGHT = METRICS.gauge("dashboard_http_requests_in_flight", "Requests currently being handled", ("route",))
+HTTP_LATENCY = METRICS.histogram("dashboard_http_request_duration_seconds",
+                                 "Time to build the response (for /api/stream: until the stream opens)",
+                                 ("route", "method"))
+QUEUE_GAUGE = METRICS.gauge("dashboard_queue_jobs", "Pending jobs")
+WRITER_BACKLOG_GAUGE = METRICS.gauge("dashboard_writer_backlog", "State commands waiting for the writer thread")
+SERIES_GAUGE = METRICS.gauge("dashboard_telemetry_series_samples", "Samples held in the telemetry ring buffer")
+
+def metrics_route():
+    """The route pattern (not the URL), so job ids don't explode the label set."""
+    return request.url_rule.rule if request.url_rule else "<unmatched>"
+
+@app.before_request
+def start_request_metrics():
+    g.metrics_t0 = time.perf_counter()
+    HTTP_IN_FLIGHT.inc(route=metrics_route())
+
+@app.after_request
+def record_response_status(response):
+    g.metrics_status = response.status_code
+    return response
+
+@app.teardown_request
+def finish_request_metrics(exc):
+    t0 = g.pop('metrics_t0', None)
+    if t0 is None:
+        return
+    route = metrics_route()
+    HTTP_IN_FLIGHT.dec(route=route)
+    HTTP_LATENCY.observe(time.perf_counter() - t0, route=route, method=request.method)
+    HTTP_REQUESTS.inc(route=route, method=request.method, status=g.pop('metrics_status', 500))
 
 # --- ROUTES ---
+@app.route('/metrics')
+def metrics():
+    """Prometheus text exposition of this process's metrics."""
+    QUEUE_GAUGE.set(len(QUEUE))
+    WRITER_BACKLOG_GAUGE.set(WRITER.backlog())
+    SERIES_GAUGE.set(len(SERIES))
+    return Response(METRICS.render(), mimetype=None, content_type=METRICS_CONTENT_TYPE)
+
 @app.route('/')
 def dashboard():
     return render_template('dashboard.html')
 
+def dashboard_snapshot():
+    """(version, payload dict, serialized body) for the current state, cached per version."""
+    # STATE before SETTINGS: publish() swaps them in the opposite order, so
+    # at worst the payload is newer than its version, never older
+    state = STATE
+    settings = SETTINGS
+    version = state['version']
+    entry = _DASHBOARD_CACHE['entry']
+    if entry[0] != version:
+        jobs = job_summaries(state['jobs_version'])
+        data = {
+            "version": version,
+            "telemetry": {
+                "robot": state['robot_status'],
+                "printer": state['printer_status'],
+                "temp": state['printer_temp'],
+                "progress": state['job_progress'],
+                "console": list(state['printer_console']),
+                "console_seq": state['console_seq'],
+                "printer_link": state['printer_link'],
+                "cooldown_eta": state['cooldown_eta'],
+                "job_detail": current_job_detail(state['file_position'])
+            },
+            "queue": jobs['queue'],
+            "queue_count": jobs['queue_count'],
+            "history": jobs['history'],
+            "current_job": jobs['current_job'],
+            "settings": settings,
+            "flags": {
+                "paused": settings['system_paused'],
+                "material_alert": settings['material_remaining_g'] < settings['material_low_threshold']
+            }
+        }
+        # One tuple, swapped in a single assignment, so readers never see a mixed entry
+        entry = _DASHBOARD_CACHE['entry'] = (version, data, json.dumps(data))
+        _SNAPSHOT_HISTORY.append((version, data))
+    return entry
+
+def diff_snapshot(old, new):
+    """
+    Changed parts of a dashboard payload. telemetry, settings and flags are
+    diffed per field; job lists are sent whole when they changed. The
+    console carries only the lines appended since `old` (renderConsole()
+    works from console_seq, so a partial list is enough).
+    """
+    delta = {"version": new['version']}
+    for section in ('telemetry', 'settings', 'flags'):
+        changed = {k: v for k, v in new[section].items() if old[section].get(k) != v}
+        if 'console_seq' in changed:
+            fresh = new['telemetry']['console_seq'] - old['telemetry']['console_seq']
+            changed['console'] = new['telemetry']['console'][-fresh:] if 0 < fresh else new['telemetry']['console']
+        elif section == 'telemetry':
+            changed.pop('console', None)
+        if changed:
+            delta[section] = changed
+    for section in ('queue', 'queue_count', 'history', 'current_job'):
+        if old[section] != new[section]:
+            delta[section] = new[section]
+    return delta
+
+def json_body_response(body, etag=None, gzipped=None):
+    """JSON response for a pre-serialized body, gzip-compressed when large and accepted."""
+    headers = {"Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+    if etag:
+        headers["ETag"] = etag
+    if len(body) >= GZIP_MIN_BYTES and 'gzip' in request.headers.get('Accept-Encoding', ''):
+        body = gzipped() if gzipped else gzip.compress(body.encode(), 6)
+        headers["Content-Encoding"] = "gzip"
+    return app.response_class(body, mimetype='application/json', headers=headers)
+
 @app.route('/api/dashboard_data')
 def get_dashboard_data():
-    return jsonify({
-        "telemetry": {
-            "robot": STATE['robot_status'],
-            "printer": STATE['printer_status'],
-            "temp": STATE['printer_temp'],
-            "progress": STATE['job_progress'],
-            "console": STATE['printer_console'] 
-        },
-        "queue": STATE['queue'],
-        "history": STATE['history'][-10:],
-        "current_job": STATE['current_job'],
-        "settings": SETTINGS,
-        "flags": {
-            "paused": SETTINGS['system_paused'],
-            "material_alert": SETTINGS['material_remaining_g'] < SETTINGS['material_low_threshold']
-        }
-    })
+    """
+    Polled by tabs without the push stream. The ETag is the state version:
+    If-None-Match answers 304 while nothing changed, and ?since=<version>
+    returns only the sections that changed since that version (marked
+    "delta": true), or the full payload if that version is too old.
+    """
+    version, data, body = dashboard_snapshot()
+    etag = f'"{version}"'
+    if etag in request.headers.get('If-None-Match', ''):
+        return app.response_class(status=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+    since = request.args.get('since', type=int)
+    if since is not None:
+        base = next((d for v, d in reversed(_SNAPSHOT_HISTORY) if v == since), None)
+        if base is not None:
+            delta = diff_snapshot(base, data)
+            delta['delta'] = True
+            return json_body_response(json.dumps(delta), etag)
+
+    def gzipped():
+        cached_version, gz = _GZIP_CACHE['entry']
+        if cached_version != version:
+            gz = gzip.compress(body.encode(), 6)
+            _GZIP_CACHE['entry'] = (version, gz)
+        return gz
+
+    return json_body_response(body, etag, gzipped)
+
+@app.route('/api/stream')
+def stream():
+    """
+    Server-Sent Events push channel. Sends a full `snapshot` event on
+    connect (so a reconnecting client always resyncs), then a `delta` event
+    with only the changed fields each time the state version moves. Event
+    ids are state versions. Idle streams get a comment every
+    STREAM_KEEPALIVE_SEC so dead connections are noticed.
+    """
+    def events():
+        version, last, body = dashboard_snapshot()
+        yield f"id: {version}\nevent: snapshot\ndata: {body}\n\n"
+        while True:
+            with CHANGED:
+                CHANGED.wait_for(lambda: STATE['version'] != version, timeout=STREAM_KEEPALIVE_SEC)
+            if STATE['version'] == version:
+                yield ": keepalive\n\n"
+                continue
+            version, current, _ = dashboard_snapshot()
+            delta = diff_snapshot(last, current)
+            last = current
+            if len(delta) > 1:
+                yield f"id: {version}\nevent: delta\ndata: {json.dumps(delta)}\n\n"
+
+    return Response(events(), mimetype='text/event-stream',
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route('/api/telemetry/series')
+def telemetry_series():
+    """
+    Downsampled status history for charts: ?window=<seconds, default 1 h>
+    ending at ?end=<unix time, default now>, at most ?points buckets
+    (default 300), ?method=minmax (min/max/mean per bucket) or lttb, and
+    optionally ?channels=temp,progress,robot,printer.
+    """
+    try:
+        window = float(request.args.get('window', 3600))
+        end = float(request.args.get('end', time.time()))
+        points = int(request.args.get('points', 300))
+    except ValueError:
+        return jsonify({"error": "Invalid window, end or points"}), 400
+    method = request.args.get('method', 'minmax')
+    if window <= 0 or not 2 <= points <= SERIES_MAX_POINTS or method not in ('minmax', 'lttb'):
+        return jsonify({"error": f"Need window > 0, 2 <= points <= {SERIES_MAX_POINTS}, method minmax|lttb"}), 400
+    channels = request.args.get('channels')
+    series = SERIES.downsample(end - window, end, points, method, channels.split(',') if channels else None)
+    return json_body_response(json.dumps(series, separators=(',', ':')))
 
 @app.route('/api/status/update', methods=['POST'])
 def update_status():
     """Called by Orchestrator to report health."""
     data = request.json
-    STATE['robot_status'] = data.get('robot', STATE['robot_status'])
-    STATE['printer_status'] = data.get('printer', STATE['printer_status'])
-    STATE['printer_temp'] = data.get('temp', 0.0)
-    STATE['job_progress'] = data.get('progress', 0.0)
-    
-    if 'console' in data:
-        STATE['printer_console'] = data['console']
-        
+
+    def command():
+        ts = time.time()
+        changes = {
+            "robot_status": data.get('robot', STATE['robot_status']),
+            "printer_status": data.get('printer', STATE['printer_status']),
+            "printer_temp": data.get('temp', 0.0),
+            "job_progress": data.get('progress', 0.0),
+            "cooldown_eta": data.get('cooldown_eta'),
+            "file_position": data.get('file_position', STATE['file_position']),
+            "telemetry_ts": ts
+        }
+        if 'printer_link' in data:
+            changes['printer_link'] = data['printer_link']
+        if 'console_append' in data:
+            changes['printer_console'] = deque(STATE['printer_console'], maxlen=200)
+            changes['printer_console'].extend(data['console_append'])
+            changes['console_seq'] = STATE['console_seq'] + len(data['console_append'])
+        elif 'console' in data:
+            # Legacy full-list replacement
+            changes['printer_console'] = deque(data['console'], maxlen=200)
+            changes['console_seq'] = STATE['console_seq'] + len(data['console'])
+        JOBS.record_telemetry(changes['robot_status'], changes['printer_status'], changes['printer_temp'],
+                              changes['job_progress'], changes['file_position'], ts=ts)
+        append_series(changes)
+        publish(**changes)
+
+    WRITER.call(command)
     return jsonify({"status": "updated"})
 
 # --- JOB MANAGEMENT ---
@@ -83,56 +605,244 @@ def add_job():
     if not data or 'gcode' not in data:
         return jsonify({"error": "No G-Code"}), 400
 
+    try:
+        job = new_job(data)
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid priority, deadline or material_est"}), 400
+
+    digest, size = BLOBS.put_bytes(data['gcode'].encode())
+    job.update(source_sha256=digest, gcode_sha256=digest, gcode_size=size)
+    job = WRITER.call(enqueue_job, job)
+    ANALYSIS_POOL.submit(process_job, job)
+    logger.info(f"➕ Job Added: {job['id']}")
+    return jsonify({"status": "queued", "job_id": job['id']})
+
+class UploadRejected(Exception):
+    """A streamed upload failed validation; the message is the 400 error."""
+
+def upload_job_record(fields):
+    """new_job() from upload query/form fields, where metadata is a JSON string."""
+    try:
+        if isinstance(fields.get('metadata'), str):
+            fields['metadata'] = json.loads(fields['metadata'])
+        return new_job(fields)
+    except (TypeError, ValueError):
+        raise UploadRejected("Invalid priority, deadline, material_est or metadata") from None
+
+@app.route('/api/jobs/upload', methods=['POST'])
+def upload_job():
+    """
+    Streaming upload. The G-code is either the raw request body (name,
+    material_est, priority, deadline and metadata as query parameters) or
+    the "file" part of a multipart form (the same names as form fields).
+    The body is hashed into the blob store and run through the pipeline
+    and analyzer as it arrives, in constant memory, and the job is queued
+    already processed. Nothing is committed to the blob store until the
+    body and every field have been validated.
+    """
+    t0 = time.time()
+    fields = request.args.to_dict()
+    job = {}
+
+    def validated(chunks):
+        # Raising here, after the last chunk but before process_lines() and
+        # the source writer commit, discards both blobs
+        received = 0
+        for chunk in chunks:
+            received += len(chunk)
+            yield chunk
+        if not received:
+            raise UploadRejected("No G-Code")
+        if not job:
+            job.update(upload_job_record(fields))  # Form fields may follow the file
+
+    try:
+        if request.mimetype == 'multipart/form-data':
+            boundary = request.mimetype_params.get('boundary')
+            if not boundary:
+                return jsonify({"error": "Missing multipart boundary"}), 400
+            chunks = iter_multipart_file(request.stream, boundary, fields)
+        else:
+            # Every field is in the query string: reject bad ones before reading the body
+            job.update(upload_job_record(fields))
+            chunks = iter_chunks(request.stream)
+        with BLOBS.writer() as source:
+            index, result, stats, digest, size = process_lines(iter_lines(tee_chunks(validated(chunks), source)), SETTINGS)
+            source_digest, source_size = source.commit()
+    except UploadRejected as e:
+        return jsonify({"error": str(e)}), 400
+    except ValueError as e:
+        return jsonify({"error": f"Bad upload: {e}"}), 400
+
+    if digest is None:
+        digest, size = source_digest, source_size
+    job.update(source_sha256=source_digest, gcode_sha256=source_digest, gcode_size=source_size)
+    job.update(processed_fields(job, index, result, stats, digest, size))
+    job = WRITER.call(enqueue_job, job)
+    logger.info(f"➕ Job Added: {job['id']} (streamed, {source_size / 1e6:.1f} MB)")
+    log_processed(job['id'], result, stats, t0)
+    return jsonify({"status": "queued", "job_id": job['id'], "summary": job_summary(job)})
+
+# Largest accepted /api/jobs/batch
+MAX_BATCH_JOBS = 1000
+
+@app.route('/api/jobs/batch', methods=['POST'])
+def add_job_batch():
+    """
+    Bulk submission for parameter sweeps. The body is JSONL: one job spec
+    per line, shaped like a POST /api/jobs body. Every line is validated
+    before any G-code is stored or queued, and the jobs are enqueued in one
+    transaction, so a batch is queued whole or not at all. Identical G-code
+    bodies are stored and analyzed once. Returns the job ids in line order.
+    """
+    jobs, errors, by_source = [], [], {}
+    specs = 0
+    # Valid lines wait in a spool so no blob is stored before the whole batch has passed
+    with tempfile.TemporaryFile(dir=BLOBS.tmp_dir) as spool:
+        for n, line in enumerate(iter_lines(iter_chunks(request.stream)), 1):
+            if not line.strip():
+                continue
+            try:
+                spec = json.loads(line)
+                if not isinstance(spec, dict):
+                    raise ValueError("expected a JSON object")
+                if not isinstance(spec.get('gcode'), str) or not spec['gcode']:
+                    raise ValueError("no G-Code")
+                if not isinstance(spec.get('metadata') or {}, dict):
+                    raise ValueError("metadata must be an object")
+                job = new_job(spec)
+            except (TypeError, ValueError) as e:
+                errors.append({"line": n, "error": str(e)})
+                continue
+            specs += 1
+            if errors or specs > MAX_BATCH_JOBS:
+                continue  # Keep validating, but stop spooling: the batch will be rejected
+            spool.write(line if line.endswith(b"\n") else line + b"\n")
+            jobs.append(job)
+
+        if errors:
+            return jsonify({"error": f"{len(errors)} invalid job specs, nothing queued", "errors": errors}), 400
+        if not jobs:
+            return jsonify({"error": "Empty batch"}), 400
+        if specs > MAX_BATCH_JOBS:
+            return jsonify({"error": f"Batch exceeds {MAX_BATCH_JOBS} jobs, nothing queued"}), 413
+
+        spool.seek(0)
+        for job, line in zip(jobs, spool):
+            digest, size = BLOBS.put_bytes(json.loads(line)['gcode'].encode())
+            job.update(source_sha256=digest, gcode_sha256=digest, gcode_size=size)
+            by_source.setdefault(digest, []).append(job)
+
+    jobs = WRITER.call(enqueue_jobs, jobs)
+    for group in by_source.values():
+        ANALYSIS_POOL.submit(process_job, *group)
+    logger.info(f"➕ Batch Added: {len(jobs)} jobs, {len(by_source)} unique G-code files")
+    return jsonify({"status": "queued", "count": len(jobs), "unique_gcode": len(by_source),
+                    "job_ids": [job['id'] for job in jobs]})
+
+def new_job(data):
+    """
+    A pending job record from a JSON body or form/query fields (blob
+    fields still unset). Raises ValueError/TypeError for a malformed
+    priority, deadline or material_est.
+    """
+    def number(key, cast):
+        value = data.get(key)
+        return None if value in (None, '') else cast(value)
+
     job_id = str(uuid.uuid4())[:8]
-    job = {
+    user_est = number('material_est', float)
+    return {
         "id": job_id,
-        "name": data.get('name', f"Job_{job_id}"),
-        "gcode": data['gcode'], 
-        "metadata": data.get('metadata', {}),
+        "name": data.get('name') or f"Job_{job_id}",
+        "metadata": data.get('metadata') or {},
         "created_at": time.time(),
         "status": "pending",
-        "material_est_g": data.get('material_est', 50.0)
+        "priority": number('priority', int) or 0,
+        "deadline": number('deadline', float),
+        "material_est_g": user_est if user_est is not None else DEFAULT_MATERIAL_EST_G,
+        "material_est_source": 'user' if user_est is not None else 'default',
+        "analysis": None
     }
-    STATE['queue'].append(job)
-    logger.info(f"➕ Job Added: {job_id}")
-    return jsonify({"status": "queued", "job_id": job_id})
+
+def enqueue_job(job):
+    """Writer command: stores a new job and queues it."""
+    job = JOBS.add(job)
+    QUEUE.push(job['id'], job['priority'], job['deadline'], job['seq'])
+    publish(jobs=True)
+    return job
+
+def enqueue_jobs(jobs):
+    """Writer command: stores and queues a batch of new jobs in one transaction."""
+    jobs = JOBS.add_many(jobs)
+    for job in jobs:
+        QUEUE.push(job['id'], job['priority'], job['deadline'], job['seq'])
+    publish(jobs=True)
+    return jobs
+
+def dispatch_next():
+    """
+    Writer command: the queue-head check, material check and hand-off as
+    one step. Returns (job, settings) for the orchestrator, or None.
+    """
+    if SHARED_STATE:
+        sync_shared_state()  # Don't pick a head another worker already took
+    if SETTINGS['system_paused'] or JOBS.current():
+        return None
+
+    job_id = QUEUE.peek()
+    if job_id is None:
+        return None
+    job = JOBS.get(job_id)
+    # The G-code is rewritten at enqueue time; hold the job until that is done
+    if job is None or job['analysis'] is None:
+        return None
+
+    # Material check, compare-and-set (pending -> printing, nothing else
+    # printing) and material charge in one database transaction
+    outcome, job, remaining = JOBS.dispatch(job_id)
+    if outcome == 'low_material':
+        publish(settings={"system_paused": True}, save=False)
+        logger.warning("⚠️ Material Low - Pausing Queue")
+        return None
+    if outcome == 'gone':
+        QUEUE.remove(job_id)
+    if outcome != 'dispatched':
+        return None
+    QUEUE.remove(job_id)
+    publish(jobs=True, settings={"material_remaining_g": remaining}, save=False)
+    return job, SETTINGS
 
 @app.route('/api/jobs/next', methods=['GET'])
 def pop_job():
-    if SETTINGS['system_paused'] or STATE['current_job']:
+    dispatched = WRITER.call(dispatch_next)
+    if dispatched is None:
         return jsonify(None), 204
 
-    if STATE['queue']:
-        # Material Check
-        if SETTINGS['material_remaining_g'] < STATE['queue'][0]['material_est_g']:
-            SETTINGS['system_paused'] = True
-            logger.warning("⚠️ Material Low - Pausing Queue")
-            return jsonify(None), 204
-
-        job = STATE['queue'].pop(0)
-        job['started_at'] = time.time()
-        STATE['current_job'] = job
-        SETTINGS['material_remaining_g'] -= job['material_est_g']
-        
-        logger.info(f"🚀 Dispatching {job['id']}")
-        
-        return jsonify({
-            "job": job,
-            "settings": {
-                "bed_temp": SETTINGS['bed_cooldown_target'],
-                "speed": SETTINGS['speed_override'],
-                "auto_harvest": SETTINGS['auto_harvest']
-            }
-        })
-    return jsonify(None), 204
+    job, settings = dispatched
+    logger.info(f"🚀 Dispatching {job['id']}")
+
+    return jsonify({
+        "job": job,
+        "settings": {
+            "bed_temp": settings['bed_cooldown_target'],
+            "speed": settings['speed_override'],
+            "auto_harvest": settings['auto_harvest']
+        }
+    })
 
 @app.route('/api/jobs/<job_id>/complete', methods=['POST'])
 def complete_job(job_id):
-    if STATE['current_job'] and STATE['current_job']['id'] == job_id:
-        finished = STATE['current_job']
-        finished['result'] = request.json
-        STATE['history'].append(finished)
-        STATE['current_job'] = None
+    result = request.json
+
+    def command():
+        finished = JOBS.finish(job_id, result)
+        if finished:
+            publish(jobs=True)
+        return finished
+
+    if WRITER.call(command):
+        collect_blobs()
         logger.info(f"✅ Job {job_id} Finished")
         return jsonify({"status": "ok"})
     return jsonify({"error": "Mismatch"}), 400
@@ -141,69 +851,171 @@ def complete_job(job_id):
 @app.route('/api/jobs/force_clear', methods=['POST'])
 def force_clear():
     """Manually resets the current job and status."""
-    if STATE['current_job']:
-        logger.warning(f"⚠️ User Force-Cleared Job {STATE['current_job']['id']}")
-        STATE['current_job'] = None
-    
-    # Also reset status text just in case
-    STATE['printer_status'] = "Idle"
-    STATE['job_progress'] = 0.0
-    
+    def command():
+        cleared = JOBS.clear_current()
+        # Also reset status text just in case
+        publish(jobs=True, printer_status="Idle", job_progress=0.0)
+        return cleared
+
+    for job_id in WRITER.call(command):
+        logger.warning(f"⚠️ User Force-Cleared Job {job_id}")
+        collect_blobs()
+
     return jsonify({"status": "cleared"})
 
 # --- CONTROLS ---
 @app.route('/api/queue/control', methods=['POST'])
 def queue_control():
     action = request.json.get('action')
-    if action == 'pause': SETTINGS['system_paused'] = True
-    elif action == 'resume': SETTINGS['system_paused'] = False
+    if action == 'pause': WRITER.call(publish, settings={"system_paused": True})
+    elif action == 'resume': WRITER.call(publish, settings={"system_paused": False})
     return jsonify({"status": "ok"})
 
 @app.route('/api/settings/update', methods=['POST'])
 def update_settings():
     data = request.json
-    for k, v in data.items():
-        if k in SETTINGS: SETTINGS[k] = v
+    WRITER.call(publish, settings={k: v for k, v in data.items() if k in SETTINGS})
     return jsonify({"status": "updated"})
 
 @app.route('/api/maintenance/refill', methods=['POST'])
 def refill():
     amt = request.json.get('amount', 1000)
-    SETTINGS['material_remaining_g'] = float(amt)
+    WRITER.call(publish, settings={"material_remaining_g": float(amt)})
     return jsonify({"status": "ok"})
 
 @app.route('/api/emergency/stop', methods=['POST'])
 def estop():
     logger.critical("🚨 ESTOP TRIGGERED")
-    SETTINGS['system_paused'] = True
+    WRITER.call(publish, settings={"system_paused": True})
     return jsonify({"status": "ESTOP"})
 
 @app.route('/api/jobs/<job_id>/delete', methods=['POST'])
 def delete_job(job_id):
-    STATE['queue'] = [j for j in STATE['queue'] if j['id'] != job_id]
+    def command():
+        JOBS.delete(job_id)
+        QUEUE.remove(job_id)
+        publish(jobs=True)
+
+    WRITER.call(command)
+    collect_blobs()
     return jsonify({"status": "deleted"})
 
+@app.route('/api/blobs/<digest>', methods=['GET'])
+def download_blob(digest):
+    """Streams a stored G-code blob. Supports Range and If-None-Match, so downloads can resume."""
+    if not BLOBS.exists(digest):
+        return jsonify({"error": "Unknown blob"}), 404
+    return send_file(BLOBS.path(digest), mimetype='text/x-gcode', conditional=True, etag=digest,
+                     download_name=f"{digest[:16]}.gcode", max_age=86400)
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Full record of one job (analysis, transform stats, metadata, result) for detail views."""
+    job = JOBS.get(job_id)
+    if job is None:
+        return jsonify({"error": "Not found"}), 404
+    detail = dict(job)
+    index = job_index(job)
+    detail['index'] = index.summary() if index else None
+    return jsonify(detail)
+
+@app.route('/api/jobs/<job_id>/index', methods=['GET'])
+def get_job_index(job_id):
+    """Index summary and per-layer table; ?resume_layer=N adds the resume offset and preamble."""
+    index = job_index(JOBS.get(job_id))
+    if index is None:
+        return jsonify({"error": "No index (unknown job or analysis pending)"}), 404
+    out = index.summary()
+    out['layers'] = [{"layer": i + 1, "offset": index.layer_offsets[i], "z": index.layer_z[i],
+                      "elapsed_s": round(index.layer_times[i], 1)} for i in range(index.layer_count)]
+    resume_layer = request.args.get('resume_layer', type=int)
+    if resume_layer is not None:
+        try:
+            offset, preamble = index.resume_point(resume_layer)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        out['resume'] = {"layer": resume_layer, "offset": offset, "preamble": preamble}
+    return jsonify(out)
+
 @app.route('/api/jobs/<job_id>/promote', methods=['POST'])
 def promote_job(job_id):
-    # Find index first to avoid race conditions with remove/insert
+    # A priority change: one above the current head
+    def command():
+        if job_id not in QUEUE:
+            return False
+        priority = QUEUE.promote(job_id)
+        if priority is not None:
+            JOBS.update(job_id, priority=priority)
+            publish(jobs=True)
+        return priority
+
     try:
-        idx = next((i for i, j in enumerate(STATE['queue']) if j['id'] == job_id), -1)
-        
-        if idx > 0: # If found and not already top
-            job = STATE['queue'].pop(idx)
-            STATE['queue'].insert(0, job)
-            logger.info(f"⬆️ Promoted job {job_id} to top of queue")
-            return jsonify({"status": "promoted"})
-        elif idx == 0:
+        priority = WRITER.call(command)
+        if priority is False:
+            return jsonify({"error": "Not found"}), 404
+        if priority is None:
             return jsonify({"status": "already_top"})
-        
-        return jsonify({"error": "Not found"}), 404
+
+        logger.info(f"⬆️ Promoted job {job_id} to top of queue (priority {priority})")
+        return jsonify({"status": "promoted", "priority": priority})
         
     except Exception as e:
         logger.error(f"Error promoting job: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/jobs/<job_id>/priority', methods=['POST'])
+def set_job_priority(job_id):
+    """Changes a queued job's priority and/or deadline (epoch seconds)."""
+    data = request.json or {}
+    try:
+        priority = int(data['priority']) if data.get('priority') is not None else None
+        deadline = float(data['deadline']) if data.get('deadline') is not None else None
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid priority or deadline"}), 400
+
+    def command():
+        if not QUEUE.update(job_id, priority, deadline):
+            return None
+        entry = QUEUE.get(job_id)
+        JOBS.update(job_id, priority=entry['priority'], deadline=entry['deadline'])
+        publish(jobs=True)
+        return entry
+
+    entry = WRITER.call(command)
+    if entry is None:
+        return jsonify({"error": "Not found"}), 404
+    return jsonify({"status": "updated", **entry})
+
+def claim_leader():
+    """
+    Shared mode: True in exactly one worker, the holder of an exclusive
+    lock on <db>.leader for as long as it lives (Unix only, like gunicorn).
+    """
+    import fcntl
+    lock = open(f"{DB_PATH}.leader", 'w')
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock.close()
+        return False
+    _SHARED_SYNC['leader_lock'] = lock
+    return True
+
+def resume_processing():
+    """Re-submits jobs whose processing was cut short by a restart."""
+    if SHARED_STATE and not claim_leader():
+        return  # Another worker does it
+    for job_id in JOBS.unprocessed_ids():
+        logger.info(f"🔁 Resuming processing of {job_id}")
+        ANALYSIS_POOL.submit(process_job, JOBS.get(job_id))
 
+if SHARED_STATE:
+    JOBS.init_state(STATE['version'])
+    load_shared_state()
+    threading.Thread(target=follow_shared_state, name="shared-state-sync", daemon=True).start()
+resume_processing()
+atexit.register(JOBS.flush_telemetry)
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    # No reloader: it would run the startup above in a second process on the same database
+    app.run(host='0.0.0.0', port=5000, use_reloader=False)
\ No newline at end of file
@@ -0,0 +1,154 @@
+import os
+import time
+import uuid
+import hashlib
+import logging
+
+logger = logging.getLogger("Dashboard")
+
+HEX_DIGITS = set("0123456789abcdef")
+
+
+class BlobWriter:
+    """
+    Streams bytes into a temporary file while hashing them. commit() moves
+    the file to its content address; if an identical blob already exists
+    the new copy is simply discarded.
+    """
+    def __init__(self, store, buffer_size=1024 * 1024):
+        self.store = store
+        self.tmp_path = os.path.join(store.tmp_dir, uuid.uuid4().hex)
+        self._file = open(self.tmp_path, 'wb')
+        self._hash = hashlib.sha256()
+        self._buf = bytearray()
+        self.buffer_size = buffer_size
+        self.size = 0
+
+    def write(self, data):
+        self._buf += data
+        self.size += len(data)
+        if len(self._buf) >= self.buffer_size:
+            self._flush()
+
+    def _flush(self):
+        if self._buf:
+            self._hash.update(self._buf)
+            self._file.write(self._buf)
+            self._buf.clear()
+
+    def commit(self):
+        """Returns (sha256 hexdigest, size) of the stored blob."""
+        self._flush()
+        self._file.close()
+        digest = self._hash.hexdigest()
+        dest = self.store.path(digest)
+        if os.path.exists(dest):
+            os.remove(self.tmp_path)
+            os.utime(dest)  # Refresh for the GC grace period
+        else:
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            os.replace(self.tmp_path, dest)
+        return digest, self.size
+
+    def abort(self):
+        if not self._file.closed:
+            self._file.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is not None:
+            self.abort()
+
+
+class BlobStore:
+    """
+    Content-addressed G-code store: <root>/<first 2 hex>/<sha256>. Identical
+    uploads are stored once. Sidecar files (e.g. the layer index) live next
+    to the blob as <sha256>.<suffix> and are removed with it.
+    """
+    def __init__(self, root):
+        self.root = root
+        self.tmp_dir = os.path.join(root, 'tmp')
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+    @staticmethod
+    def is_digest(value):
+        return isinstance(value, str) and len(value) == 64 and set(value) <= HEX_DIGITS
+
+    def path(self, digest):
+        if not self.is_digest(digest):
+            raise ValueError(f"Invalid blob digest: {digest!r}")
+        return os.path.join(self.root, digest[:2], digest)
+
+    def sidecar(self, digest, suffix):
+        return f"{self.path(digest)}.{suffix}"
+
+    def exists(self, digest):
+        return self.is_digest(digest) and os.path.exists(self.path(digest))
+
+    def size(self, digest):
+        return os.path.getsize(self.path(digest))
+
+    def open(self, digest):
+        return open(self.path(digest), 'rb', buffering=1024 * 1024)
+
+    def writer(self):
+        return BlobWriter(self)
+
+    def put_stream(self, chunks):
+        """Stores an iterable of byte chunks; returns (digest, size)."""
+        with self.writer() as w:
+            for chunk in chunks:
+                w.write(chunk)
+            return w.commit()
+
+    def put_bytes(self, data, chunk_size=1024 * 1024):
+        view = memoryview(data)
+        return self.put_stream(view[i:i + chunk_size] for i in range(0, len(view), chunk_size))
+
+    def delete(self, digest):
+        path = self.path(digest)
+        folder = os.path.dirname(path)
+        for name in os.listdir(folder) if os.path.isdir(folder) else []:
+            if name == digest or name.startswith(digest + "."):
+                os.remove(os.path.join(folder, name))
+
+    def digests(self):
+        for prefix in os.listdir(self.root):
+            folder = os.path.join(self.root, prefix)
+            if prefix == 'tmp' or not os.path.isdir(folder):
+                continue
+            for name in os.listdir(folder):
+                if self.is_digest(name):
+                    yield name
+
+    def gc(self, keep, min_age=60.0):
+        """
+        Deletes blobs (and sidecars) not in `keep`. Blobs younger than
+        `min_age` seconds survive, since a worker may have just committed one
+        it has not attached to a job yet. Returns the deleted digests.
+        """
+        now = time.time()
+        removed = []
+        for digest in list(self.digests()):
+            if digest in keep:
+                continue
+            try:
+                if now - os.path.getmtime(self.path(digest)) < min_age:
+                    continue
+                self.delete(digest)
+                removed.append(digest)
+            except OSError as e:
+                logger.warning(f"Blob GC failed for {digest[:12]}: {e}")
+        return removed
+
+    def usage(self):
+        count = total = 0
+        for digest in self.digests():
+            count += 1
+            total += self.size(digest)
+        return {"blobs": count, "bytes": total}
@@ -0,0 +1,134 @@
+import math
+import heapq
+import itertools
+import threading
+
+
+class JobQueue:
+    """
+    Dispatch order of pending job ids: an indexed binary heap.
+
+    Order is priority (higher first), then deadline (earliest first, none
+    last), then seq (FIFO). push/pop/update are O(log n) and lookup by id
+    is O(1) through the entry map. Removal is lazy: the heap entry is only
+    marked dead and skipped when it reaches the top; the heap is rebuilt
+    once dead entries outnumber live ones.
+    """
+    def __init__(self):
+        self._heap = []      # [-priority, deadline or inf, seq, push count, job_id]; job_id None = removed
+        self._entries = {}   # job_id -> heap entry
+        self._dead = 0
+        self._last_seq = 0
+        self._lock = threading.Lock()
+        self._pushes = itertools.count()  # Keeps a re-pushed job's entries from ever comparing equal
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, job_id):
+        return job_id in self._entries
+
+    def push(self, job_id, priority=0, deadline=None, seq=None):
+        """Adds a job, or re-keys it if already queued."""
+        with self._lock:
+            if seq is None:
+                old = self._entries.get(job_id)
+                seq = old[2] if old else self._last_seq + 1
+            self._push(job_id, priority, deadline, seq)
+
+    def _push(self, job_id, priority, deadline, seq):
+        self._discard(job_id)
+        self._last_seq = max(self._last_seq, seq)
+        entry = [-priority, math.inf if deadline is None else deadline, seq, next(self._pushes), job_id]
+        self._entries[job_id] = entry
+        heapq.heappush(self._heap, entry)
+
+    def _discard(self, job_id):
+        entry = self._entries.pop(job_id, None)
+        if entry is None:
+            return False
+        entry[-1] = None
+        self._dead += 1
+        if self._dead > len(self._entries) and self._dead > 64:
+            self._heap = [e for e in self._heap if e[-1] is not None]
+            heapq.heapify(self._heap)
+            self._dead = 0
+        return True
+
+    def _top(self):
+        heap = self._heap
+        while heap and heap[0][-1] is None:
+            heapq.heappop(heap)
+            self._dead -= 1
+        return heap[0] if heap else None
+
+    def remove(self, job_id):
+        with self._lock:
+            return self._discard(job_id)
+
+    def peek(self):
+        """Id of the job that would be dispatched next, or None."""
+        with self._lock:
+            top = self._top()
+            return top[-1] if top else None
+
+    def pop(self):
+        with self._lock:
+            top = self._top()
+            if top is None:
+                return None
+            heapq.heappop(self._heap)
+            del self._entries[top[-1]]
+            return top[-1]
+
+    def get(self, job_id):
+        """{"priority", "deadline", "seq"} of a queued job, or None."""
+        entry = self._entries.get(job_id)
+        if entry is None:
+            return None
+        return {"priority": -entry[0], "deadline": None if entry[1] == math.inf else entry[1], "seq": entry[2]}
+
+    def update(self, job_id, priority=None, deadline=None):
+        """Changes priority and/or deadline of a queued job. False if it is not queued."""
+        with self._lock:
+            entry = self._entries.get(job_id)
+            if entry is None:
+                return False
+            priority = -entry[0] if priority is None else priority
+            deadline = (None if entry[1] == math.inf else entry[1]) if deadline is None else deadline
+            self._push(job_id, priority, deadline, entry[2])
+            return True
+
+    def promote(self, job_id):
+        """
+        Moves a job to the front by raising its priority one above the
+        current head. Returns the new priority, None if it is already
+        first; raises KeyError if it is not queued.
+        """
+        with self._lock:
+            entry = self._entries.get(job_id)
+            if entry is None:
+                raise KeyError(job_id)
+            top = self._top()
+            if top is entry:
+                return None
+            priority = -top[0] + 1
+            self._push(job_id, priority, None if entry[1] == math.inf else entry[1], entry[2])
+            return priority
+
+    def ordered(self, limit=None):
+        """Queued job ids in dispatch order (the first `limit`); O(n log limit)."""
+        with self._lock:
+            live = [e for e in self._heap if e[-1] is not None]
+        live = heapq.nsmallest(limit, live) if limit is not None else sorted(live)
+        return [e[-1] for e in live]
+
+    def load(self, rows):
+        """Replaces the contents with (job_id, priority, deadline, seq) rows in O(n)."""
+        with self._lock:
+            self._heap = [[-(p or 0), math.inf if d is None else d, s, next(self._pushes), job_id]
+                          for job_id, p, d, s in rows]
+            heapq.heapify(self._heap)
+            self._entries = {e[-1]: e for e in self._heap}
+            self._dead = 0
+            self._last_seq = max((e[2] for e in self._heap), default=0)
@@ -0,0 +1,436 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+logger = logging.getLogger("Dashboard")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    status TEXT NOT NULL,                 -- pending | printing | complete | cleared
+    priority INTEGER NOT NULL DEFAULT 0,  -- Higher runs first
+    seq INTEGER NOT NULL,                 -- FIFO order within a priority and deadline
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    deadline REAL,
+    material_est_g REAL NOT NULL,
+    material_est_source TEXT NOT NULL,
+    source_sha256 TEXT,
+    gcode_sha256 TEXT,
+    gcode_size INTEGER,
+    body TEXT NOT NULL DEFAULT '{}'       -- JSON: metadata, analysis, transform, result
+);
+DROP INDEX IF EXISTS idx_jobs_queue;
+-- Dispatch order, same as JobQueue: priority, earliest deadline (none last), seq
+CREATE INDEX IF NOT EXISTS idx_jobs_dispatch ON jobs(status, priority DESC, COALESCE(deadline, 1e308), seq);
+CREATE INDEX IF NOT EXISTS idx_jobs_seq ON jobs(seq);
+CREATE INDEX IF NOT EXISTS idx_jobs_created ON jobs(created_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_finished ON jobs(status, finished_at);
+
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS telemetry (
+    ts REAL NOT NULL,
+    robot TEXT,
+    printer TEXT,
+    temp REAL,
+    progress REAL,
+    file_position INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_telemetry_ts ON telemetry(ts);
+
+-- Multi-process serving: live telemetry and the change counters, shared by all workers
+CREATE TABLE IF NOT EXISTS shared_state (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL,
+    jobs_version INTEGER NOT NULL,
+    telemetry TEXT NOT NULL DEFAULT '{}'
+);
+"""
+
+COLUMNS = ('id', 'name', 'status', 'priority', 'seq', 'created_at', 'started_at', 'finished_at', 'deadline',
+           'material_est_g', 'material_est_source', 'source_sha256', 'gcode_sha256', 'gcode_size')
+BODY_KEYS = ('metadata', 'analysis', 'transform', 'result')
+
+# Fixed SQL text, so sqlite3's per-connection statement cache reuses the
+# compiled statements (effectively prepared statements).
+SQL_INSERT = (f"INSERT INTO jobs ({', '.join(COLUMNS)}, body) "
+              f"VALUES ({', '.join('?' * len(COLUMNS))}, ?)")
+SQL_GET = "SELECT * FROM jobs WHERE id = ?"
+SQL_NEXT_SEQ = "SELECT COALESCE(MAX(seq), 0) + 1 FROM jobs"
+DISPATCH_ORDER = "ORDER BY priority DESC, COALESCE(deadline, 1e308), seq"
+SQL_QUEUE = f"SELECT * FROM jobs WHERE status = 'pending' {DISPATCH_ORDER} LIMIT ?"
+SQL_QUEUE_COUNT = "SELECT COUNT(*) FROM jobs WHERE status = 'pending'"
+SQL_HEAD = f"SELECT * FROM jobs WHERE status = 'pending' {DISPATCH_ORDER} LIMIT 1"
+SQL_PENDING_KEYS = "SELECT id, priority, deadline, seq FROM jobs WHERE status = 'pending'"
+SQL_CURRENT = "SELECT * FROM jobs WHERE status = 'printing' LIMIT 1"
+SQL_HISTORY = "SELECT * FROM jobs WHERE status = 'complete' ORDER BY finished_at DESC LIMIT ?"
+# Compare-and-set: only a pending job, and only while nothing else is printing
+SQL_START = ("UPDATE jobs SET status = 'printing', started_at = ? WHERE id = ? AND status = 'pending' "
+             "AND NOT EXISTS (SELECT 1 FROM jobs WHERE status = 'printing') RETURNING *")
+SQL_PENDING_EST = "SELECT material_est_g FROM jobs WHERE id = ? AND status = 'pending'"
+SQL_DISPATCH_SETTINGS = "SELECT key, value FROM settings WHERE key IN ('system_paused', 'material_remaining_g')"
+SQL_FINISH = ("UPDATE jobs SET status = 'complete', finished_at = ?, body = json_patch(body, ?) "
+              "WHERE id = ? AND status = 'printing'")
+SQL_CLEAR_CURRENT = "UPDATE jobs SET status = 'cleared', finished_at = ? WHERE status = 'printing' RETURNING id"
+SQL_DELETE = "DELETE FROM jobs WHERE id = ? AND status = 'pending'"
+SQL_PATCH_BODY = "UPDATE jobs SET body = json_patch(body, ?) WHERE id = ?"
+SQL_UNPROCESSED = "SELECT id FROM jobs WHERE status = 'pending' AND json_extract(body, '$.analysis') IS NULL"
+SQL_LIVE_BLOBS = ("SELECT gcode_sha256, source_sha256, json_extract(body, '$.analysis') IS NULL FROM jobs "
+                  "WHERE status IN ('pending', 'printing') "
+                  "UNION ALL SELECT gcode_sha256, NULL, 0 FROM "
+                  "(SELECT gcode_sha256 FROM jobs WHERE status = 'complete' ORDER BY finished_at DESC LIMIT ?)")
+SQL_SETTINGS = "SELECT key, value FROM settings"
+SQL_SET_SETTING = ("INSERT INTO settings (key, value) VALUES (?, ?) "
+                   "ON CONFLICT(key) DO UPDATE SET value = excluded.value")
+SQL_TELEMETRY = "INSERT INTO telemetry (ts, robot, printer, temp, progress, file_position) VALUES (?, ?, ?, ?, ?, ?)"
+SQL_TELEMETRY_PRUNE = "DELETE FROM telemetry WHERE ts < ?"
+SQL_TELEMETRY_RECENT = ("SELECT ts, robot, printer, temp, progress FROM "
+                        "(SELECT * FROM telemetry ORDER BY ts DESC LIMIT ?) ORDER BY ts")
+SQL_STATE_INIT = "INSERT OR IGNORE INTO shared_state (id, version, jobs_version) VALUES (1, ?, 0)"
+SQL_STATE = "SELECT version, jobs_version, telemetry FROM shared_state WHERE id = 1"
+SQL_STATE_TELEMETRY = "SELECT telemetry FROM shared_state WHERE id = 1"
+SQL_STATE_BUMP = ("UPDATE shared_state SET version = version + 1, jobs_version = jobs_version + ?, "
+                  "telemetry = COALESCE(?, telemetry) WHERE id = 1 RETURNING version, jobs_version")
+
+
+class JobStore:
+    """
+    Durable job queue, history and settings on SQLite (WAL mode, so readers
+    never block the writer). One connection per thread; writes are
+    serialized by a lock and each is a single transaction.
+
+    Jobs come back as plain dicts shaped like the old in-memory jobs: the
+    columns plus the JSON body keys (metadata, analysis, transform, result).
+    A bounded LRU keeps hot rows (queue head, running job) out of SQLite.
+    Telemetry samples are buffered and written in batches.
+
+    Several processes may open the same file: writes take the database
+    lock up front (BEGIN IMMEDIATE), dispatch() is a single transaction,
+    and shared_state carries telemetry and change counters between them.
+    A process that did not write a change itself must clear_cache().
+    """
+    def __init__(self, path, cache_size=512, telemetry_batch=50, telemetry_flush_sec=10.0,
+                 telemetry_retention_sec=7 * 86400):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._local = threading.local()
+        self._write_lock = threading.RLock()
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.cache_size = cache_size
+        self.cache_hits = self.cache_misses = 0
+
+        self._telemetry = []
+        self._telemetry_lock = threading.Lock()
+        self._telemetry_flushed = time.time()
+        self._telemetry_pruned = 0.0
+        self.telemetry_batch = telemetry_batch
+        self.telemetry_flush_sec = telemetry_flush_sec
+        self.telemetry_retention_sec = telemetry_retention_sec
+
+        self._conn().executescript(SCHEMA)
+
+    # --- Connections ---
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10.0, cached_statements=256, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        """IMMEDIATE transaction: takes the database write lock up front, so other processes wait instead of failing."""
+        with self._write_lock:
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _write(self, sql, params=()):
+        """Runs one write statement in its own transaction; returns (rowcount, RETURNING rows or None)."""
+        with self._transaction() as conn:
+            cur = conn.execute(sql, params)
+            rows = cur.fetchall() if cur.description else None
+        return cur.rowcount, rows
+
+    def data_version(self):
+        """
+        PRAGMA data_version of this thread's connection: changes whenever
+        another connection (e.g. another worker process) commits.
+        """
+        return self._conn().execute("PRAGMA data_version").fetchone()[0]
+
+    def clear_cache(self):
+        with self._cache_lock:
+            self._cache.clear()
+
+    # --- Row conversion / cache ---
+    @staticmethod
+    def _to_job(row):
+        if row is None:
+            return None
+        job = {k: row[k] for k in COLUMNS}
+        body = json.loads(row['body'])
+        for key in BODY_KEYS:
+            job[key] = body.get(key)
+        if job['metadata'] is None:
+            job['metadata'] = {}
+        return job
+
+    def _cache_put(self, job):
+        with self._cache_lock:
+            self._cache[job['id']] = job
+            self._cache.move_to_end(job['id'])
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _invalidate(self, job_id):
+        with self._cache_lock:
+            self._cache.pop(job_id, None)
+
+    def _fetch_one(self, sql, params=()):
+        job = self._to_job(self._conn().execute(sql, params).fetchone())
+        if job is not None:
+            self._cache_put(job)
+        return dict(job) if job else None
+
+    # --- Jobs ---
+    def add(self, job):
+        """Inserts a new job dict (as built by the routes). Returns it with seq filled in."""
+        job = dict(job)
+        job.setdefault('status', 'pending')
+        job.setdefault('priority', 0)
+        body = json.dumps({k: job.get(k) for k in BODY_KEYS})
+        with self._write_lock:
+            job['seq'] = self._conn().execute(SQL_NEXT_SEQ).fetchone()[0]
+            self._write(SQL_INSERT, tuple(job.get(c) for c in COLUMNS) + (body,))
+        return job
+
+    def add_many(self, jobs):
+        """Inserts a batch of new jobs in one transaction: all or none. Returns them with seq filled in."""
+        jobs = [dict(job) for job in jobs]
+        with self._transaction() as conn:
+            seq = conn.execute(SQL_NEXT_SEQ).fetchone()[0]
+            rows = []
+            for job in jobs:
+                job.setdefault('status', 'pending')
+                job.setdefault('priority', 0)
+                job['seq'] = seq
+                seq += 1
+                rows.append(tuple(job.get(c) for c in COLUMNS) + (json.dumps({k: job.get(k) for k in BODY_KEYS}),))
+            conn.executemany(SQL_INSERT, rows)
+        return jobs
+
+    def get(self, job_id):
+        with self._cache_lock:
+            job = self._cache.get(job_id)
+            if job is not None:
+                self._cache.move_to_end(job_id)
+                self.cache_hits += 1
+                return dict(job)
+        self.cache_misses += 1
+        return self._fetch_one(SQL_GET, (job_id,))
+
+    def update(self, job_id, **fields):
+        """Updates columns and/or body keys of one job. Returns True if the job exists."""
+        columns = {k: v for k, v in fields.items() if k in COLUMNS and k != 'id'}
+        body = {k: v for k, v in fields.items() if k in BODY_KEYS}
+        unknown = set(fields) - set(columns) - set(body)
+        if unknown:
+            raise KeyError(f"Unknown job fields: {sorted(unknown)}")
+        assignments = [f"{k} = ?" for k in columns]
+        params = list(columns.values())
+        if body:
+            assignments.append("body = json_patch(body, ?)")
+            params.append(json.dumps(body))
+        if not assignments:
+            return self.get(job_id) is not None
+        count, _ = self._write(f"UPDATE jobs SET {', '.join(assignments)} WHERE id = ?", params + [job_id])
+        self._invalidate(job_id)
+        return count == 1
+
+    def peek_next(self):
+        """The job that would be dispatched next, or None."""
+        return self._fetch_one(SQL_HEAD)
+
+    def current(self):
+        return self._fetch_one(SQL_CURRENT)
+
+    def start(self, job_id):
+        """Atomically moves a pending job to printing. False if it lost a race."""
+        _, rows = self._write(SQL_START, (time.time(), job_id))
+        self._invalidate(job_id)
+        return bool(rows)
+
+    def dispatch(self, job_id):
+        """
+        Starts a pending job and charges its material estimate against the
+        material_remaining_g setting in one transaction. The pause flag and
+        the material left are re-read inside it, so concurrent dispatchers
+        (threads or worker processes) can neither both win nor lose a charge.
+        Returns (outcome, job, material_remaining_g); outcome is 'dispatched',
+        'paused', 'low_material' (the queue is paused as a side effect),
+        'busy' (another job is printing) or 'gone' (no longer pending).
+        """
+        with self._transaction() as conn:
+            settings = {k: json.loads(v) for k, v in conn.execute(SQL_DISPATCH_SETTINGS)}
+            remaining = settings.get('material_remaining_g')
+            if settings.get('system_paused'):
+                return 'paused', None, remaining
+            row = conn.execute(SQL_PENDING_EST, (job_id,)).fetchone()
+            if row is None:
+                return 'gone', None, remaining
+            if remaining is not None and remaining < row[0]:
+                conn.execute(SQL_SET_SETTING, ('system_paused', 'true'))
+                return 'low_material', None, remaining
+            rows = conn.execute(SQL_START, (time.time(), job_id)).fetchall()
+            if not rows:
+                return 'busy', None, remaining
+            job = self._to_job(rows[0])
+            if remaining is not None:
+                remaining -= job['material_est_g']
+                conn.execute(SQL_SET_SETTING, ('material_remaining_g', json.dumps(remaining)))
+        self._invalidate(job_id)
+        return 'dispatched', job, remaining
+
+    def finish(self, job_id, result=None):
+        count, _ = self._write(SQL_FINISH, (time.time(), json.dumps({"result": result}), job_id))
+        self._invalidate(job_id)
+        return count == 1
+
+    def clear_current(self):
+        """Marks the printing job (if any) as cleared. Returns the cleared job ids."""
+        _, rows = self._write(SQL_CLEAR_CURRENT, (time.time(),))
+        ids = [r[0] for r in rows or []]
+        for job_id in ids:
+            self._invalidate(job_id)
+        return ids
+
+    def delete(self, job_id):
+        count, _ = self._write(SQL_DELETE, (job_id,))
+        self._invalidate(job_id)
+        return count == 1
+
+    def queue(self, limit=100):
+        rows = self._conn().execute(SQL_QUEUE, (limit,)).fetchall()
+        return [self._to_job(r) for r in rows]
+
+    def pending_keys(self):
+        """(id, priority, deadline, seq) of every pending job, for JobQueue.load()."""
+        return self._conn().execute(SQL_PENDING_KEYS).fetchall()
+
+    def queue_count(self):
+        return self._conn().execute(SQL_QUEUE_COUNT).fetchone()[0]
+
+    def history(self, limit=10):
+        """Most recent completed jobs, oldest first."""
+        rows = self._conn().execute(SQL_HISTORY, (limit,)).fetchall()
+        return [self._to_job(r) for r in reversed(rows)]
+
+    def unprocessed_ids(self):
+        return [r[0] for r in self._conn().execute(SQL_UNPROCESSED)]
+
+    def live_blobs(self, history=10):
+        """Digests still needed by pending/printing jobs and the last `history` completed ones."""
+        keep = set()
+        for gcode, source, processing in self._conn().execute(SQL_LIVE_BLOBS, (history,)):
+            keep.add(gcode)
+            if processing:
+                keep.add(source)
+        keep.discard(None)
+        return keep
+
+    # --- Settings ---
+    def load_settings(self, defaults):
+        """`defaults` overlaid with the stored values (unknown stored keys are ignored)."""
+        settings = dict(defaults)
+        for key, value in self._conn().execute(SQL_SETTINGS):
+            if key in settings:
+                settings[key] = json.loads(value)
+        return settings
+
+    def save_settings(self, settings):
+        with self._transaction() as conn:
+            conn.executemany(SQL_SET_SETTING, [(k, json.dumps(v)) for k, v in settings.items()])
+
+    # --- Shared state (multi-process serving) ---
+    def init_state(self, version):
+        """Creates the shared-state row on first use, starting the counters at `version`."""
+        self._write(SQL_STATE_INIT, (version,))
+
+    def load_state(self):
+        """(version, jobs_version, telemetry dict) as last published by any worker."""
+        version, jobs_version, telemetry = self._conn().execute(SQL_STATE).fetchone()
+        return version, jobs_version, json.loads(telemetry)
+
+    def publish_state(self, telemetry=None, settings=None, jobs=False):
+        """
+        One transaction: saves `settings`, merges `telemetry` into the shared
+        telemetry and bumps the counters. Returns (version, jobs_version).
+        """
+        with self._transaction() as conn:
+            if settings:
+                conn.executemany(SQL_SET_SETTING, [(k, json.dumps(v)) for k, v in settings.items()])
+            merged = None
+            if telemetry:
+                merged = json.loads(conn.execute(SQL_STATE_TELEMETRY).fetchone()[0])
+                merged.update(telemetry)
+                merged = json.dumps(merged)
+            version, jobs_version = conn.execute(SQL_STATE_BUMP, (1 if jobs else 0, merged)).fetchall()[0]
+        return version, jobs_version
+
+    # --- Telemetry (batched) ---
+    def record_telemetry(self, robot, printer, temp, progress, file_position=None, ts=None):
+        """Buffers one status sample; written once the batch is full or old enough."""
+        sample = (ts or time.time(), robot, printer, temp, progress, file_position)
+        with self._telemetry_lock:
+            self._telemetry.append(sample)
+            due = (len(self._telemetry) >= self.telemetry_batch
+                   or sample[0] - self._telemetry_flushed >= self.telemetry_flush_sec)
+        if due:
+            self.flush_telemetry()
+
+    def flush_telemetry(self):
+        with self._telemetry_lock:
+            batch, self._telemetry = self._telemetry, []
+            self._telemetry_flushed = time.time()
+        if not batch:
+            return
+        with self._transaction() as conn:
+            conn.executemany(SQL_TELEMETRY, batch)
+            now = time.time()
+            if now - self._telemetry_pruned > 3600:
+                conn.execute(SQL_TELEMETRY_PRUNE, (now - self.telemetry_retention_sec,))
+                self._telemetry_pruned = now
+
+    def recent_telemetry(self, limit):
+        """The newest `limit` stored samples as (ts, robot, printer, temp, progress) rows, oldest first."""
+        self.flush_telemetry()
+        return self._conn().execute(SQL_TELEMETRY_RECENT, (limit,)).fetchall()
+
+    def close(self):
+        self.flush_telemetry()
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
@@ -0,0 +1,76 @@
+import sys
+import os
+import argparse
+import logging
+
+# Add Project Root to Path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+logger = logging.getLogger("Dashboard")
+
+# Production entry point for the dashboard (app.py's __main__ is the
+# single-process Flask development server).
+#
+#   python services/dashboard/serve.py                                   # waitress, 1 process, 32 threads
+#   python services/dashboard/serve.py --server gunicorn --workers 4     # 4 processes x 8 threads (Unix)
+#
+# Each open /api/stream (SSE) connection holds one server thread for as long
+# as the tab is open, so size --threads for the expected number of tabs plus
+# the orchestrator's polling. With more than one gunicorn worker the workers
+# share queue, settings and telemetry through the SQLite database
+# (DASHBOARD_SHARED_STATE); a change made in one worker reaches the others'
+# streams within app.SHARED_SYNC_SEC.
+
+def run_waitress(args):
+    from waitress import serve
+    from services.dashboard.app import app
+    logger.info(f"🚀 Dashboard on http://{args.host}:{args.port} (waitress, {args.threads} threads)")
+    serve(app, host=args.host, port=args.port, threads=args.threads, ident="robofab-dashboard")
+
+def run_gunicorn(args):
+    from gunicorn.app.base import BaseApplication
+
+    class DashboardApplication(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", f"{args.host}:{args.port}")
+            self.cfg.set("workers", args.workers)
+            self.cfg.set("threads", args.threads)
+            self.cfg.set("worker_class", "gthread")
+            self.cfg.set("timeout", 60)
+            self.cfg.set("graceful_timeout", 5)
+
+        def load(self):
+            # Imported in each worker after the fork: the writer thread,
+            # analysis pool and SQLite connections are per process
+            from services.dashboard.app import app
+            return app
+
+    if args.workers > 1:
+        os.environ['DASHBOARD_SHARED_STATE'] = '1'
+    logger.info(f"🚀 Dashboard on http://{args.host}:{args.port} "
+                f"(gunicorn, {args.workers} workers x {args.threads} threads)")
+    DashboardApplication().run()
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the RoboFab dashboard with a production WSGI server")
+    parser.add_argument("--server", choices=["waitress", "gunicorn"], default="waitress")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn worker processes")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="Threads per process (default: 32 for waitress, 8 for gunicorn)")
+    parser.add_argument("--data-dir", help="Database and blob directory (default: <project>/data)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - [Dashboard] - %(message)s')
+    if args.data_dir:
+        os.environ['DASHBOARD_DATA_DIR'] = os.path.abspath(args.data_dir)
+    if args.threads is None:
+        args.threads = 32 if args.server == "waitress" else 8
+    if args.server == "waitress":
+        run_waitress(args)
+    else:
+        run_gunicorn(args)
+
+if __name__ == "__main__":
+    main()
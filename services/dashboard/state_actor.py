@@ -0,0 +1,49 @@
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+
+logger = logging.getLogger("Dashboard")
+
+
+class StateActor:
+    """
+    Single writer for the dashboard state. Every mutation is a command run
+    on one thread in submission order, so commands never interleave and a
+    read-check-write inside one command is atomic. Readers do not go
+    through the actor; commands publish new copies of the state rather
+    than editing the published ones.
+    """
+    def __init__(self, name="state-writer"):
+        self._commands = queue.SimpleQueue()
+        self.processed = 0
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, fn, *args, **kwargs):
+        """Queues fn(*args, **kwargs) for the writer thread; returns a Future."""
+        future = Future()
+        self._commands.put((fn, args, kwargs, future))
+        return future
+
+    def call(self, fn, *args, **kwargs):
+        """Runs fn on the writer thread and returns its result (or raises its exception)."""
+        if threading.current_thread() is self._thread:
+            return fn(*args, **kwargs)  # Already on the writer: nested command
+        return self.submit(fn, *args, **kwargs).result()
+
+    def backlog(self):
+        """Commands waiting to run."""
+        return self._commands.qsize()
+
+    def _run(self):
+        while True:
+            fn, args, kwargs, future = self._commands.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                logger.error(f"❌ State command {getattr(fn, '__name__', fn)} failed: {e!r}")
+                future.set_exception(e)
+            self.processed += 1
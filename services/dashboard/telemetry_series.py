@@ -0,0 +1,149 @@
+import math
+import threading
+
+import numpy as np
+
+# One day of 1 Hz status reports fits with room to spare
+DEFAULT_CAPACITY = 2 ** 17
+
+
+class TelemetrySeries:
+    """
+    Fixed-size ring buffer of status samples for charting: one timestamp
+    array plus one float64 column per channel, overwriting the oldest
+    sample once full, so append() is O(1) and memory is fixed
+    (capacity x (channels + 1) x 8 bytes). Numeric channels store the
+    reported value (NaN if missing); state channels store an integer code
+    into their legend, assigned the first time each state string is seen.
+    """
+    def __init__(self, numeric=("temp", "progress"), states=("robot", "printer"), capacity=DEFAULT_CAPACITY):
+        self.numeric = tuple(numeric)
+        self.states = tuple(states)
+        self.channels = self.numeric + self.states
+        self.capacity = capacity
+        self._ts = np.zeros(capacity)
+        self._values = np.full((capacity, len(self.channels)), np.nan)
+        self._head = 0   # Next slot to write
+        self._count = 0
+        self._codes = {name: {} for name in self.states}
+        self.legend = {name: [] for name in self.states}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._count
+
+    def _code(self, channel, state):
+        codes = self._codes[channel]
+        code = codes.get(state)
+        if code is None:
+            code = codes[state] = len(codes)
+            self.legend[channel].append(state)
+        return code
+
+    def append(self, ts, **values):
+        """Records one sample; channels not given are NaN. Timestamps never go backwards."""
+        with self._lock:
+            row = self._values[self._head]
+            for col, name in enumerate(self.channels):
+                value = values.get(name)
+                if value is None:
+                    row[col] = np.nan
+                elif name in self._codes:
+                    row[col] = self._code(name, str(value))
+                else:
+                    row[col] = value
+            last = self._ts[self._head - 1] if self._count else ts
+            self._ts[self._head] = max(ts, last)
+            self._head = (self._head + 1) % self.capacity
+            self._count = min(self._count + 1, self.capacity)
+
+    def window(self, start, end):
+        """(ts, values) copies of the samples with start <= ts <= end, oldest first."""
+        with self._lock:
+            if self._count < self.capacity:
+                segments = [(0, self._count)]
+            else:
+                segments = [(self._head, self.capacity), (0, self._head)]
+            ts_parts, value_parts = [], []
+            for a, b in segments:
+                ts = self._ts[a:b]
+                lo = a + np.searchsorted(ts, start, 'left')
+                hi = a + np.searchsorted(ts, end, 'right')
+                ts_parts.append(self._ts[lo:hi])
+                value_parts.append(self._values[lo:hi])
+            return np.concatenate(ts_parts), np.concatenate(value_parts)
+
+    def downsample(self, start, end, points, method="minmax", channels=None):
+        """
+        The window [start, end] reduced to at most `points` buckets for a
+        chart. "minmax" gives every numeric channel min/max/mean per
+        non-empty bucket on a shared time axis, so spikes survive the
+        reduction. "lttb" picks one representative sample per bucket per
+        numeric channel (Largest-Triangle-Three-Buckets). State channels
+        always report the last state in each bucket. Times are seconds
+        after `start`.
+        """
+        channels = [c for c in (channels or self.channels) if c in self.channels]
+        ts, values = self.window(start, end)
+        edges = np.searchsorted(ts, start + (end - start) * np.arange(1, points) / points)
+        bounds = np.concatenate(([0], edges, [len(ts)]))
+        nonempty = bounds[:-1] < bounds[1:]
+        first, last = bounds[:-1][nonempty], bounds[1:][nonempty] - 1
+
+        result = {"start": start, "end": end, "points": points, "method": method, "samples": len(ts),
+                  "t": rounded(ts[first] - start, 1), "channels": {}}
+        for name in channels:
+            column = values[:, self.channels.index(name)]
+            if name in self._codes:
+                result['channels'][name] = {"state": rounded(column[last], 0), "legend": list(self.legend[name])}
+            elif method == "lttb":
+                t, v = lttb(ts, column, points)
+                result['channels'][name] = {"t": rounded(t - start, 1), "value": rounded(v, 2)}
+            else:
+                result['channels'][name] = bucket_stats(column, first)
+        return result
+
+
+def rounded(values, decimals):
+    """JSON-ready list: rounded floats, NaN as None."""
+    values = np.round(values, decimals)
+    if decimals == 0:
+        return [None if math.isnan(v) else int(v) for v in values.tolist()]
+    return [None if math.isnan(v) else v for v in values.tolist()]
+
+
+def bucket_stats(column, starts):
+    """min/max/mean of `column` over the buckets beginning at `starts` (NaNs ignored)."""
+    if not len(starts):
+        return {"min": [], "max": [], "mean": []}
+    valid = ~np.isnan(column)
+    counts = np.add.reduceat(valid, starts)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.add.reduceat(np.where(valid, column, 0.0), starts) / counts
+    return {"min": rounded(np.fmin.reduceat(column, starts), 2),
+            "max": rounded(np.fmax.reduceat(column, starts), 2),
+            "mean": rounded(mean, 2)}
+
+
+def lttb(ts, values, points):
+    """Largest-Triangle-Three-Buckets: `points` samples that keep the visual shape of the line."""
+    keep = ~np.isnan(values)
+    ts, values = ts[keep], values[keep]
+    n = len(ts)
+    if n <= points or points < 3:
+        return ts, values
+    picked = np.empty(points, dtype=np.int64)
+    picked[0], picked[-1] = 0, n - 1
+    # Buckets 1..points-2 split samples 1..n-2; the last bucket is the final sample alone
+    edges = (1 + np.arange(points - 1) * (n - 2) / (points - 2)).astype(np.int64)
+    bounds = np.append(edges, n)
+    sizes = np.diff(bounds)
+    avg_t = np.add.reduceat(ts, edges) / sizes
+    avg_v = np.add.reduceat(values, edges) / sizes
+    a = 0
+    for i in range(points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        area = np.abs((ts[a] - avg_t[i + 1]) * (values[lo:hi] - values[a])
+                      - (ts[a] - ts[lo:hi]) * (avg_v[i + 1] - values[a]))
+        a = picked[i + 1] = lo + int(np.argmax(area))
+    return ts[picked], values[picked]
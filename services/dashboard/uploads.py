@@ -0,0 +1,70 @@
+from werkzeug.sansio.multipart import MultipartDecoder, NeedData, Field, File, Data, Epilogue
+
+UPLOAD_CHUNK_SIZE = 256 * 1024
+MAX_FORM_FIELD_BYTES = 64 * 1024
+
+
+def iter_chunks(stream, chunk_size=UPLOAD_CHUNK_SIZE):
+    """Raw request body as byte chunks."""
+    return iter(lambda: stream.read(chunk_size), b"")
+
+
+def iter_multipart_file(stream, boundary, fields, file_field="file", chunk_size=UPLOAD_CHUNK_SIZE):
+    """
+    Incremental multipart/form-data parser: yields the data of the
+    `file_field` part chunk by chunk as it arrives and stores the other
+    (small) form fields in `fields`, whether they come before or after the
+    file. Raises ValueError on a malformed or truncated body.
+    """
+    decoder = MultipartDecoder(boundary.encode())
+    part = None
+    value = bytearray()
+    finished = False
+    while True:
+        event = decoder.next_event()
+        if isinstance(event, NeedData):
+            if finished:
+                raise ValueError("Truncated multipart body")
+            chunk = stream.read(chunk_size)
+            finished = not chunk
+            decoder.receive_data(chunk or None)
+        elif isinstance(event, (Field, File)):
+            part = event
+            value.clear()
+        elif isinstance(event, Data):
+            if isinstance(part, File):
+                if part.name == file_field and event.data:
+                    yield event.data
+            else:
+                value += event.data
+                if len(value) > MAX_FORM_FIELD_BYTES:
+                    raise ValueError(f"Form field {part.name!r} is too large")
+                if not event.more_data:
+                    fields[part.name] = value.decode('utf-8')
+        elif isinstance(event, Epilogue):
+            return
+
+
+def iter_lines(chunks):
+    """Splits byte chunks into lines ending in b'\\n' (the last one may not), like iterating a file."""
+    rest = []  # Pieces of a line spanning chunks, joined once it ends
+    for chunk in chunks:
+        parts = chunk.split(b"\n")
+        if len(parts) == 1:
+            rest.append(chunk)
+            continue
+        rest.append(parts[0])
+        yield b"".join(rest) + b"\n"
+        for line in parts[1:-1]:
+            yield line + b"\n"
+        rest = [parts[-1]]
+    tail = b"".join(rest)
+    if tail:
+        yield tail
+
+
+def tee_chunks(chunks, writer):
+    """Passes chunks through while writing them to a BlobWriter."""
+    for chunk in chunks:
+        writer.write(chunk)
+        yield chunk
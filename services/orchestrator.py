@@ -9,10 +9,16 @@ import yaml
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from pkg.drivers.robotiq_v2 import RTDETriggerClient
-from pkg.drivers.sv08_moonraker import MoonrakerClient
+from pkg.drivers.sv08_moonraker import MoonrakerClient, UploadIndex
+from pkg.drivers.moonraker_ws import SubscriptionThread
+from pkg.utils.cooldown import CooldownEstimator
+from pkg.utils.blob_fetch import fetch_blob
+from pkg.utils.metrics import REGISTRY, serve_metrics
 
 # --- CONFIGURATION LOADING ---
 CONFIG_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '../config/cell_config.yaml'))
+UPLOAD_INDEX_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '../data/moonraker_uploads.json'))
+GCODE_CACHE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../data/gcode_cache'))
 
 def load_network_config(path):
     if not os.path.exists(path):
@@ -32,6 +38,8 @@ ROBOT_IP = net_config.get('robot_ip')
 PRINTER_IP = net_config.get('printer_ip')
 CONTROL_PC_IP = net_config.get('control_pc_ip', '127.0.0.1')
 API_URL = f"http://{CONTROL_PC_IP}:5000/api"
+# Prometheus /metrics for this process (status report and printer HTTP counters); 0 disables
+METRICS_PORT = net_config.get('orchestrator_metrics_port', 9101)
 
 # Tuning
 HARVEST_DURATION_SEC = 33
@@ -39,28 +47,59 @@ HARVEST_DURATION_SEC = 33
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - [Orchestrator] - %(message)s')
 logger = logging.getLogger()
 
-def report_status(robot_state, printer_state, temp=0.0, progress=0.0, console=[]):
+STATUS_REPORTS = REGISTRY.counter("orchestrator_status_reports_total",
+                                  "Status reports to the dashboard, by result (sent or dropped)", ("result",))
+STATUS_REPORT_LATENCY = REGISTRY.histogram("orchestrator_status_report_duration_seconds",
+                                           "Round trip of POST /api/status/update, including failures")
+
+def report_status(robot_state, printer_state, temp=0.0, progress=0.0, console_new=None, link=None,
+                  cooldown_eta=None, file_position=None):
+    # Console lines are sent as a delta; the dashboard appends them to its ring buffer
+    payload = {
+        "robot": robot_state,
+        "printer": printer_state,
+        "temp": temp,
+        "progress": progress
+    }
+    if console_new:
+        payload["console_append"] = console_new
+    if link:
+        payload["printer_link"] = link
+    if cooldown_eta is not None:
+        payload["cooldown_eta"] = cooldown_eta
+    if file_position is not None:
+        payload["file_position"] = file_position
+    # Best effort: a lost report is superseded by the next one, so it is counted, not raised
     try:
-        requests.post(f"{API_URL}/status/update", json={
-            "robot": robot_state,
-            "printer": printer_state,
-            "temp": temp,
-            "progress": progress,
-            "console": console
-        }, timeout=1)
-    except:
-        pass 
+        with STATUS_REPORT_LATENCY.time():
+            requests.post(f"{API_URL}/status/update", json=payload, timeout=1).raise_for_status()
+        STATUS_REPORTS.inc(result="sent")
+    except Exception as e:
+        STATUS_REPORTS.inc(result="dropped")
+        logger.debug(f"Status report dropped: {e!r}")
 
 def main():
     logger.info("Initializing Orchestrator (Robust Connection)...")
     logger.info(f"Loaded Config -> Robot: {ROBOT_IP} | Printer: {PRINTER_IP}")
+    if METRICS_PORT:
+        try:
+            serve_metrics(METRICS_PORT)
+        except OSError as e:
+            # Metrics are optional: a taken port must not stop the print loop
+            logger.warning(f"⚠️ Metrics disabled, cannot listen on port {METRICS_PORT}: {e}")
 
     if not ROBOT_IP or not PRINTER_IP:
         logger.error("❌ Configuration Error: Missing IP addresses.")
         return
 
     trigger = RTDETriggerClient(ROBOT_IP)
-    printer = MoonrakerClient(PRINTER_IP)
+    printer = MoonrakerClient(PRINTER_IP, upload_index=UploadIndex(UPLOAD_INDEX_PATH))
+
+    # Push feed from Moonraker: lets the print loop wake the moment the job ends.
+    # If it is unavailable we fall back to plain polling.
+    watcher = SubscriptionThread(PRINTER_IP)
+    if not watcher.start():
+        logger.warning("⚠️ Moonraker websocket unavailable. Falling back to polling.")
 
     # Initial Connection
     if not trigger.connect():
@@ -76,12 +115,11 @@ def main():
     while True:
         try:
             # --- PHASE 1: IDLE MONITORING ---
-            p_status = printer.get_status()
-            p_temp = printer.get_bed_temperature()
+            snap = printer.snapshot()
+            p_status = snap.state
+            p_temp = snap.bed_temp
             
-            p_console = []
-            if hasattr(printer, 'get_console_lines'):
-                p_console = printer.get_console_lines(limit=8)
+            p_console = printer.tail_console(count=8)
             
             # --- FIXED: ROBUST ROBOT CHECK ---
             # If the robot kicked us off (Boost Exception), this block catches it 
@@ -107,7 +145,7 @@ def main():
                     r_status = "Offline"
             # ---------------------------------
             
-            report_status(r_status, p_status, p_temp, 0.0, p_console)
+            report_status(r_status, p_status, p_temp, 0.0, p_console, printer.link_telemetry())
 
             # --- PHASE 2: POLL FOR WORK ---
             try:
@@ -133,10 +171,25 @@ def main():
             time.sleep(15) 
 
             # Upload & Start
-            report_status(r_status, "Uploading", p_temp, 0.0, p_console)
-            filename = f"job_{job['id']}.gcode"
+            report_status(r_status, "Uploading", p_temp, 0.0)
+            # Content-addressed: the printer may already hold this exact file, in
+            # which case the blob is never downloaded from the dashboard
+            digest = job['gcode_sha256']
+            blob_url = f"{API_URL}/blobs/{digest}"
+            try:
+                filename = printer.upload_gcode_dedup(lambda: fetch_blob(blob_url, digest, GCODE_CACHE_DIR),
+                                                      digest=digest, size=job.get('gcode_size'))
+            except Exception as e:
+                logger.error(f"G-code download failed: {e}")
+                filename = None
+            finally:
+                # fetch_blob() resumes a .part only within its own retries: drop both
+                for name in (f"{digest}.gcode", f"{digest}.gcode.part"):
+                    cached = os.path.join(GCODE_CACHE_DIR, name)
+                    if os.path.exists(cached):
+                        os.remove(cached)
             
-            if not printer.upload_gcode(job['gcode'], filename):
+            if not filename:
                 logger.error("Upload failed.")
                 continue 
             
@@ -146,11 +199,11 @@ def main():
 
             # --- PHASE 4: PRINTING LOOP ---
             while True:
-                p_status = printer.get_status()
-                p_temp = printer.get_bed_temperature()
-                p_prog = printer.get_progress()
-                if hasattr(printer, 'get_console_lines'):
-                    p_console = printer.get_console_lines(limit=8)
+                snap = printer.snapshot()
+                p_status = snap.state
+                p_temp = snap.bed_temp
+                p_prog = snap.progress
+                p_console = printer.tail_console(count=8)
                 
                 # We also check robot status here to keep the dashboard alive
                 # But we don't spam the logs if it's offline during printing
@@ -159,14 +212,19 @@ def main():
                 except:
                     r_status = "Offline"
 
-                report_status(r_status, p_status, p_temp, p_prog, p_console)
+                report_status(r_status, p_status, p_temp, p_prog, p_console, printer.link_telemetry(),
+                              file_position=snap.file_position)
                 
                 if p_status == "complete":
                     break
                 elif p_status in ["error", "offline"]:
                     logger.error("Printer Error.")
                     break
-                time.sleep(2) 
+
+                if watcher.connected:
+                    watcher.wait_for_value('print_stats.state', ('complete', 'error'), timeout=2)
+                else:
+                    time.sleep(2)
 
             if p_status != "complete":
                 continue 
@@ -175,17 +233,23 @@ def main():
             target_temp = settings['bed_temp']
             logger.info(f"Cooling down to {target_temp:.1f}C...")
             
+            # Fit Newton cooling online and poll right at the predicted crossing
+            cooldown = CooldownEstimator(target_temp)
             while True:
-                curr_temp = printer.get_bed_temperature()
-                report_status(r_status, "Cooling", curr_temp, 1.0, p_console)
+                snap = printer.snapshot()
+                curr_temp = snap.bed_temp
+                if snap.online:
+                    cooldown.add_sample(curr_temp, snap.fetched_at)
+                eta = cooldown.eta()
+                report_status(r_status, "Cooling", curr_temp, 1.0, cooldown_eta=eta)
                 if curr_temp <= target_temp:
                     break
-                time.sleep(5)
+                time.sleep(cooldown.next_poll_delay())
 
             # --- PHASE 6: THE HANDSHAKE (HARVEST) ---
             if settings['auto_harvest']:
                 logger.info("🤖 Initiating Harvest Sequence...")
-                report_status("Harvesting", "Complete", curr_temp, 1.0, p_console)
+                report_status("Harvesting", "Complete", curr_temp, 1.0)
                 
                 # --- FIXED: ROBUST TRIGGER ---
                 # Ensure we are connected before pulling the trigger
@@ -220,10 +284,13 @@ def main():
             requests.post(f"{API_URL}/jobs/{job['id']}/complete", json={"result": "success"})
             printer.execute_gcode("M84") 
             printer.execute_gcode("SDCARD_RESET_FILE") 
+            logger.info(f"Printer link: {printer.connection_stats()}")
+            printer.gc_remote_files()
 
         except KeyboardInterrupt:
             logger.info("Stopping Orchestrator...")
             trigger.disconnect()
+            watcher.stop()
             break
         except Exception as e:
             logger.error(f"Loop Error: {e}")
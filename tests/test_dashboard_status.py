@@ -0,0 +1,50 @@
+import sys
+import os
+import time
+import tempfile
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+# The dashboard opens its database at import: point it at a scratch directory
+os.environ.setdefault('DASHBOARD_DATA_DIR', tempfile.mkdtemp(prefix="dashboard_test_"))
+
+import services.dashboard.app as dashboard
+
+# Three 0.2 mm layers of extrusion
+GCODE = b"G90\nM82\nG92 E0\n" + b"".join(
+    b"G1 Z%.1f F300\nG1 X10 Y10 E%d F1500\nG1 X20 Y10 E%d\n" % (0.2 * z, 2 * z - 1, 2 * z) for z in (1, 2, 3))
+
+
+def start_print(client):
+    client.post('/api/maintenance/refill', json={"amount": 1000.0})
+    client.post('/api/jobs/force_clear')
+    resp = client.post('/api/jobs/upload?name=status_test', data=GCODE, content_type='text/x-gcode')
+    assert resp.status_code == 200
+    client.post('/api/queue/control', json={"action": "resume"})
+    resp = client.get('/api/jobs/next')
+    assert resp.status_code == 200
+    return resp.get_json()['job']
+
+
+def test_reports_without_file_position_keep_the_last_one():
+    client = dashboard.app.test_client()
+    job = start_print(client)
+    end = job['gcode_size']
+    client.post('/api/status/update', json={"robot": "Ready", "printer": "printing", "temp": 60.0,
+                                            "progress": 1.0, "file_position": end})
+    # Cooling / harvest reports after the print ends carry no file_position
+    client.post('/api/status/update', json={"robot": "Ready", "printer": "Cooling", "temp": 45.0, "progress": 1.0})
+
+    assert dashboard.STATE['file_position'] == end
+    detail = client.get('/api/dashboard_data').get_json()['telemetry']['job_detail']
+    assert detail['layer'] == detail['layer_count'] == 3
+    assert detail['remaining_s'] == 0.0
+
+
+def test_reloaded_status_sample_is_not_charted_twice():
+    state = dict(dashboard.STATE, telemetry_ts=time.time(), printer_temp=50.0, job_progress=0.5,
+                 robot_status="Ready", printer_status="printing")
+    before = len(dashboard.SERIES)
+    dashboard.append_series(state)
+    dashboard.append_series(state)  # Reloaded after a shared-state conflict
+    assert len(dashboard.SERIES) == before + 1
@@ -0,0 +1,95 @@
+import sys
+import os
+import json
+import uuid
+import tempfile
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+# The dashboard opens its database at import: point it at a scratch directory
+os.environ.setdefault('DASHBOARD_DATA_DIR', tempfile.mkdtemp(prefix="dashboard_test_"))
+
+import services.dashboard.app as dashboard
+
+
+def unique_gcode():
+    # Fresh content per test, so a blob left by another test cannot hide a leak
+    return f"; {uuid.uuid4().hex}\nG90\nM82\nG1 Z0.2 F300\nG1 X10 Y10 E1 F1500\n".encode()
+
+
+def stored():
+    return set(dashboard.BLOBS.digests()), set(os.listdir(dashboard.BLOBS.tmp_dir))
+
+
+def multipart(gcode, **fields):
+    # Form fields after the file, as some clients send them
+    boundary = uuid.uuid4().hex
+    parts = [f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="part.gcode"\r\n'
+             f'Content-Type: text/x-gcode\r\n\r\n'.encode() + gcode + b'\r\n']
+    parts += [f'--{boundary}\r\nContent-Disposition: form-data; name="{k}"\r\n\r\n{v}\r\n'.encode()
+              for k, v in fields.items()]
+    return b"".join(parts) + f'--{boundary}--\r\n'.encode(), f'multipart/form-data; boundary={boundary}'
+
+
+def test_bad_query_fields_store_nothing():
+    client = dashboard.app.test_client()
+    before = stored()
+    resp = client.post('/api/jobs/upload?priority=high', data=unique_gcode(), content_type='text/x-gcode')
+    assert resp.status_code == 400
+    assert stored() == before
+
+
+def test_bad_form_field_after_the_file_stores_nothing():
+    client = dashboard.app.test_client()
+    before = stored()
+    body, content_type = multipart(unique_gcode(), name="late", metadata="{not json")
+    resp = client.post('/api/jobs/upload', data=body, content_type=content_type)
+    assert resp.status_code == 400
+    assert stored() == before
+
+
+def test_empty_upload_stores_nothing():
+    client = dashboard.app.test_client()
+    before = stored()
+    resp = client.post('/api/jobs/upload?name=empty', data=b"", content_type='text/x-gcode')
+    assert resp.status_code == 400
+    assert resp.get_json()['error'] == "No G-Code"
+    assert stored() == before
+
+
+def test_valid_multipart_upload_is_queued():
+    client = dashboard.app.test_client()
+    body, content_type = multipart(unique_gcode(), name="late_fields", priority="3")
+    resp = client.post('/api/jobs/upload', data=body, content_type=content_type)
+    assert resp.status_code == 200
+    job = dashboard.JOBS.get(resp.get_json()['job_id'])
+    assert job['name'] == "late_fields" and job['priority'] == 3
+    assert dashboard.BLOBS.exists(job['gcode_sha256'])
+
+
+def batch(*specs):
+    return b"".join(line if isinstance(line, bytes) else json.dumps(line).encode() + b"\n" for line in specs)
+
+
+def test_rejected_batch_stores_nothing():
+    client = dashboard.app.test_client()
+    before = stored()
+    body = batch({"name": "ok", "gcode": unique_gcode().decode()},
+                 {"name": "bad", "gcode": unique_gcode().decode(), "priority": "high"})
+    resp = client.post('/api/jobs/batch', data=body, content_type='application/x-ndjson')
+    assert resp.status_code == 400
+    assert resp.get_json()['errors'][0]['line'] == 2
+    assert stored() == before
+
+
+def test_batch_stores_shared_gcode_once():
+    client = dashboard.app.test_client()
+    shared = unique_gcode().decode()
+    body = batch({"name": "a", "gcode": shared}, b"\n", {"name": "b", "gcode": shared, "priority": 2})
+    resp = client.post('/api/jobs/batch', data=body.rstrip(b"\n"), content_type='application/x-ndjson')
+    assert resp.status_code == 200
+    assert resp.get_json()['unique_gcode'] == 1
+    a, b = (dashboard.JOBS.get(job_id) for job_id in resp.get_json()['job_ids'])
+    assert a['name'] == "a" and b['priority'] == 2
+    assert a['source_sha256'] == b['source_sha256']
+    assert dashboard.BLOBS.exists(a['source_sha256'])
@@ -0,0 +1,76 @@
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from pkg.gcode.analyzer import analyze_stream
+from pkg.gcode.modes import PositioningModes
+from pkg.gcode.pipeline import run_pipeline, drop_redundant, PipelineStats
+
+# M83 slicer output that later issues G90: E must stay relative (Klipper gcode_move)
+M83_THEN_G90 = b"G28\nG90\nM83\nG1 X0 Y0 Z0.2\nG91\nG1 Z0.4\nG90\nG1 X10 Y0 E1.5\nG1 X10 Y20 E1.5\nG1 X30 Y20 E1.5\n"
+
+
+def lines(gcode):
+    return gcode.splitlines(keepends=True)
+
+
+def test_g90_keeps_relative_extrusion_after_m83():
+    modes = PositioningModes()
+    for cmd in (b"M83", b"G91", b"G90"):
+        modes.update(cmd)
+    assert modes.abs_xyz is True
+    assert modes.abs_e is False
+
+
+def test_g91_makes_extrusion_relative_until_g90():
+    modes = PositioningModes()
+    modes.update(b"G91")
+    assert modes.abs_e is False
+    modes.update(b"M82")
+    assert modes.abs_e is False
+    modes.update(b"G90")
+    assert modes.abs_e is True
+
+
+def test_analyzer_counts_relative_extrusion_through_g90():
+    result = analyze_stream(lines(M83_THEN_G90))
+    assert abs(result.extrusion_mm - 4.5) < 1e-9
+    assert abs(result.max_z - 0.6) < 1e-9
+
+
+def test_analyzer_bare_g92_zeroes_all_axes():
+    result = analyze_stream(lines(b"G90\nM82\nG1 X5 E2\nG92\nG1 X1 E1\n"))
+    assert abs(result.extrusion_mm - 3.0) < 1e-9
+    assert abs(result.print_mm - 6.0) < 1e-9
+
+
+def test_analyzer_ignores_malformed_g92_and_g4_words():
+    result = analyze_stream(lines(b"G90\nM82\nG1 X5 E2\nG92 Eabc\nG4 Pxyz\nG4 S1\nG1 X6 E3\n"))
+    assert abs(result.extrusion_mm - 3.0) < 1e-9
+    assert abs(result.dwell_s - 1.0) < 1e-9
+
+
+def test_pipeline_keeps_relative_e_words_through_g90():
+    out = b"".join(run_pipeline(lines(M83_THEN_G90))).splitlines()
+    moves = [line for line in out if line.startswith(b"G1 X") or line.startswith(b"G1 Y")][1:]
+    assert moves == [b"G1 X10 E1.5", b"G1 Y20 E1.5", b"G1 X30 E1.5"]
+
+
+def test_pipeline_g90_elision_follows_coordinate_mode_only():
+    out = list(drop_redundant(lines(b"M83\nG90\nM82\nG90\nM83\nG91\nG91\n"), PipelineStats()))
+    assert out == lines(b"M83\nG90\nM82\nM83\nG91\n")
+
+
+def test_pipeline_bare_g92_zeroes_all_axes():
+    out = list(drop_redundant(lines(b"G90\nM82\nG1 X5 E2\nG92\nG1 X0 E0 F600\n"), PipelineStats()))
+    assert out[-1] == b"G1 F600\n"
+
+
+def test_pipeline_keeps_mode_commands_after_a_macro():
+    # PRINT_START may leave G91/M83 active: the file's own G90/M82 must survive
+    gcode = b"G90\nM82\nG1 X1 Y1 F600\nPRINT_START\nG90\nM82\nG1 X1 Y1 F600\n"
+    out = b"".join(drop_redundant(lines(gcode), PipelineStats())).splitlines()
+    assert out[3:6] == [b"PRINT_START", b"G90", b"M82"]
+    assert out[6] == b"G1 X1 Y1 F600"
@@ -0,0 +1,101 @@
+import sys
+import os
+import asyncio
+
+import requests
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from pkg.drivers.sv08_moonraker import CircuitBreaker, MoonrakerClient
+from pkg.drivers.moonraker_async import AsyncMoonrakerClient
+
+
+class FakeResponse:
+    def raise_for_status(self):
+        pass
+
+
+def scripted(outcomes):
+    """session.request stand-in: raises or returns the next scripted outcome."""
+    outcomes = list(outcomes)
+
+    def request(*args, **kwargs):
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+    return request
+
+
+def open_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, cooldown=0.0)
+    breaker.before_call()
+    breaker.record_failure(0.01)
+    assert breaker.state == breaker.OPEN
+    return breaker
+
+
+def test_unexpected_error_during_half_open_probe_resolves_it():
+    breaker = open_breaker()
+    client = MoonrakerClient("127.0.0.1", breaker=breaker)
+    client.session.request = scripted([requests.exceptions.ChunkedEncodingError("truncated"), FakeResponse()])
+
+    try:
+        client._request('gcode', 'GET', '/printer/info')
+    except requests.exceptions.ChunkedEncodingError:
+        pass
+    assert breaker.state == breaker.OPEN
+    assert not breaker._probe_in_flight
+
+    client._request('gcode', 'GET', '/printer/info')  # The next probe gets through and closes it
+    assert breaker.state == breaker.CLOSED
+    assert breaker.short_circuited == 0
+
+
+def test_interrupted_probe_is_released():
+    breaker = open_breaker()
+    client = MoonrakerClient("127.0.0.1", breaker=breaker)
+    client.session.request = scripted([KeyboardInterrupt()])
+    try:
+        client._request('gcode', 'GET', '/printer/info')
+    except KeyboardInterrupt:
+        pass
+    assert not breaker._probe_in_flight
+    breaker.before_call()  # Probe allowed again, not short-circuited
+    assert breaker.short_circuited == 0
+
+
+def test_async_non_json_body_during_probe_resolves_it():
+    breaker = open_breaker()
+    client = AsyncMoonrakerClient("127.0.0.1", breaker=breaker)
+
+    class Body:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        def raise_for_status(self):
+            pass
+
+        async def json(self, content_type=None):
+            raise ValueError("not JSON")
+
+    class Session:
+        def request(self, *args, **kwargs):
+            return Body()
+
+    client.pool._session = Session()
+    client.pool._session.closed = False
+
+    async def probe():
+        try:
+            await client._request('gcode', 'GET', '/printer/info')
+        except ValueError:
+            pass
+
+    asyncio.run(probe())
+    assert breaker.state == breaker.OPEN
+    assert not breaker._probe_in_flight
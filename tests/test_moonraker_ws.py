@@ -0,0 +1,42 @@
+import sys
+import os
+import asyncio
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from pkg.drivers.moonraker_ws import MoonrakerSubscriber
+from pkg.sim.fake_moonraker import FakeMoonrakerWS
+
+
+def test_rpc_error_on_subscribe_backs_off_and_reconnects():
+    async def scenario():
+        fake = await FakeMoonrakerWS().start()
+        fake.klippy_ready = False
+        sub = MoonrakerSubscriber(fake.host, fake.port, reconnect_delay=0.05)
+        starting = asyncio.ensure_future(sub.start(timeout=5.0))
+        await asyncio.sleep(0.3)
+        assert not starting.done() and not sub._runner.done()  # Still retrying
+        fake.klippy_ready = True
+        await starting
+        assert sub.connected
+        await sub.close()
+        await fake.stop()
+    asyncio.run(scenario())
+
+
+def test_failed_resubscribe_after_klippy_ready_reconnects():
+    async def scenario():
+        fake = await FakeMoonrakerWS().start()
+        sub = MoonrakerSubscriber(fake.host, fake.port, reconnect_delay=0.05)
+        await sub.start()
+        fake.klippy_ready = False
+        await fake.notify('notify_klippy_ready')
+        assert await sub.wait_for(lambda s: not s.connected, timeout=2.0)
+        fake.klippy_ready = True
+        await fake.update({"print_stats": {"state": "printing"}})
+        assert await sub.wait_for_value('print_stats.state', 'printing', timeout=2.0) == 'printing'
+        assert sub.connected
+        await sub.close()
+        await fake.stop()
+    asyncio.run(scenario())